@@ -1,12 +1,35 @@
 from flask import Flask, jsonify, render_template, send_from_directory, Response, stream_with_context, request
 import os
 import json
-from news_scraper import NewsScraper
+import yaml
+from article_store import MAX_PAGE_SIZE, ArticleStore
+from export import FORMATS, export_chunks, export_filename
+from jobs import JobManager, JobQueueFull
+from metrics import REGISTRY as metrics_registry
+from scheduler import ScheduleStore, schedule_path
+from search import fragment, highlight
 import logging
 import time
 from queue import Queue, Empty
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+jobs = JobManager()
+
+
+def _load_config(config_path: str = 'configs/sources.yaml') -> tuple[dict, str]:
+    # ten sam state_dir co NewsScraper (z configu / SCRAPER_STATE_DIR)
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            cfg = yaml.safe_load(f) or {}
+    except Exception as e:
+        logger.error(f"Failed to read config {config_path}: {e}")
+        cfg = {}
+    return cfg, os.environ.get('SCRAPER_STATE_DIR') or cfg.get('state_dir') or '.scraper_state'
+
+
+_config, _state_dir = _load_config()
+articles = ArticleStore.from_config(_config, _state_dir)
 
 # ===== Log streaming (SSE) =====
 log_queue: Queue[str] = Queue(maxsize=1000)
@@ -45,56 +68,254 @@ def index():
     return render_template('index.html')
 
 
+def _use_api_key(data: dict) -> None:
+    api_key = (data.get('api_key') or '').strip()
+    # Ustaw klucz API z UI, lub użyj z .env
+    if api_key:
+        os.environ['GOOGLE_API_KEY'] = api_key
+        logger.info("Using API key from UI")
+
+
+def _job_event_stream(job, offset: int = 0):
+    """NDJSON: zdarzenie 'job', potem 'item' dla każdego artykułu i końcowe 'done'."""
+    yield json.dumps({'type': 'job', 'job_id': job.id}) + '\n'
+    while True:
+        items, active = job.wait_items(offset)
+        for item in items:
+            yield json.dumps({'type': 'item', 'item': dict(item)}, ensure_ascii=False) + '\n'
+        offset += len(items)
+        if not active and not items:
+            break
+    if job.error:
+        yield json.dumps({'type': 'error', 'error': job.error}, ensure_ascii=False) + '\n'
+    yield json.dumps({'type': 'done', 'status': job.status, 'count': offset}) + '\n'
+
+
+def _ndjson_response(gen) -> Response:
+    return Response(stream_with_context(gen), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+
 @app.route('/api/run', methods=['POST'])
 def run_scrape():
+    """Jak POST /api/jobs: nie czeka na koniec crawla (limit czasu proxy), wyniki pod /api/jobs/<id>."""
+    return create_job()
+
+
+@app.route('/api/run/stream', methods=['POST'])
+def run_scrape_stream():
+    """Uruchamia (lub dołącza do) zadania i wysyła jego artykuły (NDJSON) zaraz po streszczeniu."""
     try:
-        data = request.json or {}
-        api_key = data.get('api_key', '').strip()
-        
-        # Ustaw klucz API z UI, lub użyj z .env
-        if api_key:
-            os.environ['GOOGLE_API_KEY'] = api_key
-            logger.info("Using API key from UI")
-        
-        scraper = NewsScraper()
-        # Config-driven scraping
-        scraper.scrape_from_config()
-        scraper.enrich_with_gemini()
-        scraper.save_to_json()
-        return jsonify(scraper.news_items)
+        _use_api_key(request.json or {})
+        job, _ = jobs.submit()
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return _ndjson_response(_job_event_stream(job))
+
+
+# ===== Background jobs =====
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Uruchamia (lub dołącza do) zadania i od razu zwraca 202 z job_id; Location – status i wyniki."""
+    try:
+        _use_api_key(request.get_json(silent=True) or {})
+        job, created = jobs.submit()
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
-        logger.error(f"Scrape error: {e}")
+        logger.error(f"Job submit failed: {e}")
         return jsonify({'error': str(e)}), 500
+    data = job.to_dict()
+    data['attached'] = not created
+    return jsonify(data), 202, {'Location': f'/api/jobs/{job.id}'}
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify([job.to_dict() for job in jobs.list()])
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie ma takiego zadania'}), 404
+    offset = request.args.get('offset', default=0, type=int)
+    return jsonify(job.to_dict(offset=max(0, offset)))
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie ma takiego zadania'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/stream')
+def stream_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie ma takiego zadania'}), 404
+    offset = request.args.get('offset', default=0, type=int)
+    return _ndjson_response(_job_event_stream(job, max(0, offset)))
+
+
+@app.route('/api/jobs/<job_id>/metrics')
+def job_metrics(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Nie ma takiego zadania'}), 404
+    if job.metrics is None:
+        return jsonify({'error': 'Zadanie jeszcze trwa', 'status': job.status}), 409
+    return jsonify(job.metrics)
+
+
+@app.route('/api/articles')
+def list_articles():
+    """Archiwum: ?page, per_page, from, to (YYYY-MM-DD), source, q (pełnotekstowo); od najnowszych."""
+    if articles is None:
+        return jsonify({'error': 'Archiwum artykułów wyłączone'}), 404
+    page = max(1, request.args.get('page', default=1, type=int))
+    per_page = max(1, min(request.args.get('per_page', default=50, type=int), MAX_PAGE_SIZE))
+    try:
+        total, items = articles.query(date_from=request.args.get('from'), date_to=request.args.get('to'),
+                                      source=request.args.get('source'), q=request.args.get('q'),
+                                      limit=per_page, offset=(page - 1) * per_page)
+    except Exception as e:
+        logger.error(f"Article query failed: {e}")
+        return jsonify({'error': 'Błąd zapytania'}), 400
+    return jsonify({'total': total, 'page': page, 'per_page': per_page,
+                    'pages': (total + per_page - 1) // per_page, 'items': items})
+
+
+@app.route('/api/search')
+def search_articles():
+    """Wyszukiwanie w archiwum: ?q (słowa, "fraza", prefiks*), page, per_page, from, to, source."""
+    if articles is None:
+        return jsonify({'error': 'Archiwum artykułów wyłączone'}), 404
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'Brak zapytania (q)'}), 400
+    page = max(1, request.args.get('page', default=1, type=int))
+    per_page = max(1, min(request.args.get('per_page', default=20, type=int), MAX_PAGE_SIZE))
+    started = time.perf_counter()
+    try:
+        total, items, terms = articles.search(q, date_from=request.args.get('from'), date_to=request.args.get('to'),
+                                              source=request.args.get('source'), limit=per_page,
+                                              offset=(page - 1) * per_page)
+    except Exception as e:
+        logger.error(f"Search failed for {q!r}: {e}")
+        return jsonify({'error': 'Błąd zapytania'}), 400
+    for item in items:
+        item['highlight'] = {
+            'tytuł': highlight(item.get('tytuł'), terms),
+            'fragment': fragment((item.get('gemini_tresc'), item.get('treść')), terms),
+        }
+    return jsonify({'q': q, 'total': total, 'page': page, 'per_page': per_page,
+                    'pages': (total + per_page - 1) // per_page,
+                    'took_ms': round((time.perf_counter() - started) * 1000, 2), 'items': items})
+
+
+@app.route('/api/schedule')
+def schedule():
+    """Harmonogram trybu ciągłego (scheduler.py): odstępy, terminy i tempo nowych artykułów per źródło."""
+    path = schedule_path(_config, _state_dir)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Tryb ciągły nie był uruchamiany'}), 404
+    try:
+        store = ScheduleStore(path)
+        try:
+            rows = store.all()
+        finally:
+            store.close()
+    except Exception as e:
+        logger.error(f"Schedule read failed: {e}")
+        return jsonify({'error': 'Błąd odczytu harmonogramu'}), 500
+    for row in rows:
+        row['interval_minutes'] = round(row.pop('interval') / 60, 1)
+        row['rate_per_hour'] = round(row['rate_per_hour'], 3)
+    return jsonify({'sources': rows})
+
+
+@app.route('/api/metrics')
+def metrics():
+    # format tekstowy Prometheusa; ?format=json – podsumowanie ostatniego uruchomienia
+    if request.args.get('format') == 'json':
+        return jsonify(metrics_registry.last_run or {})
+    return Response(metrics_registry.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _export_response(items, fmt: str, compress: bool, headers: dict | None = None) -> Response:
+    mimetype = 'application/gzip' if compress else FORMATS[fmt][0]
+    headers = dict(headers or {})
+    headers['Content-Disposition'] = f'attachment; filename={export_filename(fmt, compress)}'
+    headers['X-Accel-Buffering'] = 'no'
+    return Response(stream_with_context(export_chunks(items, fmt, compress)), mimetype=mimetype, headers=headers)
+
+
+def _export_options() -> tuple[str, bool]:
+    fmt = (request.args.get('format') or 'txt').lower()
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    if fmt.endswith('.gz'):
+        fmt, compress = fmt[:-3], True
+    return fmt, compress
+
+
+@app.route('/api/jobs/<job_id>/export')
+def export_job(job_id):
+    """Eksport wyników zadania strumieniowo: ?format=txt|ndjson|csv, &gzip=1 – skompresowany.
+
+    Artykuły czytane kursorem z archiwum (powiązane z zadaniem przy zapisie),
+    więc eksport działa też po restarcie serwera i po usunięciu zadania z listy.
+    """
+    fmt, compress = _export_options()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Nieznany format: {fmt}", 'formats': sorted(FORMATS)}), 400
+    job = jobs.get(job_id)
+    headers = {'X-Job-Status': job.status} if job is not None else {}
+    try:
+        if articles is not None and articles.has_job(job_id):
+            return _export_response(articles.iter_job(job_id), fmt, compress, headers)
+    except Exception as e:
+        logger.error(f"Export of job {job_id} from article store failed: {e}")
+        return jsonify({'error': 'Błąd podczas exportu'}), 500
+    if job is None:
+        return jsonify({'error': 'Nie ma takiego zadania'}), 404
+    if not job.items:
+        return jsonify({'error': 'Brak danych do exportu', 'status': job.status}), 404
+    # archiwum wyłączone – wyniki z pamięci
+    return _export_response(job.iter_items(), fmt, compress, headers)
+
+
+@app.route('/api/articles/export')
+def export_articles():
+    """Eksport archiwum strumieniowo: filtry jak /api/articles (from, to, source, q), format jak eksport zadania."""
+    if articles is None:
+        return jsonify({'error': 'Archiwum artykułów wyłączone'}), 404
+    fmt, compress = _export_options()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Nieznany format: {fmt}", 'formats': sorted(FORMATS)}), 400
+    try:
+        items = articles.iter_query(date_from=request.args.get('from'), date_to=request.args.get('to'),
+                                    source=request.args.get('source'), q=request.args.get('q'))
+    except Exception as e:
+        logger.error(f"Article export failed: {e}")
+        return jsonify({'error': 'Błąd zapytania'}), 400
+    return _export_response(items, fmt, compress)
 
 
 @app.route('/api/export', methods=['POST'])
 def export_to_txt():
-    """Export current news items to TXT format and download"""
+    """Export posted news items (starsze UI); zalecane: GET /api/jobs/<id>/export lub /api/articles/export"""
     try:
         data = request.json or []
         if not data:
             return jsonify({'error': 'Brak danych do exportu'}), 400
-        
-        # Format: Title | Date | Original Content | AI Content | Link
-        txt_content = "EXPORT AKTUALNOŚCI\n"
-        txt_content += "=" * 80 + "\n\n"
-        
-        for idx, item in enumerate(data, 1):
-            txt_content += f"{idx}. {item.get('tytuł', 'Brak tytułu')}\n"
-            txt_content += f"   Data: {item.get('data', '—')}\n"
-            txt_content += f"   Link: {item.get('link', '—')}\n"
-            txt_content += f"\n   Treść (AI):\n   {item.get('gemini_tresc', item.get('treść', '—')).replace(chr(10), chr(10) + '   ')}\n"
-            txt_content += "\n" + "-" * 80 + "\n\n"
-        
-        # Create filename with date
-        from datetime import datetime as dt
-        filename = f"aktualnosci_{dt.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        
-        return Response(
-            txt_content,
-            mimetype='text/plain',
-            headers={'Content-Disposition': f'attachment; filename={filename}'}
-        )
+        fmt, compress = _export_options()
+        if fmt not in FORMATS:
+            return jsonify({'error': f"Nieznany format: {fmt}", 'formats': sorted(FORMATS)}), 400
+        return _export_response(data, fmt, compress)
     except Exception as e:
         logger.error(f"Export failed: {e}")
         return jsonify({'error': 'Błąd podczas exportu'}), 500
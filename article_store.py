@@ -0,0 +1,302 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from http_cache import normalize_url
+from search import ANALYZER_VERSION, analyze, parse_query
+from sqlite_store import BUSY_TIMEOUT, open_store, store_from_config
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+# wagi bm25 kolumn indeksu: tytuł, treść, streszczenie
+BM25_WEIGHTS = (5.0, 1.0, 2.0)
+
+
+class ArticleStore:
+    """Trwałe archiwum artykułów (SQLite) z indeksem wyszukiwania FTS5.
+
+    Każdy artykuł jest zapisywany przyrostowo (upsert po znormalizowanym
+    URL-u, streszczenie nie jest nadpisywane pustym). Indeksy po dacie
+    i źródle obsługują stronicowane /api/articles. Indeks FTS5 (tytuł,
+    treść, streszczenie) przechowuje tekst po analizie `search.analyze`
+    (bez polskich znaków, tematy słów), więc „maturze” znajduje „matura”;
+    zmiana ANALYZER_VERSION przebudowuje go przy otwarciu. Bez FTS5
+    w SQLite: filtr LIKE. Tabela job_articles wiąże artykuły z zadaniem
+    (/api/jobs), które je dostarczyło – eksport wyników zadania nie zależy
+    od obiektu zadania w pamięci serwera.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS articles ('
+            ' id INTEGER PRIMARY KEY,'
+            ' url TEXT NOT NULL UNIQUE,'
+            ' link TEXT NOT NULL,'
+            ' source TEXT NOT NULL,'
+            ' title TEXT,'
+            ' content TEXT,'
+            ' summary TEXT,'
+            ' article_date TEXT,'
+            ' links TEXT,'
+            ' first_seen REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_date ON articles(article_date)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_source_date ON articles(source, article_date)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_articles ('
+            ' job_id TEXT NOT NULL,'
+            ' article_id INTEGER NOT NULL,'
+            ' added_at REAL NOT NULL,'
+            ' PRIMARY KEY (job_id, article_id))'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.fts = self._create_fts()
+        self._conn.commit()
+        self.written = 0
+
+    def _create_fts(self) -> bool:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'analyzer'").fetchone()
+        rebuild = row is None or row[0] != ANALYZER_VERSION
+        try:
+            if rebuild:
+                # indeks z inną analizą tekstu (albo dawny indeks external content z triggerami)
+                for trigger in ('articles_ai', 'articles_ad', 'articles_au'):
+                    self._conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                self._conn.execute('DROP TABLE IF EXISTS articles_fts')
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, content, summary, tokenize='unicode61')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite without FTS5, article search falls back to LIKE: {e}")
+            return False
+        if rebuild:
+            rows = self._conn.execute('SELECT id, title, content, summary FROM articles').fetchall()
+            self._conn.executemany(
+                'INSERT INTO articles_fts (rowid, title, content, summary) VALUES (?, ?, ?, ?)',
+                ((r[0], analyze(r[1]), analyze(r[2]), analyze(r[3])) for r in rows)
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('analyzer', ?)", (ANALYZER_VERSION,))
+            if rows:
+                logger.info(f"Article search index rebuilt: {len(rows)} articles")
+        return True
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, state_dir: str) -> 'ArticleStore | None':
+        return store_from_config(lambda path, c: cls(path), cfg, state_dir, 'article_store', 'ARTICLE_STORE',
+                                 'articles.sqlite', 'Article store')
+
+    def upsert(self, item: dict, source: str, job_id: str | None = None) -> None:
+        link = item.get('link') or ''
+        links = item.get('linki')
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO articles (url, link, source, title, content, summary, article_date, links, first_seen, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(url) DO UPDATE SET'
+                '  link = excluded.link, source = excluded.source, title = excluded.title,'
+                '  content = excluded.content, summary = COALESCE(excluded.summary, articles.summary),'
+                '  article_date = excluded.article_date, links = COALESCE(excluded.links, articles.links),'
+                '  updated_at = excluded.updated_at',
+                (normalize_url(link), link, source, item.get('tytuł'), item.get('treść'), item.get('gemini_tresc'),
+                 item.get('data'), json.dumps(links, ensure_ascii=False) if links else None, now, now)
+            )
+            # streszczenie mogło zostać z poprzedniego zapisu – indeksujemy stan z tabeli
+            row = self._conn.execute('SELECT id, title, content, summary FROM articles WHERE url = ?',
+                                     (normalize_url(link),)).fetchone()
+            if self.fts:
+                self._conn.execute('DELETE FROM articles_fts WHERE rowid = ?', (row[0],))
+                self._conn.execute('INSERT INTO articles_fts (rowid, title, content, summary) VALUES (?, ?, ?, ?)',
+                                   (row[0], analyze(row[1]), analyze(row[2]), analyze(row[3])))
+            if job_id:
+                self._conn.execute('INSERT OR IGNORE INTO job_articles (job_id, article_id, added_at) VALUES (?, ?, ?)',
+                                   (job_id, row[0], now))
+            self._conn.commit()
+            self.written += 1
+
+    def add_link(self, link: str, other_link: str) -> bool:
+        """Dopisuje `other_link` (ta sama historia pod innym adresem) do `linki` zapisanego artykułu."""
+        with self._lock:
+            row = self._conn.execute('SELECT link, links FROM articles WHERE url = ?', (normalize_url(link),)).fetchone()
+            if row is None:
+                return False
+            links = json.loads(row[1]) if row[1] else [row[0]]
+            if other_link not in links:
+                links.append(other_link)
+                self._conn.execute('UPDATE articles SET links = ?, updated_at = ? WHERE url = ?',
+                                   (json.dumps(links, ensure_ascii=False), time.time(), normalize_url(link)))
+                self._conn.commit()
+            return True
+
+    def content(self, link: str) -> str | None:
+        """Treść artykułu – dla rekordów, które zrzuciły ją z pamięci (records.ArticleRecord.spill)."""
+        with self._lock:
+            if self._conn is None:
+                # archiwum już zamknięte (koniec zadania), a wyniki są jeszcze serwowane – krótkie połączenie
+                conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+                try:
+                    row = conn.execute('SELECT content FROM articles WHERE url = ?', (normalize_url(link),)).fetchone()
+                finally:
+                    conn.close()
+            else:
+                row = self._conn.execute('SELECT content FROM articles WHERE url = ?', (normalize_url(link),)).fetchone()
+        return row[0] if row else None
+
+    def _where(self, date_from: str | None, date_to: str | None, source: str | None) -> tuple[list[str], list]:
+        clauses, params = [], []
+        if date_from:
+            clauses.append('a.article_date >= ?')
+            params.append(date_from)
+        if date_to:
+            # daty mogą mieć część czasu – porównanie z końcem dnia
+            clauses.append('a.article_date <= ?')
+            params.append(date_to + '\uffff')
+        if source:
+            clauses.append('a.source = ?')
+            params.append(source)
+        return clauses, params
+
+    def _filter(self, date_from: str | None, date_to: str | None, source: str | None,
+                q: str | None) -> tuple[str, list] | None:
+        """Klauzula WHERE (z parametrami) filtrów archiwum; None, gdy zapytanie nie może niczego dopasować."""
+        clauses, params = self._where(date_from, date_to, source)
+        if q and q.strip():
+            if self.fts:
+                expr = parse_query(q)[0]
+                if not expr:
+                    return None
+                clauses.append('a.id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)')
+                params.append(expr)
+            else:
+                clauses.append('(a.title LIKE ? OR a.content LIKE ? OR a.summary LIKE ?)')
+                params.extend([f'%{q}%'] * 3)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, date_from: str | None = None, date_to: str | None = None, source: str | None = None,
+              q: str | None = None, limit: int = 50, offset: int = 0) -> tuple[int, list[dict]]:
+        """(liczba pasujących, strona artykułów od najnowszych) – w formacie elementów scrapera."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        found = self._filter(date_from, date_to, source, q)
+        if found is None:
+            return 0, []
+        where, params = found
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM articles a{where}', params).fetchone()[0]
+            rows = self._conn.execute(
+                'SELECT a.link, a.source, a.title, a.content, a.summary, a.article_date, a.links FROM articles a'
+                f'{where} ORDER BY a.article_date DESC, a.id DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            ).fetchall()
+        return total, [self._row_item(r) for r in rows]
+
+    def search(self, q: str, date_from: str | None = None, date_to: str | None = None, source: str | None = None,
+               limit: int = 20, offset: int = 0) -> tuple[int, list[dict], set[str]]:
+        """Wyszukiwanie rankingowe (bm25, tytuł ważniejszy): (liczba trafień, strona wyników z 'score', tematy zapytania)."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        expr, terms = parse_query(q)
+        if not expr:
+            return 0, [], terms
+        if not self.fts:
+            total, items = self.query(date_from, date_to, source, q, limit, offset)
+            return total, items, terms
+        clauses, params = self._where(date_from, date_to, source)
+        where = ''.join(' AND ' + c for c in clauses)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        with self._lock:
+            # CROSS JOIN: pętlą zewnętrzną jest zawsze indeks FTS (planer nie zaczyna od filtrów daty/źródła)
+            total = self._conn.execute(
+                'SELECT COUNT(*) FROM articles_fts CROSS JOIN articles a ON a.id = articles_fts.rowid'
+                f' WHERE articles_fts MATCH ?{where}', [expr] + params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                'SELECT a.link, a.source, a.title, a.content, a.summary, a.article_date, a.links,'
+                f' bm25(articles_fts, {weights}) AS rank'
+                ' FROM articles_fts CROSS JOIN articles a ON a.id = articles_fts.rowid'
+                f' WHERE articles_fts MATCH ?{where} ORDER BY rank, a.article_date DESC LIMIT ? OFFSET ?',
+                [expr] + params + [limit, offset]
+            ).fetchall()
+        items = []
+        for r in rows:
+            item = self._row_item(r)
+            # bm25 w SQLite: im mniejszy, tym lepiej
+            item['score'] = round(-r[7], 4)
+            items.append(item)
+        return total, items, terms
+
+    @staticmethod
+    def _row_item(row) -> dict:
+        item = {'tytuł': row[2], 'treść': row[3], 'link': row[0], 'data': row[5], 'source': row[1]}
+        if row[4]:
+            item['gemini_tresc'] = row[4]
+        if row[6]:
+            item['linki'] = json.loads(row[6])
+        return item
+
+    def _iter_rows(self, sql: str, params: list):
+        # własne, krótkie połączenie: kursor czytany w trakcie wysyłania odpowiedzi nie trzyma locka
+        # archiwum, a eksport działa także po zamknięciu głównego połączenia (koniec zadania)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        try:
+            for row in conn.execute(sql, params):
+                yield self._row_item(row)
+        finally:
+            conn.close()
+
+    def has_job(self, job_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM job_articles WHERE job_id = ? LIMIT 1',
+                                      (job_id,)).fetchone() is not None
+
+    def iter_job(self, job_id: str):
+        """Artykuły dostarczone przez zadanie, w kolejności dostarczenia – po jednym (kursor, stała pamięć)."""
+        return self._iter_rows(
+            'SELECT a.link, a.source, a.title, a.content, a.summary, a.article_date, a.links'
+            ' FROM job_articles j JOIN articles a ON a.id = j.article_id WHERE j.job_id = ? ORDER BY j.rowid',
+            [job_id]
+        )
+
+    def iter_query(self, date_from: str | None = None, date_to: str | None = None, source: str | None = None,
+                   q: str | None = None):
+        """Wszystkie artykuły pasujące do filtrów (jak `query`, bez stronicowania) – po jednym."""
+        found = self._filter(date_from, date_to, source, q)
+        if found is None:
+            return iter(())
+        where, params = found
+        return self._iter_rows(
+            'SELECT a.link, a.source, a.title, a.content, a.summary, a.article_date, a.links FROM articles a'
+            f'{where} ORDER BY a.article_date DESC, a.id DESC', params
+        )
+
+    def count_new(self, since: float, source: str | None = None) -> int:
+        """Ile artykułów trafiło do archiwum po raz pierwszy od `since` (opcjonalnie jednego źródła)."""
+        sql = 'SELECT COUNT(*) FROM articles WHERE first_seen >= ?'
+        params: list = [since]
+        if source:
+            sql += ' AND source = ?'
+            params.append(source)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute('SELECT DISTINCT source FROM articles ORDER BY source')]
+
+    def log_report(self) -> None:
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        logger.info(f"Article store: {self.written} written this run, {total} articles stored")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int(os.environ.get(name, str(default)))
+    except Exception:
+        value = default
+    return max(1, value)
+
+
+class AsyncCrawlEngine:
+    """Silnik crawl na asyncio – alternatywa dla ThreadPoolExecutor per listing.
+
+    Wszystkie źródła i listingi są crawlowane jednocześnie. Obowiązuje jeden
+    globalny budżet współbieżnych żądań (SCRAPER_CONCURRENCY), a tempo per
+    domena wyznacza RateLimiter scrapera. Oczekiwanie na token to
+    `asyncio.sleep` – nie zajmuje ani slotu budżetu, ani wątku. Żądania idą
+    przez wspólny HttpClient scrapera (pule keep-alive, cache, retry), a
+    parsowanie HTML przez osobną pulę roboczą (SCRAPER_PARSE_WORKERS).
+    """
+
+    def __init__(self, scraper, concurrency: int | None = None, parse_workers: int | None = None):
+        self.scraper = scraper
+        self.concurrency = concurrency or _env_int('SCRAPER_CONCURRENCY', 24)
+        self.parse_workers = parse_workers or _env_int('SCRAPER_PARSE_WORKERS', os.cpu_count() or 4)
+
+    def run(self, sources: list[dict]) -> None:
+        asyncio.run(self._run(sources))
+
+    async def _run(self, sources: list[dict]) -> None:
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._domain_gates: dict[str, asyncio.Lock] = {}
+        self._io_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl-io')
+        self._parse_pool = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix='crawl-parse')
+        started = time.monotonic()
+        try:
+            results = await asyncio.gather(*(self._crawl_source(src) for src in sources), return_exceptions=True)
+            added = sum(r for r in results if isinstance(r, int))
+            listings = sum(len(src.get('listings') or []) for src in sources)
+            logger.info(f"Async crawl: {listings} listings, added {added} articles in {time.monotonic() - started:.1f}s")
+        finally:
+            self._io_pool.shutdown(wait=True)
+            self._parse_pool.shutdown(wait=True)
+
+    async def _pace(self, url: str) -> None:
+        # token z kubełka domeny; oczekiwanie nie blokuje ani wątku, ani slotu budżetu.
+        # Bramka per domena sprawia, że token jest pobierany tuż przed wysłaniem,
+        # więc 429/Retry-After wpływa także na żądania już czekające w kolejce.
+        domain = urlparse(url).netloc
+        gate = self._domain_gates.setdefault(domain, asyncio.Lock())
+        started = time.perf_counter()
+        async with gate:
+            await self.scraper.rate_limiter.wait_async(url)
+        self.scraper.metrics.observe('rate_limit_wait', time.perf_counter() - started, url)
+
+    async def _fetch(self, url: str, paced: bool = False):
+        if not paced:
+            await self._pace(url)
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            return await loop.run_in_executor(self._io_pool, self.scraper._get, url)
+
+    async def _crawl_source(self, src: dict) -> int:
+        name = src.get('name')
+        loop = asyncio.get_running_loop()
+        if src.get('prefer_feed') and src.get('feed_urls'):
+            try:
+                feed_links = await loop.run_in_executor(self._io_pool, self.scraper.ingest_feeds, src)
+            except Exception as e:
+                logger.error(f"Feed ingestion failed for {name}: {e}")
+                feed_links = None
+            if feed_links is not None:
+                return await self._fetch_links(feed_links, f"feeds of {name}")
+        sitemap_links = []
+        if src.get('sitemap_discovery'):
+            # sitemapy przed listingami: lastmod odsiewa też nieaktualne linki z listingów
+            try:
+                sitemap_links = await loop.run_in_executor(self._io_pool, self.scraper.discover_from_sitemaps, src)
+            except Exception as e:
+                logger.error(f"Sitemap discovery failed for {name}: {e}")
+        tasks = [self._crawl_listing(name, list_url, src.get('allow_substrings') or None, src.get('allow_regex') or None,
+                                     src.get('pagination'))
+                 for list_url in (src.get('listings') or [])]
+        if sitemap_links:
+            tasks.append(self._crawl_links(sitemap_links, f"sitemaps of {name}"))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return sum(r for r in results if isinstance(r, int))
+
+    async def _crawl_listing(self, name: str, list_url: str, allow_substrings, allow_regex, pagination=None) -> int:
+        # jak NewsScraper.crawl_from_listing: następna strona pobierana w trakcie przetwarzania bieżącej
+        loop = asyncio.get_running_loop()
+        scraper = self.scraper
+        opts = scraper._pagination_opts(pagination)
+        seen: set[str] = set()
+        found: list[str] = []
+        fingerprint, known = None, set()
+        added = 0
+        page_url, page_index = list_url, 0
+        pending = None
+        try:
+            r = await self._fetch(list_url)
+            while True:
+                links, next_url = await loop.run_in_executor(
+                    self._parse_pool, scraper._listing_step, list_url, page_url, page_index, r,
+                    allow_substrings, allow_regex, opts, seen
+                )
+                if links is None:
+                    break
+                if page_index == 0:
+                    # odczyt rejestru (SQLite) poza pętlą zdarzeń – inne źródła nie czekają
+                    fingerprint, known, unchanged = await loop.run_in_executor(
+                        self._io_pool, scraper._check_listing, list_url, links
+                    )
+                    if unchanged is not None:
+                        return await self._crawl_links(unchanged, f"{list_url} ({name})", known)
+                found.extend(links)
+                pending = asyncio.ensure_future(self._fetch(next_url)) if next_url else None
+                if pending is not None:
+                    # odrzucona (niepotrzebna) strona nie zgłasza „exception was never retrieved”
+                    pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+                added += await self._crawl_links(links, f"{page_url} ({name})", known)
+                if pending is None or scraper.cancelled() or scraper._page_is_old(list_url, page_index, links):
+                    break
+                r = await pending
+                pending = None
+                page_url, page_index = next_url, page_index + 1
+            await loop.run_in_executor(self._io_pool, scraper._record_listing, list_url, fingerprint, found, known)
+        except Exception as e:
+            logger.error(f"Crawl failed for {page_url}: {e}")
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+        return added
+
+    async def _crawl_links(self, links: list[str], origin: str, known: set[str] | None = None) -> int:
+        # rejestr crawla, deduplikacja i zapis odtworzonych artykułów blokują – w puli I/O
+        loop = asyncio.get_running_loop()
+        try:
+            links, added = await loop.run_in_executor(self._io_pool, self.scraper._filter_known_links, links, known)
+        except Exception as e:
+            logger.error(f"Crawl failed for {origin}: {e}")
+            return 0
+        return await self._fetch_links(links, origin, added)
+
+    async def _fetch_links(self, links: list[str], origin: str, added: int = 0) -> int:
+        try:
+            results = await asyncio.gather(*(self._process_article(link) for link in links))
+            added += sum(1 for ok in results if ok)
+            logger.info(f"Crawl from {origin}: added {added} articles")
+            return added
+        except Exception as e:
+            logger.error(f"Crawl failed for {origin}: {e}")
+            return 0
+
+    async def _process_article(self, url: str) -> bool:
+        if self.scraper.cancelled():
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            await self._pace(url)
+            if self.scraper.cancelled():
+                return False
+            resp = await self._fetch(url, paced=True)
+        except Exception as e:
+            logger.debug(f"Skip article {url}: {e}")
+            await loop.run_in_executor(self._io_pool, self.scraper._record_outcome, url, 'error', {})
+            return False
+        return await loop.run_in_executor(self._parse_pool, self.scraper._handle_article_response, url, resp)
@@ -0,0 +1,133 @@
+"""Benchmark parsowania strony artykułu: ścieżka klasyczna vs. jednoprzebiegowa.
+
+  przed: BeautifulSoup(html.parser) + dawne metody NewsScraper (bench/legacy_extraction.py:
+         extract_date, is_probably_article, extract_title_and_content – wielokrotne find/select)
+  po:    make_soup (lxml, jeśli dostępny) + PageExtract (jedno przejście)
+
+Uruchomienie (z katalogu repozytorium):
+    python bench/bench_parse.py [--pages N] [--config configs/sources.yaml] [--json wynik.json]
+
+Reguły źródeł są kompilowane wprost z configu (RuleSet) – bez NewsScrapera,
+więc benchmark nie otwiera magazynów w state_dir ani puli procesów.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+import extraction  # noqa: E402
+import legacy_extraction  # noqa: E402
+from rules import RuleSet  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_page(i: int) -> tuple[str, str]:
+    """Strona o strukturze zbliżonej do artykułu edunews (Joomla): dużo chrome, długa treść."""
+    menu = ''.join(f'<li><a href="/kat-{k}">Kategoria {k}</a></li>' for k in range(60))
+    body = ''.join(
+        f'<p>Akapit {j} artykułu {i}. Ministerstwo Edukacji ogłosiło zmiany w podstawie programowej. '
+        f'Nauczyciele i dyrektorzy szkół komentują projekt. Konsultacje potrwają do końca miesiąca.</p>'
+        for j in range(25)
+    )
+    related = ''.join(f'<div class="item"><a href="/a/{k}-x">Powiązany {k}</a><p>Zajawka {k}.</p></div>' for k in range(30))
+    html = (
+        '<html><head><title>Artykuł testowy</title>'
+        '<meta property="og:type" content="article">'
+        '<meta property="article:published_time" content="2025-09-10T08:00:00+02:00">'
+        + ''.join(f'<script>var x{k} = {k};</script>' for k in range(10)) +
+        '</head><body>'
+        f'<header><nav><ul class="menu">{menu}</ul></nav></header>'
+        '<div class="breadcrumbs"><a href="/">Start</a> / <a href="/aktualnosci">Aktualności</a></div>'
+        '<main><article><h1>Zmiany w podstawie programowej od września</h1>'
+        f'<div class="itemFullText">{body}<ul><li>punkt 1.</li><li>punkt 2.</li></ul></div>'
+        f'</article><aside class="sidebar">{related}</aside></main>'
+        '<footer><p>© 2025 Edunews, kontakt: 01/02/2024</p><form><input name="q"></form></footer>'
+        '</body></html>'
+    )
+    return f'https://edunews.pl/system-edukacji/{7000 + i}-artykul', html
+
+
+def load_rules(config_path: str) -> RuleSet:
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return RuleSet.from_config(yaml.safe_load(f) or {})
+
+
+def run_before(rules: RuleSet, url: str, html: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    src_rules = rules.for_url(url)
+    return (legacy_extraction.extract_date(soup, src_rules), legacy_extraction.is_probably_article(soup),
+            legacy_extraction.extract_title_and_content(soup, src_rules))
+
+
+def run_after(rules: RuleSet, url: str, html: str):
+    page = extraction.PageExtract(extraction.make_soup(html), url, rules.for_url(url))
+    return page.date(), page.is_article(), page.title_and_content()
+
+
+def measure(fn, pages, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        for url, html in pages:
+            t0 = time.process_time()
+            fn(url, html)
+            samples.append(time.process_time() - t0)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        'pages': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+
+def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--pages', type=int, default=30)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--config', default=os.path.join(ROOT, 'configs', 'sources.yaml'))
+    ap.add_argument('--json', help='zapisz wynik do pliku JSON')
+    args = ap.parse_args(argv)
+
+    rules = load_rules(args.config)
+    pages = [synthetic_page(i) for i in range(args.pages)]
+    # rozgrzewka + kontrola, że obie ścieżki dają ten sam wynik
+    for url, html in pages[:3]:
+        if run_before(rules, url, html) != run_after(rules, url, html):
+            print(f"WARNING: extraction results differ for {url}", file=sys.stderr)
+
+    before = summarize(measure(lambda u, h: run_before(rules, u, h), pages, args.repeat))
+    after = summarize(measure(lambda u, h: run_after(rules, u, h), pages, args.repeat))
+    result = {
+        'benchmark': 'parse_article',
+        'parser_after': extraction.html_parser_name(),
+        'page_bytes': len(pages[0][1].encode('utf-8')),
+        'before': before,
+        'after': after,
+        'speedup': round(before['mean_ms'] / after['mean_ms'], 2) if after['mean_ms'] else None,
+    }
+    print(f"page size: {result['page_bytes'] / 1024:.1f} KB, parser after: {result['parser_after']}")
+    for name in ('before', 'after'):
+        r = result[name]
+        print(f"{name:>6}: mean {r['mean_ms']:.2f} ms  p50 {r['p50_ms']:.2f} ms  p95 {r['p95_ms']:.2f} ms  ({r['pages']} pages)")
+    print(f"speedup: {result['speedup']}x CPU per page")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == '__main__':
+    main()
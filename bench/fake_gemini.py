@@ -0,0 +1,46 @@
+"""Atrapa modelu Gemini dla benchmarków: stałe opóźnienie, okresowe 429, odpowiedzi w formacie promptu."""
+import json
+import re
+import threading
+import time
+
+from google.api_core import exceptions as gexc
+
+_BATCH_ID_RE = re.compile(r'### ARTYKUŁ id=(\d+)')
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Zastępuje genai.GenerativeModel: `generate_content(prompt, generation_config=None)`.
+
+    latency        – czas „generowania” na wywołanie (sekundy)
+    quota_every    – co N-te wywołanie kończy się ResourceExhausted (0 = nigdy)
+    """
+
+    def __init__(self, latency: float = 0.2, quota_every: int = 0):
+        self.latency = latency
+        self.quota_every = quota_every
+        self.calls = 0
+        self.quota_errors = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, generation_config=None) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        if self.quota_every and n % self.quota_every == 0:
+            with self._lock:
+                self.quota_errors += 1
+            raise gexc.ResourceExhausted('429 Resource has been exhausted (fake)')
+        ids = _BATCH_ID_RE.findall(prompt)
+        if ids:
+            return FakeResponse(json.dumps([{'id': int(i), 'gemini_tresc': f'Streszczenie artykułu {i}.'} for i in ids],
+                                           ensure_ascii=False))
+        return FakeResponse(json.dumps({'gemini_tresc': 'Pierwszy akapit streszczenia.\n\nDrugi akapit streszczenia.'},
+                                       ensure_ascii=False))
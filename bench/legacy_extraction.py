@@ -0,0 +1,116 @@
+"""Dawna ekstrakcja strony artykułu (metody NewsScraper sprzed extraction.PageExtract).
+
+Tylko do porównania „przed” w bench/bench_parse.py: wielokrotne find/select
+po całym drzewie, czyszczenie chrome przez decompose. Produkcja używa
+extraction.PageExtract. `rules` – reguły źródła (rules.SourceRules).
+"""
+import re
+
+from bs4 import BeautifulSoup
+from dateutil import parser
+
+META_DATE_ATTRS = [
+    {'property': 'article:published_time'},
+    {'property': 'article:modified_time'},
+    {'property': 'og:published_time'},
+    {'property': 'og:updated_time'},
+    {'name': 'date'},
+    {'name': 'pubdate'},
+    {'itemprop': 'datePublished'},
+    {'itemprop': 'dateModified'}
+]
+
+
+def extract_date(soup: BeautifulSoup, rules):
+    # 1) Meta daty (kilka wariantów)
+    for attrs in META_DATE_ATTRS:
+        meta_time = soup.find('meta', attrs=attrs)
+        if meta_time and meta_time.get('content'):
+            try:
+                return parser.parse(meta_time['content'])
+            except Exception:
+                continue
+
+    # 2) <time datetime> lub tekst w <time>
+    for time_tag in soup.find_all('time'):
+        dt_val = time_tag.get('datetime') or time_tag.get('content') or time_tag.get_text(strip=True)
+        if not dt_val:
+            continue
+        try:
+            return parser.parse(dt_val, dayfirst=True)
+        except Exception:
+            continue
+
+    # 3) Daty w tekście – formaty źródła w jednym przebiegu (rules.DateRules)
+    return rules.dates.search(soup.get_text(' ', strip=True))
+
+
+def is_probably_article(soup: BeautifulSoup) -> bool:
+    # Check OpenGraph type
+    og_type = soup.find('meta', attrs={'property': 'og:type'})
+    if og_type and 'article' in (og_type.get('content') or '').lower():
+        return True
+    # Schema.org Article
+    if soup.find(attrs={'itemtype': re.compile('Article', re.I)}):
+        return True
+    # Presence of <article> with h1 and multiple paragraphs
+    art = soup.find('article')
+    if art:
+        has_h1 = art.find('h1') is not None
+        num_p = len(art.find_all('p'))
+        if has_h1 and num_p >= 3:
+            return True
+    # Fallback: main with multiple paragraphs
+    main = soup.find('main')
+    if main and len(main.find_all('p')) >= 3:
+        return True
+    # Some WP/Drupal use class names
+    if soup.find('div', class_=re.compile('(entry-content|article-body|field--name-body)', re.I)):
+        return True
+    return False
+
+
+def clean_soup(soup: BeautifulSoup) -> None:
+    # remove scripts/styles and common chrome
+    for sel in ['script', 'style', 'noscript', 'iframe', 'form']:
+        for el in soup.select(sel):
+            el.decompose()
+    chrome_selectors = [
+        'header', 'footer', 'nav', 'aside', '.breadcrumb', '.breadcrumbs',
+        '.menu', '.navbar', '.sidebar', '.pagination', '.pager', '.cookie', '.cookies'
+    ]
+    for sel in chrome_selectors:
+        for el in soup.select(sel):
+            el.decompose()
+
+
+def extract_main_text(soup: BeautifulSoup, rules) -> str:
+    clean_soup(soup)
+    # Try candidates (skompilowane reguły źródła)
+    for tag, pattern, itemprop in rules.content:
+        if itemprop is not None:
+            node = soup.find(tag, attrs={'itemprop': itemprop})
+        elif pattern is not None:
+            node = soup.find(tag, class_=pattern)
+        else:
+            node = soup.find(tag)
+        if node:
+            parts = []
+            parts.extend(p.get_text(strip=True) for p in node.find_all('p'))
+            parts.extend(li.get_text(strip=True) for li in node.find_all('li'))
+            text = '\n\n'.join([t for t in parts if t])
+            if len(text) > 400 and text.count('.') >= 3:
+                return text
+    # Generic fallback: all paragraphs under article/main/body
+    scope = soup.find('article') or soup.find('main') or soup
+    paras = scope.find_all(['p', 'li']) if scope else soup.find_all(['p', 'li'])
+    text = '\n\n'.join(el.get_text(strip=True) for el in paras)
+    return text
+
+
+def extract_title_and_content(soup: BeautifulSoup, rules):
+    # Title
+    title_elem = soup.find('h1') or soup.find('title')
+    title = title_elem.get_text(strip=True) if title_elem else 'Brak tytułu'
+    content = extract_main_text(soup, rules)
+    return title, content
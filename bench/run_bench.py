@@ -0,0 +1,290 @@
+"""Offline benchmark ścieżek crawl → parsowanie → streszczenie.
+
+Bez sieci i bez klucza API: strony źródeł serwuje lokalny serwer zastępczy
+(bench/standin.py, fixtures w bench/fixtures/), a Gemini – atrapa z
+stałym opóźnieniem (bench/fake_gemini.py). Mierzone osobno:
+
+  crawl_from_listing        zimny crawl listingu (bez HttpCache i rejestru)
+  crawl_from_listing_warm   drugi crawl z HttpCache + rejestrem URL-i
+  _process_article          pobranie + ocena pojedynczego artykułu
+  make_soup                 parsowanie HTML artykułu
+  PageExtract               jedno przejście po gotowym drzewie (sygnały, kandydaci treści)
+  PageExtract.date          data z wyniku przejścia
+  PageExtract.title_and_content  tytuł i treść (usunięcie chrome, wybór kontenera)
+  enrich_with_gemini        streszczenie N artykułów (atrapa modelu)
+
+Dla każdego etapu: liczba wywołań, strony (elementy)/s, p50/p95 czasu
+wywołania; dla całości szczytowe RSS. Wynik (JSON) trafia do
+bench/results/<commit>.json, a `--compare` wypisuje różnice względem
+wcześniejszego wyniku.
+
+Uruchomienie (z katalogu repozytorium):
+    python bench/run_bench.py [--repeat 3] [--latency 0.02] [--compare bench/results/abc1234.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml  # noqa: E402
+
+import extraction  # noqa: E402
+from fake_gemini import FakeGeminiModel  # noqa: E402
+from news_scraper import NewsScraper  # noqa: E402
+from standin import route_scraper, start_servers  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'bench', 'results')
+# etapy porównywane przez --compare (czas: mniej = lepiej, przepustowość: więcej = lepiej)
+COMPARE_FIELDS = (('p50_ms', -1), ('p95_ms', -1), ('per_sec', 1))
+
+
+def git_commit() -> tuple[str, bool]:
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return sha, dirty
+    except Exception:
+        return 'unknown', False
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: bajty
+    return round(rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024, 1)
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Stage:
+    """Próbki czasu wywołań jednego etapu + liczba przetworzonych jednostek (stron, artykułów)."""
+
+    def __init__(self, name: str, unit: str = 'pages'):
+        self.name = name
+        self.unit = unit
+        self.samples: list[float] = []
+        self.units = 0
+
+    def time(self, fn, *args, units: int = 1, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.samples.append(time.perf_counter() - t0)
+            self.units += units
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        total = sum(ordered)
+        return {
+            'calls': len(ordered),
+            'unit': self.unit,
+            'units': self.units,
+            'total_s': round(total, 4),
+            'per_sec': round(self.units / total, 2) if total else None,
+            'p50_ms': round(percentile(ordered, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def bench_config(path: str, rps: float, burst: int) -> dict:
+    """Config źródeł z repozytorium z limitem zapytań ustawionym na potrzeby pomiaru."""
+    with open(path, 'r', encoding='utf-8') as f:
+        cfg = yaml.safe_load(f) or {}
+    for src in cfg.get('sources') or []:
+        src['rate_limit_rps'] = rps
+        src['rate_limit_burst'] = burst
+    return cfg
+
+
+def new_scraper(config_path: str, servers, caches: bool) -> NewsScraper:
+    flag = '1' if caches else '0'
+    os.environ['HTTP_CACHE'] = flag
+    os.environ['CRAWL_STATE'] = flag
+    os.environ['SUMMARY_CACHE'] = '0'
+    scraper = NewsScraper(config_path)
+    route_scraper(scraper, servers)
+    return scraper
+
+
+def served_pages(servers) -> int:
+    return sum(s.hits['200'] + s.hits['304'] for s in servers)
+
+
+def run_crawl(stage: Stage, scraper: NewsScraper, cfg: dict, servers) -> None:
+    for src in cfg.get('sources') or []:
+        for list_url in src.get('listings') or []:
+            before = served_pages(servers)
+            t0 = time.perf_counter()
+            scraper.crawl_from_listing(list_url, allow_substrings=src.get('allow_substrings') or None,
+                                       allow_regex=src.get('allow_regex') or None, pagination=src.get('pagination'))
+            stage.samples.append(time.perf_counter() - t0)
+            stage.units += served_pages(servers) - before
+
+
+def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--config', default=os.path.join(ROOT, 'configs', 'sources.yaml'))
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--latency', type=float, default=0.02, help='opóźnienie serwera zastępczego (s)')
+    ap.add_argument('--jitter', type=float, default=0.01, help='losowy dodatek do opóźnienia (s)')
+    ap.add_argument('--throttle-every', type=int, default=0, help='co N-te żądanie odpowiada 429 (0 = nigdy)')
+    ap.add_argument('--rps', type=float, default=200.0, help='rate_limit_rps źródeł w benchmarku')
+    ap.add_argument('--burst', type=int, default=20)
+    ap.add_argument('--gemini-latency', type=float, default=0.05)
+    ap.add_argument('--gemini-quota-every', type=int, default=0)
+    ap.add_argument('--enrich-items', type=int, default=40)
+    ap.add_argument('--out', help='plik wyniku (domyślnie bench/results/<commit>.json)')
+    ap.add_argument('--compare', help='wcześniejszy wynik JSON do porównania')
+    ap.add_argument('--verbose', action='store_true', help='nie wyciszaj logów scrapera')
+    args = ap.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    # fallback Gemini z NewsScraper nie może sięgnąć po prawdziwy model
+    for key in ('GOOGLE_API_KEY', 'GEMINI_API_KEY'):
+        os.environ.pop(key, None)
+    state_dir = tempfile.mkdtemp(prefix='bench-state-')
+    os.environ['SCRAPER_STATE_DIR'] = state_dir
+
+    cfg = bench_config(args.config, args.rps, args.burst)
+    cfg['sources'] = [s for s in cfg.get('sources') or []
+                      if os.path.isdir(os.path.join(ROOT, 'bench', 'fixtures', s.get('name', '')))]
+    config_path = os.path.join(state_dir, 'sources.yaml')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(cfg, f, allow_unicode=True)
+
+    servers = start_servers(cfg['sources'], latency=args.latency, jitter=args.jitter,
+                            throttle_every=args.throttle_every)
+    stages: dict[str, Stage] = {}
+    try:
+        # crawl na zimno: każde powtórzenie to nowy scraper bez cache
+        stage = stages['crawl_from_listing'] = Stage('crawl_from_listing')
+        for _ in range(args.repeat):
+            scraper = new_scraper(config_path, servers, caches=False)
+            run_crawl(stage, scraper, cfg, servers)
+            scraper.close()
+
+        # crawl „na ciepło”: pierwszy przebieg wypełnia cache, mierzone kolejne
+        stage = stages['crawl_from_listing_warm'] = Stage('crawl_from_listing_warm')
+        scraper = new_scraper(config_path, servers, caches=True)
+        run_crawl(Stage('prime'), scraper, cfg, servers)
+        scraper.close()
+        for _ in range(args.repeat):
+            scraper = new_scraper(config_path, servers, caches=True)
+            run_crawl(stage, scraper, cfg, servers)
+            scraper.close()
+
+        stage = stages['_process_article'] = Stage('_process_article')
+        scraper = new_scraper(config_path, servers, caches=False)
+        article_urls = [s.site.url(p) for s in servers for p in s.site.article_paths()]
+        for _ in range(args.repeat):
+            for url in article_urls:
+                stage.time(scraper._process_article, url)
+        scraper.close()
+
+        pages = [page for s in servers for page in s.site.html_pages()]
+        scraper = new_scraper(config_path, servers, caches=False)
+        soup_stage = stages['make_soup'] = Stage('make_soup')
+        # ścieżka produkcyjna (parse_pool.evaluate_page); dawna ekstrakcja – tylko w bench_parse.py
+        page_stage = stages['PageExtract'] = Stage('PageExtract')
+        date_stage = stages['PageExtract.date'] = Stage('PageExtract.date')
+        text_stage = stages['PageExtract.title_and_content'] = Stage('PageExtract.title_and_content')
+        for _ in range(args.repeat):
+            for url, html in pages:
+                soup = soup_stage.time(extraction.make_soup, html)
+                page = page_stage.time(extraction.PageExtract, soup, url, scraper.rules.for_url(url))
+                date_stage.time(page.date)
+                text_stage.time(page.title_and_content)
+
+        # streszczenia: artykuły z fixtures powielone do --enrich-items, atrapa modelu
+        base_items = list(scraper.news_items)
+        if not base_items:
+            base_items = [{'tytuł': f'Artykuł {i}', 'treść': html, 'link': url, 'data': None}
+                          for i, (url, html) in enumerate(pages)]
+        stage = stages['enrich_with_gemini'] = Stage('enrich_with_gemini', unit='items')
+        model = FakeGeminiModel(latency=args.gemini_latency, quota_every=args.gemini_quota_every)
+        for _ in range(args.repeat):
+            scraper.news_items = [dict(base_items[i % len(base_items)], link=f"{base_items[i % len(base_items)]['link']}#{i}")
+                                  for i in range(args.enrich_items)]
+            scraper.genai_model = model
+            stage.time(scraper.enrich_with_gemini, units=len(scraper.news_items))
+        scraper.close()
+    finally:
+        for server in servers:
+            server.stop()
+
+    sha, dirty = git_commit()
+    result = {
+        'benchmark': 'offline',
+        'commit': sha,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'html_parser': extraction.html_parser_name(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'verbose', 'config')},
+        'stages': {name: st.summary() for name, st in stages.items()},
+        'server_hits': {s.site.name: dict(s.hits) for s in servers},
+        'gemini_calls': model.calls,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+    print_report(result)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print_compare(baseline, result)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{sha}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\nresult: {out}")
+    return result
+
+
+def print_report(result: dict) -> None:
+    print(f"commit {result['commit']}{' (dirty)' if result['dirty'] else ''}, parser {result['html_parser']}, "
+          f"peak RSS {result['peak_rss_mb']} MB")
+    print(f"{'stage':<32}{'calls':>7}{'units/s':>12}{'p50 ms':>11}{'p95 ms':>11}")
+    for name, s in result['stages'].items():
+        per_sec = f"{s['per_sec']:.1f}" if s['per_sec'] is not None else '-'
+        print(f"{name:<32}{s['calls']:>7}{per_sec:>12}{s['p50_ms']:>11.2f}{s['p95_ms']:>11.2f}")
+
+
+def print_compare(baseline: dict, result: dict) -> None:
+    print(f"\nvs {baseline.get('commit')} (+ = lepiej)")
+    for name, s in result['stages'].items():
+        old = (baseline.get('stages') or {}).get(name)
+        if not old:
+            continue
+        parts = []
+        for field, direction in COMPARE_FIELDS:
+            a, b = old.get(field), s.get(field)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100 * direction
+            parts.append(f"{field} {change:+.1f}%")
+        print(f"{name:<32}" + '  '.join(parts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Lokalny serwer zastępczy dla benchmarków: serwuje fixtures z bench/fixtures/<źródło>/.
+
+Każde źródło dostaje własny serwer (osobny port), a `route_scraper` kieruje
+żądania NewsScrapera do prawdziwych base_url (https://edunews.pl/...) na ten
+serwer. Adresy, domeny w rate limiterze i reguły ekstrakcji per domena
+zostają więc takie jak w produkcji – zmienia się tylko transport.
+
+Fixtures odwzorowują strukturę stron źródeł (Joomla/K2 – edunews, Drupal –
+frse, WordPress – ibe): listing, artykuły w oknie i poza nim, strona
+kategorii, robots.txt i sitemapy. Po zmianie układu strony źródła warto
+podmienić plik na zapisaną kopię prawdziwej strony.
+
+  routes.json   ścieżka URL (opcjonalnie z query) -> plik
+  *.html/*.xml  treść; `{{date:-N:FORMAT}}` = dziś minus N dni (strftime),
+                `{{base}}` = base_url źródła (np. dla <loc> w sitemapach)
+
+Serwer symuluje opóźnienie sieci (latency + jitter), co N-te żądanie
+odpowiada 429 z Retry-After, a przy zgodnym If-None-Match – 304.
+"""
+import hashlib
+import http.server
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(?:date:(-?\d+):([^}]+)|base)\}\}')
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.xml': 'application/xml; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+}
+
+
+class FixtureSite:
+    """Strony jednego źródła z katalogu fixtures, z podstawionymi datami względem dziś."""
+
+    def __init__(self, name: str, base_url: str, fixtures_dir: str = FIXTURES_DIR, today: date | None = None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.dir = os.path.join(fixtures_dir, name)
+        self.today = today or date.today()
+        with open(os.path.join(self.dir, 'routes.json'), 'r', encoding='utf-8') as f:
+            self.routes: dict[str, str] = json.load(f)
+        self._pages: dict[str, tuple[bytes, str]] = {}
+        for path, filename in self.routes.items():
+            with open(os.path.join(self.dir, filename), 'r', encoding='utf-8') as f:
+                body = self._render(f.read()).encode('utf-8')
+            ctype = CONTENT_TYPES.get(os.path.splitext(filename)[1], 'application/octet-stream')
+            self._pages[path] = (body, ctype)
+
+    def _render(self, text: str) -> str:
+        def sub(m):
+            if m.group(1) is None:
+                return self.base_url
+            return (self.today + timedelta(days=int(m.group(1)))).strftime(m.group(2))
+        return _PLACEHOLDER_RE.sub(sub, text)
+
+    def page(self, path: str) -> tuple[bytes, str] | None:
+        return self._pages.get(path)
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def article_paths(self) -> list[str]:
+        return [p for p, fn in self.routes.items() if fn.startswith('article_')]
+
+    def html_pages(self, prefix: str = 'article_') -> list[tuple[str, str]]:
+        """(prawdziwy URL, HTML) dla plików o danym prefiksie – wejście benchmarków parsowania."""
+        return [(self.url(p), self._pages[p][0].decode('utf-8'))
+                for p, fn in self.routes.items() if fn.startswith(prefix)]
+
+
+class StandInServer:
+    """ThreadingHTTPServer na 127.0.0.1 serwujący jeden FixtureSite."""
+
+    def __init__(self, site: FixtureSite, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_every: int = 0, retry_after: int = 1, seed: int = 0):
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.hits = {'requests': 0, '200': 0, '304': 0, '404': 0, '429': 0}
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def netloc(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f'standin-{self.site.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_hits(self) -> None:
+        with self._lock:
+            for key in self.hits:
+                self.hits[key] = 0
+
+    def _count(self, key: str) -> int:
+        with self._lock:
+            self.hits[key] += 1
+            return self.hits['requests']
+
+    def _delay(self) -> float:
+        if not self.latency and not self.jitter:
+            return 0.0
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + extra
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # nagłówki i treść idą osobnymi zapisami – bez TCP_NODELAY Nagle + delayed ACK dokłada ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                n = server._count('requests')
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+                if server.throttle_every and n % server.throttle_every == 0:
+                    server._count('429')
+                    self._empty(429, {'Retry-After': str(server.retry_after)})
+                    return
+                # najpierw ścieżka z query (np. paginacja ?start=20), potem sama ścieżka
+                page = server.site.page(self.path) or server.site.page(urlsplit(self.path).path)
+                if page is None:
+                    server._count('404')
+                    self._empty(404)
+                    return
+                body, ctype = page
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    server._count('304')
+                    self._empty(304, {'ETag': etag})
+                    return
+                server._count('200')
+                self.send_response(200)
+                self.send_header('Content-Type', ctype)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _empty(self, status: int, headers: dict | None = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class _RewriteAdapter(HTTPAdapter):
+    """Adapter wysyłający żądania do serwera zastępczego; odpowiedź zachowuje oryginalny URL."""
+
+    def __init__(self, target_netloc: str, **kwargs):
+        self.target_netloc = target_netloc
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        original = request.url
+        sp = urlsplit(original)
+        request.url = urlunsplit(('http', self.target_netloc, sp.path, sp.query, sp.fragment))
+        resp = super().send(request, **kwargs)
+        resp.url = original
+        request.url = original
+        return resp
+
+
+def route_scraper(scraper, servers: list[StandInServer]) -> None:
+    """Podmienia adaptery HttpClient dla base_url źródeł na przekierowujące do serwerów zastępczych.
+
+    Pule i retry pozostają jak w konfiguracji klienta; odpowiedzi (także
+    pośrednie 429 widziane przez retry) są zgłaszane rate limiterowi pod
+    prawdziwą domeną źródła.
+    """
+    client = scraper.http
+    aliases = {}
+    for server in servers:
+        sp = urlsplit(server.site.base_url)
+        current = client._adapters.get(sp.netloc) or client._adapters['*']
+        adapter = _RewriteAdapter(server.netloc, pool_connections=current._pool_maxsize,
+                                  pool_maxsize=current._pool_maxsize,
+                                  max_retries=current.max_retries, pool_block=current._pool_block)
+        client._adapters[sp.netloc] = adapter
+        client.session.mount(f"{sp.scheme}://{sp.netloc}/", adapter)
+        aliases[server.netloc] = sp.netloc
+    observer = client.observer
+    if observer is not None:
+        client.observer = lambda netloc, status, retry_after: observer(aliases.get(netloc, netloc), status, retry_after)
+
+
+def start_servers(sources: list[dict], fixtures_dir: str = FIXTURES_DIR, **server_kw) -> list[StandInServer]:
+    """Serwer dla każdego źródła z configu, które ma katalog fixtures."""
+    servers = []
+    for src in sources:
+        name, base = src.get('name'), src.get('base_url')
+        if not name or not base or not os.path.isdir(os.path.join(fixtures_dir, name)):
+            continue
+        servers.append(StandInServer(FixtureSite(name, base, fixtures_dir), **server_kw).start())
+    return servers
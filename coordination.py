@@ -0,0 +1,317 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from http_cache import normalize_url
+from sqlite_store import open_store
+
+try:
+    import redis
+except ImportError:  # opcjonalne – tylko dla backend: redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('none', 'sqlite', 'redis')
+
+
+def make_owner() -> str:
+    """Identyfikator instancji: host, PID i losowy sufiks (restart procesu = nowy właściciel)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _gcra(tat: float, now: float, rate: float, burst: int) -> tuple[float, float]:
+    """(czas oczekiwania, nowy TAT) – ten sam wariant GCRA co rate_limit.TokenBucket."""
+    interval = 1.0 / (rate if rate > 0 else 0.1)
+    tolerance = (max(1, burst) - 1) * interval
+    tat = max(tat, now)
+    return max(0.0, tat - tolerance - now), tat + interval
+
+
+class Coordinator:
+    """Wspólny stan kilku instancji scrapera: frontier URL-i z dzierżawami, limiter per domena, wyniki.
+
+    Backendy implementują `claim`, `complete`, `release`, `reserve`, `pause`,
+    `claim_result`, `prune` i `close`; liczniki i raport są wspólne.
+    """
+
+    def __init__(self, owner: str | None = None, lease_seconds: float = 300, done_seconds: float = 900):
+        self.owner = owner or make_owner()
+        self.lease_seconds = lease_seconds
+        self.done_seconds = done_seconds
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.leased_elsewhere = 0
+        self.results_elsewhere = 0
+
+    def log_report(self) -> None:
+        logger.info(f"Coordination ({self.owner}): {self.claimed} urls claimed, {self.leased_elsewhere} leased "
+                    f"by other instances, {self.results_elsewhere} results reported elsewhere")
+
+
+class SqliteCoordinator(Coordinator):
+    """Koordynacja instancji na jednym hoście (workery gunicorna, kilka procesów) przez wspólny plik SQLite.
+
+    - frontier: URL jest dzierżawiony (`claim`) na lease_seconds; inne
+      instancje go pomijają, a po `complete` – przez done_seconds. Dzierżawa
+      porzuconego procesu wygasa i URL wraca do puli.
+    - limiter per domena: TAT kubełka (GCRA) współdzielony przez instancje,
+      więc suma żądań do domeny nie przekracza jej rps.
+    - wyniki: `claim_result` – spośród działających naraz instancji artykuł
+      zgłasza tylko pierwsza (zgłoszenia znikają w `release`, więc późniejsze
+      uruchomienie znów zwraca artykuł w swoich wynikach).
+
+    Zmiany w transakcjach BEGIN IMMEDIATE (zapis zaczyna się od blokady pliku).
+    """
+
+    def __init__(self, path: str, owner: str | None = None, lease_seconds: float = 300, done_seconds: float = 900):
+        super().__init__(owner, lease_seconds, done_seconds)
+        self.path = path
+        # autocommit: transakcje otwiera jawnie _write (BEGIN IMMEDIATE)
+        self._conn = open_store(path, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS frontier ('
+            ' url TEXT PRIMARY KEY,'
+            ' owner TEXT NOT NULL,'
+            ' lease_until REAL NOT NULL,'
+            ' done_at REAL)'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS buckets (domain TEXT PRIMARY KEY, tat REAL NOT NULL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS results (url TEXT PRIMARY KEY, owner TEXT NOT NULL, added_at REAL NOT NULL)')
+
+    def _write(self, fn):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(time.time())
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def claim(self, urls: list[str]) -> list[str]:
+        """URL-e, które ta instancja może pobrać (dzierżawa założona); reszta jest w rękach innych."""
+        def run(now):
+            out = []
+            for url in urls:
+                key = normalize_url(url)
+                row = self._conn.execute('SELECT owner, lease_until, done_at FROM frontier WHERE url = ?', (key,)).fetchone()
+                if row is not None:
+                    owner, lease_until, done_at = row
+                    if done_at is not None and done_at > now - self.done_seconds:
+                        continue
+                    if done_at is None and owner != self.owner and lease_until > now:
+                        continue
+                self._conn.execute('INSERT OR REPLACE INTO frontier (url, owner, lease_until, done_at) VALUES (?, ?, ?, NULL)',
+                                   (key, self.owner, now + self.lease_seconds))
+                out.append(url)
+            self.claimed += len(out)
+            self.leased_elsewhere += len(urls) - len(out)
+            return out
+        return self._write(run)
+
+    def complete(self, url: str) -> None:
+        self._write(lambda now: self._conn.execute(
+            'UPDATE frontier SET done_at = ? WHERE url = ? AND owner = ?', (now, normalize_url(url), self.owner)))
+
+    def release(self) -> None:
+        """Koniec pracy instancji: zwalnia niedokończone dzierżawy i jej zgłoszenia wyników.
+
+        Zakończone URL-e zostają (done_seconds) – inne instancje nie pobierają
+        ich ponownie; wyniki zna już archiwum i rejestr crawla.
+        """
+        def run(now):
+            self._conn.execute('DELETE FROM frontier WHERE owner = ? AND done_at IS NULL', (self.owner,))
+            self._conn.execute('DELETE FROM results WHERE owner = ?', (self.owner,))
+        self._write(run)
+
+    def reserve(self, domain: str, rate: float, burst: int = 1) -> float:
+        """Token ze wspólnego kubełka domeny; zwraca czas oczekiwania (s)."""
+        def run(now):
+            row = self._conn.execute('SELECT tat FROM buckets WHERE domain = ?', (domain,)).fetchone()
+            wait, tat = _gcra(row[0] if row else 0.0, now, rate, burst)
+            self._conn.execute('INSERT OR REPLACE INTO buckets (domain, tat) VALUES (?, ?)', (domain, tat))
+            return wait
+        return self._write(run)
+
+    def pause(self, domain: str, seconds: float, rate: float, burst: int = 1) -> None:
+        """429/503 z Retry-After: wstrzymuje domenę dla wszystkich instancji."""
+        def run(now):
+            row = self._conn.execute('SELECT tat FROM buckets WHERE domain = ?', (domain,)).fetchone()
+            tat = max(row[0] if row else 0.0, now + seconds + (max(1, burst) - 1) / (rate if rate > 0 else 0.1))
+            self._conn.execute('INSERT OR REPLACE INTO buckets (domain, tat) VALUES (?, ?)', (domain, tat))
+        self._write(run)
+
+    def claim_result(self, url: str) -> bool:
+        """True, jeśli artykuł zgłasza ta instancja (pierwsza albo już wcześniej ona)."""
+        key = normalize_url(url)
+
+        def run(now):
+            row = self._conn.execute('SELECT owner, added_at FROM results WHERE url = ?', (key,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now - self.done_seconds:
+                self.results_elsewhere += 1
+                return False
+            self._conn.execute('INSERT OR REPLACE INTO results (url, owner, added_at) VALUES (?, ?, ?)', (key, self.owner, now))
+            return True
+        return self._write(run)
+
+    def prune(self) -> None:
+        def run(now):
+            cutoff = now - self.done_seconds
+            self._conn.execute('DELETE FROM frontier WHERE (done_at IS NOT NULL AND done_at < ?) OR '
+                               '(done_at IS NULL AND lease_until < ?)', (cutoff, cutoff))
+            self._conn.execute('DELETE FROM results WHERE added_at < ?', (cutoff,))
+            self._conn.execute('DELETE FROM buckets WHERE tat < ?', (cutoff,))
+        self._write(run)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCoordinator(Coordinator):
+    """Ta sama koordynacja na serwerze zgodnym z Redis (kilka hostów).
+
+    Dzierżawa i wynik to klucze SET NX PX (wygasają same), kubełek domeny –
+    skrypt Lua liczący GCRA na zegarze serwera (TIME), więc rozjechane
+    zegary hostów nie psują limitu. `client` to dowolny klient zgodny
+    z redis-py (np. fakeredis jako lokalny zamiennik).
+    """
+
+    _RESERVE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local pause = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+if pause > 0 then
+  tat = math.max(tat, now + pause + tolerance)
+  redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+  return '0'
+end
+local wait = tat - tolerance - now
+if wait < 0 then wait = 0 end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+return tostring(wait)
+"""
+
+    def __init__(self, client, prefix: str = 'scraper:', owner: str | None = None, lease_seconds: float = 300,
+                 done_seconds: float = 900):
+        super().__init__(owner, lease_seconds, done_seconds)
+        self.client = client
+        self.prefix = prefix
+        self._reserve = client.register_script(self._RESERVE)
+        # własne dzierżawy i zgłoszenia wyników – do zwolnienia w release()
+        self._held: set[str] = set()
+        self._results: set[str] = set()
+
+    def _key(self, kind: str, url: str) -> str:
+        return f"{self.prefix}{kind}:{normalize_url(url)}"
+
+    @staticmethod
+    def _str(value) -> str | None:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def claim(self, urls: list[str]) -> list[str]:
+        lease_ms = int(self.lease_seconds * 1000)
+        pipe = self.client.pipeline(transaction=False)
+        for url in urls:
+            pipe.set(self._key('url', url), self.owner, nx=True, px=lease_ms)
+        created = pipe.execute()
+        out, retry = [], []
+        for url, ok in zip(urls, created):
+            (out if ok else retry).append(url)
+        if retry:
+            # klucz już jest: własna dzierżawa (ponowne zlecenie) albo cudza / zakończona
+            for url, value in zip(retry, self.client.mget([self._key('url', u) for u in retry])):
+                if self._str(value) == self.owner:
+                    self.client.set(self._key('url', url), self.owner, px=lease_ms)
+                    out.append(url)
+        with self._lock:
+            self._held.update(out)
+            self.claimed += len(out)
+            self.leased_elsewhere += len(urls) - len(out)
+        return out
+
+    def complete(self, url: str) -> None:
+        self.client.set(self._key('url', url), 'done', px=int(self.done_seconds * 1000))
+        with self._lock:
+            self._held.discard(url)
+
+    def release(self) -> None:
+        with self._lock:
+            held, self._held = list(self._held), set()
+            results, self._results = list(self._results), set()
+        keys = [self._key('url', u) for u in held] + [self._key('result', u) for u in results]
+        for key, value in zip(keys, self.client.mget(keys) if keys else []):
+            if self._str(value) == self.owner:
+                self.client.delete(key)
+
+    def _call(self, domain: str, rate: float, burst: int, pause: float) -> float:
+        interval = 1.0 / (rate if rate > 0 else 0.1)
+        tolerance = (max(1, burst) - 1) * interval
+        return float(self._str(self._reserve(keys=[f"{self.prefix}rate:{domain}"], args=[interval, tolerance, pause])))
+
+    def reserve(self, domain: str, rate: float, burst: int = 1) -> float:
+        return self._call(domain, rate, burst, 0)
+
+    def pause(self, domain: str, seconds: float, rate: float, burst: int = 1) -> None:
+        self._call(domain, rate, burst, max(seconds, 0.001))
+
+    def claim_result(self, url: str) -> bool:
+        key = self._key('result', url)
+        if (self.client.set(key, self.owner, nx=True, px=int(self.done_seconds * 1000))
+                or self._str(self.client.get(key)) == self.owner):
+            with self._lock:
+                self._results.add(url)
+            return True
+        with self._lock:
+            self.results_elsewhere += 1
+        return False
+
+    def prune(self) -> None:
+        # klucze wygasają same (PX)
+        pass
+
+    def close(self) -> None:
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+def from_config(cfg: dict | None, state_dir: str) -> Coordinator | None:
+    """SqliteCoordinator / RedisCoordinator wg `coordination.backend` (COORDINATION nadpisuje) albo None."""
+    c = (cfg or {}).get('coordination') or {}
+    backend = (os.environ.get('COORDINATION') or c.get('backend') or 'none').strip().lower()
+    if backend in ('', 'none', '0', 'off'):
+        return None
+    try:
+        lease_seconds = float(c.get('lease_seconds', 300))
+        done_seconds = float(c.get('done_seconds', 900))
+    except Exception:
+        lease_seconds, done_seconds = 300.0, 900.0
+    try:
+        if backend == 'sqlite':
+            path = c.get('path') or os.path.join(state_dir, 'coordination.sqlite')
+            return SqliteCoordinator(path, lease_seconds=lease_seconds, done_seconds=done_seconds)
+        if backend == 'redis':
+            if redis is None:
+                logger.error("Coordination backend redis requires the redis package, running uncoordinated")
+                return None
+            url = os.environ.get('REDIS_URL') or c.get('redis_url') or 'redis://localhost:6379/0'
+            client = redis.Redis.from_url(url)
+            client.ping()
+            return RedisCoordinator(client, prefix=c.get('prefix') or 'scraper:', lease_seconds=lease_seconds,
+                                    done_seconds=done_seconds)
+        logger.error(f"Unknown coordination backend {backend!r} (expected one of {BACKENDS})")
+    except Exception as e:
+        logger.error(f"Coordination ({backend}) unavailable, running uncoordinated: {e}")
+    return None
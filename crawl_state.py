@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import date
+
+from http_cache import normalize_url
+from sqlite_store import open_store, store_from_config
+
+logger = logging.getLogger(__name__)
+
+# wyniki, których ponowne sprawdzenie ma sens dopiero po recheck_hours
+RECHECK_OUTCOMES = ('no_date', 'not_article', 'too_short', 'single_word_title', 'non_html')
+# artykuły odrzucone jako powtórki (scalone z innym / zgłoszone przez inną instancję)
+SETTLED_OUTCOMES = ('duplicate', 'repost', 'reported_elsewhere')
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def links_fingerprint(links: list[str]) -> str:
+    # zbiór linków – kolejność na stronie (np. przypięte wpisy) nie zmienia odcisku
+    return content_hash('\n'.join(sorted(set(links))))
+
+
+class CrawlState:
+    """Trwały rejestr przetworzonych URL-i artykułów (SQLite).
+
+    Dla każdego URL-a: wynik ostatniego przetworzenia (outcome), data artykułu,
+    hash treści oraz czasy first_seen / last_seen / last_checked. Pozwala
+    pominąć pobieranie artykułów, których wynik nie może się zmienić
+    (np. za stare), a zaakceptowane artykuły odtworzyć bez sieci.
+    """
+
+    def __init__(self, path: str, recheck_hours: float = 72):
+        self.path = path
+        self.recheck_seconds = recheck_hours * 3600
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS urls ('
+            ' url TEXT PRIMARY KEY,'
+            ' outcome TEXT NOT NULL,'
+            ' article_date TEXT,'
+            ' content_hash TEXT,'
+            ' title TEXT,'
+            ' content TEXT,'
+            ' first_seen REAL NOT NULL,'
+            ' last_seen REAL NOT NULL,'
+            ' last_checked REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS listings ('
+            ' url TEXT PRIMARY KEY,'
+            ' fingerprint TEXT NOT NULL,'
+            ' links TEXT NOT NULL,'
+            ' window_start TEXT NOT NULL,'
+            ' last_changed REAL NOT NULL,'
+            ' last_checked REAL NOT NULL)'
+        )
+        self._conn.commit()
+        self.skipped = 0
+        self.reused = 0
+        self.listings_unchanged = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, state_dir: str) -> 'CrawlState | None':
+        return store_from_config(lambda path, c: cls(path, recheck_hours=float(c.get('recheck_hours', 72))),
+                                 cfg, state_dir, 'crawl_state', 'CRAWL_STATE', 'crawl_state.sqlite', 'Crawl state')
+
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT outcome, article_date, content_hash, title, content, last_checked FROM urls WHERE url = ?',
+                (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'outcome': row[0],
+            'date': row[1],
+            'content_hash': row[2],
+            'title': row[3],
+            'content': row[4],
+            'last_checked': row[5],
+        }
+
+    def plan(self, url: str, start_date: date, today: date, now: float | None = None,
+             known: bool = False) -> tuple[str, dict | None]:
+        """Decyzja dla odkrytego linku: 'fetch', 'reuse' (odtwórz z rejestru) lub 'skip'.
+
+        known=True – link był już na tym listingu w poprzednim uruchomieniu:
+        bez ponownego sprawdzania po recheck_hours (pobierane są tylko linki
+        z błędem albo przyszłą datą).
+        """
+        row = self.get(url)
+        if row is None:
+            return 'fetch', None
+        now = now or time.time()
+        due = not known and (now - row['last_checked']) >= self.recheck_seconds
+        d = date.fromisoformat(row['date'][:10]) if row['date'] else None
+        outcome = row['outcome']
+        if outcome == 'added':
+            if d and d < start_date:
+                return 'skip', row
+            if d and d <= today and not due and row['content']:
+                return 'reuse', row
+            return 'fetch', row
+        if outcome == 'out_of_window':
+            # stary artykuł nie wróci do okna; przyszła data – sprawdź ponownie
+            if d and d < start_date:
+                return 'skip', row
+            return 'fetch', row
+        if outcome in SETTLED_OUTCOMES:
+            if d and d < start_date:
+                return 'skip', row
+            return ('fetch' if due else 'skip'), row
+        if outcome in RECHECK_OUTCOMES:
+            return ('fetch' if due else 'skip'), row
+        # 'error' i nieznane wyniki – ponowna próba
+        return 'fetch', row
+
+    def record(self, url: str, outcome: str, article_date: str | None = None,
+               title: str | None = None, content: str | None = None) -> None:
+        now = time.time()
+        key = normalize_url(url)
+        chash = content_hash(content) if content else None
+        # treść trzymamy tylko dla zaakceptowanych (odtwarzanie bez pobierania)
+        if outcome != 'added':
+            title = content = None
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO urls (url, outcome, article_date, content_hash, title, content, first_seen, last_seen, last_checked)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(url) DO UPDATE SET outcome = excluded.outcome,'
+                ' article_date = COALESCE(excluded.article_date, urls.article_date),'
+                ' content_hash = COALESCE(excluded.content_hash, urls.content_hash),'
+                ' title = excluded.title, content = excluded.content,'
+                ' last_seen = excluded.last_seen, last_checked = excluded.last_checked',
+                (key, outcome, article_date, chash, title, content, now, now, now)
+            )
+            self._conn.commit()
+
+    def touch_seen(self, urls: list[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('UPDATE urls SET last_seen = ? WHERE url = ?',
+                                   [(now, normalize_url(u)) for u in urls])
+            self._conn.commit()
+
+    def listing(self, url: str) -> dict | None:
+        """Stan listingu z ostatniego uruchomienia: odcisk pierwszej strony, linki, początek okna dat."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fingerprint, links, window_start, last_changed, last_checked FROM listings WHERE url = ?',
+                (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'fingerprint': row[0],
+            'links': json.loads(row[1]),
+            'window_start': row[2],
+            'last_changed': row[3],
+            'last_checked': row[4],
+        }
+
+    def record_listing(self, url: str, fingerprint: str, links: list[str], window_start: date) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO listings (url, fingerprint, links, window_start, last_changed, last_checked)'
+                ' VALUES (?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(url) DO UPDATE SET links = excluded.links, window_start = excluded.window_start,'
+                ' last_changed = CASE WHEN listings.fingerprint = excluded.fingerprint'
+                ' THEN listings.last_changed ELSE excluded.last_changed END,'
+                ' fingerprint = excluded.fingerprint, last_checked = excluded.last_checked',
+                (normalize_url(url), fingerprint, json.dumps(links), window_start.isoformat(), now, now)
+            )
+            self._conn.commit()
+
+    def touch_listing(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute('UPDATE listings SET last_checked = ? WHERE url = ?', (time.time(), normalize_url(url)))
+            self._conn.commit()
+
+    def log_report(self) -> None:
+        with self._lock:
+            rows = self._conn.execute('SELECT outcome, COUNT(*) FROM urls GROUP BY outcome').fetchall()
+        summary = ', '.join(f"{o}={n}" for o, n in sorted(rows))
+        logger.info(f"Crawl state: skipped={self.skipped} reused={self.reused} "
+                    f"unchanged listings={self.listings_unchanged} ledger: {summary or 'empty'}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,240 @@
+import array
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from datetime import date
+
+from http_cache import normalize_url
+from sqlite_store import open_store, store_from_config, store_settings
+from summary_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text: str, k: int = 5) -> set[int]:
+    """Hashe (64 bit) k-gramów słów znormalizowanego tekstu."""
+    words = _WORD_RE.findall(normalize_text(text).lower())
+    if len(words) < k:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = (' '.join(words[i:i + k]) for i in range(len(words) - k + 1))
+    return {int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=8).digest(), 'big') for g in grams}
+
+
+class MinHasher:
+    """Sygnatura MinHash: num_perm permutacji (a*x + b) mod p ze stałym ziarnem – zgodna między uruchomieniami."""
+
+    def __init__(self, num_perm: int = 120, seed: int = 1):
+        rnd = random.Random(seed)
+        self.params = [(rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, hashes: set[int]) -> tuple[int, ...]:
+        if not hashes:
+            return ()
+        xs = list(hashes)
+        return tuple(min((a * x + b) % _PRIME for x in xs) for a, b in self.params)
+
+
+class ContentSigner:
+    """Sygnatura MinHash treści artykułu (shingle słów + MinHasher) – bez stanu, także w procesach ParsePool.
+
+    Liczenie sygnatury długiego artykułu to kilkaset ms czystego Pythona;
+    przy włączonej puli parsowania odbywa się w procesie roboczym razem
+    z ekstrakcją, a wynik wraca w polach strony pod kluczem `key`.
+    """
+
+    def __init__(self, num_perm: int = 120, shingle_words: int = 5):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.hasher = MinHasher(num_perm)
+        # klucz w polach strony (cache pochodnych) – inne parametry, inna sygnatura
+        self.key = f"minhash_{num_perm}_{shingle_words}"
+
+    def sign(self, text: str) -> tuple[int, ...]:
+        return self.hasher.signature(shingles(text, self.shingle_words))
+
+
+def signer_from_config(cfg: dict | None) -> ContentSigner | None:
+    """Podpisywanie treści z ustawieniami `dedup` (None, gdy deduplikacja wyłączona)."""
+    c = store_settings(cfg, 'dedup', 'DEDUP')
+    if c is None:
+        return None
+    try:
+        return ContentSigner(int(c.get('bands', 20)) * int(c.get('rows', 6)), int(c.get('shingle_words', 5)))
+    except Exception as e:
+        logger.warning(f"Dedup signer disabled: {e}")
+        return None
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Szacowany współczynnik Jaccarda: odsetek zgodnych pozycji sygnatur."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class Deduplicator:
+    """Wykrywanie (prawie) duplikatów artykułów: ten sam URL albo MinHash/LSH po shinglach treści.
+
+    Sygnatury i kubełki LSH (bands × rows) są trwałe (SQLite, indeks po
+    (band, hash)), więc sprawdzenie nowego artykułu to `bands` zapytań po
+    indeksie i porównanie z nielicznymi kandydatami – koszt nie rośnie
+    liniowo z liczbą zapamiętanych artykułów. Werdykt `admit`:
+      'new'        – nowy artykuł (trafia do indeksu),
+      'duplicate'  – ta sama historia co artykuł z bieżącego uruchomienia
+                     albo z wcześniejszego, nadal w oknie dat,
+      'repost'     – powtórka historii sprzed okna dat z wcześniejszych uruchomień.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.6, bands: int = 20, rows: int = 6,
+                 shingle_words: int = 5, retention_days: float = 365):
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.shingle_words = shingle_words
+        self.retention_seconds = retention_days * 86400
+        self.signer = ContentSigner(bands * rows, shingle_words)
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            ' url TEXT PRIMARY KEY,'
+            ' link TEXT NOT NULL,'
+            ' article_date TEXT,'
+            ' signature BLOB NOT NULL,'
+            ' seen_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS bands ('
+            ' band INTEGER NOT NULL,'
+            ' hash INTEGER NOT NULL,'
+            ' url TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_bands_lookup ON bands(band, hash)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_bands_url ON bands(url)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_docs_seen ON docs(seen_at)')
+        self._conn.commit()
+        # artykuły bieżącego uruchomienia: znormalizowany URL -> element news_items
+        self._run_items: dict[str, dict] = {}
+        self.duplicates = 0
+        self.reposts = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, state_dir: str) -> 'Deduplicator | None':
+        return store_from_config(
+            lambda path, c: cls(path, threshold=float(c.get('threshold', 0.6)), bands=int(c.get('bands', 20)),
+                                rows=int(c.get('rows', 6)), shingle_words=int(c.get('shingle_words', 5)),
+                                retention_days=float(c.get('retention_days', 365))),
+            cfg, state_dir, 'dedup', 'DEDUP', 'dedup.sqlite', 'Dedup'
+        )
+
+    def begin_run(self) -> None:
+        with self._lock:
+            self._run_items.clear()
+
+    def _band_hashes(self, sig: tuple[int, ...]) -> list[int]:
+        out = []
+        for band in range(self.bands):
+            chunk = array.array('Q', sig[band * self.rows:(band + 1) * self.rows]).tobytes()
+            out.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'big', signed=True))
+        return out
+
+    def _candidates(self, key: str, band_hashes: list[int]) -> set[str]:
+        found = set()
+        for band, h in enumerate(band_hashes):
+            for (url,) in self._conn.execute('SELECT url FROM bands WHERE band = ? AND hash = ?', (band, h)):
+                if url != key:
+                    found.add(url)
+        return found
+
+    def stored_signature(self, link: str) -> tuple[int, ...] | None:
+        """Sygnatura zaindeksowanego artykułu (np. odtwarzanego z rejestru crawla bez zmiany treści)."""
+        with self._lock:
+            row = self._conn.execute('SELECT signature FROM docs WHERE url = ?', (normalize_url(link),)).fetchone()
+        return tuple(array.array('Q', row[0])) if row else None
+
+    def admit(self, item: dict, start_date: date, sig=None) -> tuple[str, dict | None]:
+        """Werdykt dla nowego artykułu i artykuł, z którym się pokrywa.
+
+        Dla 'duplicate' to element bieżącego uruchomienia albo – gdy historia
+        pochodzi z wcześniejszego uruchomienia i mieści się w oknie dat –
+        {'link', 'date', 'similarity'} artykułu z archiwum; dla 'repost'
+        też {'link', 'date', 'similarity'}. `sig` – sygnatura policzona
+        wcześniej (ParsePool, indeks); bez niej liczona tutaj.
+        """
+        key = normalize_url(item.get('link', ''))
+        if sig is None or len(sig) != self.signer.num_perm:
+            # podpis liczony poza lockiem – to najdroższa część
+            sig = self.signer.sign(item.get('treść', ''))
+        sig = tuple(sig)
+        band_hashes = self._band_hashes(sig) if sig else []
+        with self._lock:
+            same = self._run_items.get(key)
+            if same is not None:
+                self.duplicates += 1
+                return 'duplicate', same
+            best = None
+            for url in self._candidates(key, band_hashes):
+                row = self._conn.execute('SELECT link, article_date, signature FROM docs WHERE url = ?', (url,)).fetchone()
+                if row is None:
+                    continue
+                score = similarity(sig, tuple(array.array('Q', row[2])))
+                if score >= self.threshold and (best is None or score > best[0]):
+                    best = (score, url, row[0], row[1])
+            if best is not None:
+                score, url, link, article_date = best
+                if url in self._run_items:
+                    self.duplicates += 1
+                    logger.debug(f"Duplicate ({score:.2f}) of {link}: {item.get('link')}")
+                    return 'duplicate', self._run_items[url]
+                if article_date and article_date[:10] < start_date.isoformat():
+                    self.reposts += 1
+                    logger.debug(f"Repost ({score:.2f}) of {link} from {article_date}: {item.get('link')}")
+                    return 'repost', {'link': link, 'date': article_date, 'similarity': score}
+                # ta sama historia z wcześniejszego uruchomienia, nadal w oknie – już jest w archiwum
+                self.duplicates += 1
+                logger.debug(f"Duplicate ({score:.2f}) of archived {link}: {item.get('link')}")
+                return 'duplicate', {'link': link, 'date': article_date, 'similarity': score}
+            self._run_items[key] = item
+            if sig:
+                self._index(key, item, sig, band_hashes)
+        return 'new', None
+
+    def _index(self, key: str, item: dict, sig: tuple[int, ...], band_hashes: list[int]) -> None:
+        self._conn.execute('DELETE FROM bands WHERE url = ?', (key,))
+        self._conn.execute(
+            'INSERT OR REPLACE INTO docs (url, link, article_date, signature, seen_at) VALUES (?, ?, ?, ?, ?)',
+            (key, item.get('link', ''), item.get('data'), array.array('Q', sig).tobytes(), time.time())
+        )
+        self._conn.executemany('INSERT INTO bands (band, hash, url) VALUES (?, ?, ?)',
+                               [(band, h, key) for band, h in enumerate(band_hashes)])
+        self._conn.commit()
+
+    def evict(self) -> int:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            victims = [r[0] for r in self._conn.execute('SELECT url FROM docs WHERE seen_at < ?', (cutoff,))]
+            for url in victims:
+                self._conn.execute('DELETE FROM bands WHERE url = ?', (url,))
+            self._conn.execute('DELETE FROM docs WHERE seen_at < ?', (cutoff,))
+            self._conn.commit()
+            self.evicted += len(victims)
+        return len(victims)
+
+    def log_report(self) -> None:
+        with self._lock:
+            docs = self._conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+        logger.info(f"Dedup: {self.duplicates} duplicates merged, {self.reposts} reposts dropped, "
+                    f"{self.evicted} evicted, {docs} articles indexed")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rate_limit import TokenBucket
+from summary_cache import summary_key
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'gemini-2.5-flash'
+# zmiana treści promptów => nowa wersja (unieważnia cache streszczeń)
+PROMPT_VERSION = 'v1'
+# streszczenia z promptu wsadowego (BATCH_HEADER) – osobne wpisy cache; zmiana BATCH_HEADER => nowy sufiks
+BATCH_PROMPT_VERSION = f"{PROMPT_VERSION}-batch"
+MAX_TEXT_CHARS = 12000
+
+PROMPT_HEADER = (
+    "Jesteś rzetelnym redaktorem. Na podstawie dostarczonej treści artykułu napisz streszczenie w 3-4 akapitach. "
+    "Używaj wyłącznie informacji zawartych w tekście, bez dopowiadania i interpretacji. "
+    "Sformatuj treść w oddzielne akapity (oddziel pustą linią). "
+    "WAŻNE: Zawsze zwróć treść, nie zostawiaj pola puste.\n\n"
+)
+
+BATCH_HEADER = (
+    "Jesteś rzetelnym redaktorem. Dla KAŻDEGO z poniższych artykułów napisz streszczenie w 3-4 akapitach. "
+    "Używaj wyłącznie informacji zawartych w danym tekście, bez dopowiadania i interpretacji. "
+    "Oddzielaj akapity pustą linią. "
+    "Zwróć wyłącznie tablicę JSON postaci [{\"id\": <numer artykułu>, \"gemini_tresc\": \"<streszczenie>\"}] "
+    "z jednym elementem na każdy artykuł. WAŻNE: nie zostawiaj pustych streszczeń.\n\n"
+)
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, str(default)))
+    except Exception:
+        return default
+
+
+def _is_retryable(exc: Exception) -> bool:
+    # google.api_core: ResourceExhausted (429), TooManyRequests, ServiceUnavailable, DeadlineExceeded, InternalServerError
+    name = type(exc).__name__
+    if name in ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError'):
+        return True
+    code = getattr(exc, 'code', None)
+    if code in (429, 500, 503, 504):
+        return True
+    msg = str(exc).lower()
+    return '429' in msg or 'quota' in msg or 'rate limit' in msg
+
+
+def _strip_fences(text: str) -> str:
+    fenced = text.strip()
+    if fenced.startswith('```'):
+        lines = fenced.splitlines()
+        if lines and lines[0].startswith('```'):
+            lines = lines[1:]
+        if lines and lines[-1].startswith('```'):
+            lines = lines[:-1]
+        return '\n'.join(lines)
+    return text
+
+
+def parse_summary(resp_text: str) -> str | None:
+    """Streszczenie z odpowiedzi modelu: JSON (gemini_tresc / gemini_content / content) albo czysty tekst."""
+    resp_text = _strip_fences(resp_text or '')
+    try:
+        start = resp_text.find('{')
+        end = resp_text.rfind('}')
+        if start != -1 and end != -1 and end > start:
+            payload = json.loads(resp_text[start:end + 1])
+            body = payload.get('gemini_tresc') or payload.get('gemini_content') or payload.get('content')
+            if body:
+                return body
+    except Exception:
+        pass
+    lines = [ln.strip() for ln in resp_text.splitlines() if ln.strip()]
+    return '\n\n'.join(lines) if lines else None
+
+
+def parse_batch(resp_text: str) -> dict[int, str]:
+    """Odpowiedź trybu wsadowego: tablica [{"id", "gemini_tresc"}] -> {id: streszczenie}."""
+    resp_text = _strip_fences(resp_text or '')
+    start = resp_text.find('[')
+    end = resp_text.rfind(']')
+    out: dict[int, str] = {}
+    if start == -1 or end <= start:
+        return out
+    try:
+        payload = json.loads(resp_text[start:end + 1])
+    except Exception:
+        return out
+    for entry in payload if isinstance(payload, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        body = entry.get('gemini_tresc') or entry.get('gemini_content') or entry.get('content')
+        try:
+            idx = int(entry.get('id'))
+        except Exception:
+            continue
+        if body:
+            out[idx] = body
+    return out
+
+
+def build_prompt(item: dict) -> str:
+    text = item.get('treść', '') or ''
+    # Trim very long content to keep response fast
+    if len(text) > MAX_TEXT_CHARS:
+        text = text[:MAX_TEXT_CHARS]
+    return (
+        PROMPT_HEADER
+        + f"TYTUŁ: {item.get('tytuł', '')}\n"
+        + f"DATA: {item.get('data', '')}\n"
+        + f"LINK: {item.get('link', '')}\n"
+        + f"TEKST:\n{text}"
+    )
+
+
+def build_batch_prompt(items: list[dict]) -> str:
+    parts = [BATCH_HEADER]
+    for idx, item in enumerate(items):
+        parts.append(
+            f"### ARTYKUŁ id={idx}\n"
+            f"TYTUŁ: {item.get('tytuł', '')}\n"
+            f"DATA: {item.get('data', '')}\n"
+            f"TEKST:\n{item.get('treść', '')}\n\n"
+        )
+    return ''.join(parts)
+
+
+class GeminiEnricher:
+    """Równoległe streszczanie artykułów modelem Gemini.
+
+    Ograniczenia po stronie klienta: liczba równoległych wywołań
+    (GEMINI_CONCURRENCY), żądania na minutę (GEMINI_RPM) i szacowane tokeny
+    na minutę (GEMINI_TPM); 0 oznacza brak limitu. Błędy kwot/5xx są
+    ponawiane z wykładniczym backoffem. Opcjonalnie (GEMINI_BATCH_SIZE > 1)
+    krótkie artykuły są pakowane po kilka w jeden prompt z odpowiedzią JSON.
+    Z SummaryCache gotowe streszczenia są brane z cache zamiast z modelu.
+    """
+
+    def __init__(self, model, concurrency: int = 4, rpm: int = 0, tpm: int = 0, max_retries: int = 5,
+                 backoff_base: float = 2.0, batch_size: int = 1, batch_max_chars: int = 2500,
+                 batch_wait: float = 2.0, cache=None, model_name: str = MODEL_NAME, metrics=None):
+        self.model = model
+        self.cache = cache
+        # opcjonalnie metrics.Metrics – czas wywołań per artykuł (etap 'gemini')
+        self.metrics = metrics
+        self.model_name = model_name
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.batch_size = max(1, batch_size)
+        self.batch_max_chars = batch_max_chars
+        # strumień (ScrapePipeline): najdłuższe czekanie na zapełnienie wsadu, zanim pójdzie niepełny
+        self.batch_wait = max(0.0, batch_wait)
+        self._rpm = TokenBucket(rpm / 60.0, burst=max(1, min(rpm, self.concurrency))) if rpm > 0 else None
+        self._tpm = TokenBucket(tpm / 60.0, burst=tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self.latencies: list[float] = []
+        self.calls = 0
+        self.retries = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, model, cache=None, model_name: str = MODEL_NAME, metrics=None) -> 'GeminiEnricher':
+        return cls(
+            model,
+            cache=cache,
+            model_name=model_name,
+            metrics=metrics,
+            concurrency=_env_number('GEMINI_CONCURRENCY', 4),
+            rpm=_env_number('GEMINI_RPM', 0),
+            tpm=_env_number('GEMINI_TPM', 0),
+            max_retries=_env_number('GEMINI_MAX_RETRIES', 5),
+            backoff_base=_env_number('GEMINI_BACKOFF', 2.0, float),
+            batch_size=_env_number('GEMINI_BATCH_SIZE', 1),
+            batch_max_chars=_env_number('GEMINI_BATCH_MAX_CHARS', 2500),
+            batch_wait=_env_number('GEMINI_BATCH_WAIT', 2.0, float),
+        )
+
+    def _throttle(self, prompt: str) -> None:
+        # ~4 znaki na token – wystarczające do budżetu TPM
+        for bucket, cost in ((self._rpm, 1.0), (self._tpm, len(prompt) / 4.0)):
+            if bucket is not None:
+                delay = bucket.reserve(cost)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _generate(self, prompt: str) -> str:
+        attempt = 0
+        while True:
+            self._throttle(prompt)
+            try:
+                with self._lock:
+                    self.calls += 1
+                resp = self.model.generate_content(
+                    prompt,
+                    generation_config={'response_mime_type': 'application/json'}
+                )
+                return getattr(resp, 'text', '') or ''
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                logger.info(f"Gemini quota/transient error, retry {attempt}/{self.max_retries} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def _cache_key(self, item: dict, prompt_version: str = PROMPT_VERSION) -> str:
+        return summary_key(item.get('treść', ''), prompt_version, self.model_name)
+
+    def _store(self, item: dict, body: str, prompt_version: str = PROMPT_VERSION) -> None:
+        item['gemini_tresc'] = body
+        if self.cache is not None:
+            try:
+                self.cache.put(self._cache_key(item, prompt_version), body, self.model_name, prompt_version)
+            except Exception as e:
+                logger.debug(f"Summary cache write failed for {item.get('link', '')}: {e}")
+
+    def take_cached(self, items: list[dict]) -> list[dict]:
+        """Uzupełnia streszczenia z cache; zwraca artykuły, które wymagają wywołania modelu."""
+        pending = []
+        for item in items:
+            # Czyszczenie starych pól
+            item.pop('gemini_tytul', None)
+            if item.get('gemini_tresc'):
+                continue
+            body = None
+            if self.cache is not None:
+                # streszczenie z dowolnego z aktualnych promptów (pojedynczego albo wsadowego)
+                try:
+                    body = self.cache.get_any([self._cache_key(item, v) for v in (PROMPT_VERSION, BATCH_PROMPT_VERSION)])
+                except Exception as e:
+                    logger.debug(f"Summary cache read failed for {item.get('link', '')}: {e}")
+            if body:
+                item['gemini_tresc'] = body
+            else:
+                pending.append(item)
+        return pending
+
+    def _record(self, elapsed: float, ok: bool, link: str = '') -> None:
+        with self._lock:
+            if ok:
+                self.latencies.append(elapsed)
+            else:
+                self.failed += 1
+        if self.metrics is not None:
+            self.metrics.observe('gemini', elapsed, link)
+            if not ok:
+                self.metrics.count('gemini_failures', link)
+
+    def summarize_one(self, item: dict) -> bool:
+        link = item.get('link', '')
+        start_ts = time.monotonic()
+        logger.info(f"Gemini start for: {link}")
+        try:
+            body = parse_summary(self._generate(build_prompt(item)))
+        except Exception as e:
+            logger.error(f"Gemini enrichment failed for {link}: {e}")
+            self._record(time.monotonic() - start_ts, False, link)
+            return False
+        elapsed = time.monotonic() - start_ts
+        if not body:
+            logger.debug(f"Gemini returned unparseable content for {link}")
+            self._record(elapsed, False, link)
+            return False
+        self._store(item, body)
+        self._record(elapsed, True, link)
+        logger.info(f"Gemini done for: {link} in {elapsed:.2f}s")
+        return True
+
+    def summarize_batch(self, items: list[dict]) -> int:
+        """Jeden prompt dla kilku krótkich artykułów; brakujące w odpowiedzi idą pojedynczo."""
+        if len(items) == 1:
+            return int(self.summarize_one(items[0]))
+        start_ts = time.monotonic()
+        logger.info(f"Gemini batch start for {len(items)} articles")
+        try:
+            bodies = parse_batch(self._generate(build_batch_prompt(items)))
+        except Exception as e:
+            logger.error(f"Gemini batch failed ({len(items)} articles): {e}")
+            bodies = {}
+        elapsed = time.monotonic() - start_ts
+        done = 0
+        for idx, item in enumerate(items):
+            body = bodies.get(idx)
+            if body:
+                self._store(item, body, BATCH_PROMPT_VERSION)
+                # latencja wsadu rozłożona na jego elementy
+                self._record(elapsed / len(items), True, item.get('link', ''))
+                done += 1
+            elif self.summarize_one(item):
+                done += 1
+        logger.info(f"Gemini batch done: {len(bodies)}/{len(items)} in {elapsed:.2f}s")
+        return done
+
+    def batchable(self, item: dict) -> bool:
+        """Czy artykuł może trafić do wspólnego promptu (wsady włączone, treść nie za długa)."""
+        return self.batch_size > 1 and len(item.get('treść', '') or '') <= self.batch_max_chars
+
+    def _plan(self, items: list[dict]) -> list[list[dict]]:
+        if self.batch_size <= 1:
+            return [[item] for item in items]
+        groups: list[list[dict]] = []
+        batch: list[dict] = []
+        for item in items:
+            if not self.batchable(item):
+                groups.append([item])
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                groups.append(batch)
+                batch = []
+        if batch:
+            groups.append(batch)
+        return groups
+
+    def enrich(self, items: list[dict]) -> int:
+        return self.summarize(self.take_cached(items))
+
+    def summarize(self, pending: list[dict]) -> int:
+        """Streszcza artykuły modelem (bez sprawdzania cache – patrz take_cached)."""
+        if not pending:
+            return 0
+        if self.model is None:
+            logger.error(f"Gemini model not available, {len(pending)} articles left without summary")
+            return 0
+        started = time.monotonic()
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.summarize_batch, group) for group in self._plan(pending)]
+            for future in as_completed(futures):
+                try:
+                    done += future.result()
+                except Exception as e:
+                    logger.error(f"Gemini task failed: {e}")
+        self.log_report(len(pending), done, time.monotonic() - started)
+        return done
+
+    def log_report(self, total: int, done: int, wall: float) -> None:
+        lat = sorted(self.latencies)
+        if lat:
+            p50 = lat[len(lat) // 2]
+            p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            lat_info = f"latency p50={p50:.2f}s p95={p95:.2f}s max={lat[-1]:.2f}s"
+        else:
+            lat_info = 'no successful calls'
+        logger.info(
+            f"Gemini: {done}/{total} summarized in {wall:.1f}s, {self.calls} calls, "
+            f"{self.retries} retries, {self.failed} failed, {lat_info}"
+        )
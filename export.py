@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+# format -> (typ MIME, rozszerzenie pliku)
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', 'txt'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+CSV_COLUMNS = ('tytuł', 'data', 'link', 'linki', 'treść', 'gemini_tresc')
+
+
+def _txt_chunks(items):
+    yield "EXPORT AKTUALNOŚCI\n" + "=" * 80 + "\n\n"
+    for idx, item in enumerate(items, 1):
+        # jeden fragment na artykuł: join zamiast wielokrotnego += na całym pliku
+        lines = [
+            f"{idx}. {item.get('tytuł', 'Brak tytułu')}\n",
+            f"   Data: {item.get('data', '—')}\n",
+            f"   Link: {item.get('link', '—')}\n",
+        ]
+        lines.extend(f"   Też w: {other}\n" for other in item.get('linki', [])[1:])
+        text = item.get('gemini_tresc', item.get('treść', '—')) or '—'
+        lines.append(f"\n   Treść (AI):\n   {text.replace(chr(10), chr(10) + '   ')}\n")
+        lines.append("\n" + "-" * 80 + "\n\n")
+        yield ''.join(lines)
+
+
+def _ndjson_chunks(items):
+    for item in items:
+        yield json.dumps(dict(item), ensure_ascii=False) + '\n'
+
+
+def _csv_chunks(items):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM: Excel rozpoznaje UTF-8 (polskie znaki)
+    buf.write('\ufeff')
+    writer.writerow(CSV_COLUMNS)
+    for item in items:
+        writer.writerow([' '.join(item.get(col) or []) if col == 'linki' else (item.get(col) or '')
+                         for col in CSV_COLUMNS])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+_WRITERS = {'txt': _txt_chunks, 'ndjson': _ndjson_chunks, 'csv': _csv_chunks}
+
+
+def export_chunks(items, fmt: str = 'txt', compress: bool = False):
+    """Generator bajtów eksportu: po jednym fragmencie na artykuł, opcjonalnie gzip w locie.
+
+    `items` może być dowolnym iteratorem – w pamięci jest tylko bieżący
+    fragment (i bufor kompresora), niezależnie od liczby artykułów.
+    """
+    chunks = (chunk.encode('utf-8') for chunk in _WRITERS[fmt](items))
+    if compress:
+        return _gzip_chunks(chunks)
+    return chunks
+
+
+def _gzip_chunks(chunks, min_size: int = 64 * 1024):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: nagłówek i stopka gzip
+    pending = []
+    size = 0
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            pending.append(out)
+            size += len(out)
+        if size >= min_size:
+            yield b''.join(pending)
+            pending, size = [], 0
+    pending.append(comp.flush())
+    yield b''.join(pending)
+
+
+def export_filename(fmt: str, compress: bool = False, when: datetime | None = None) -> str:
+    name = f"aktualnosci_{(when or datetime.now()).strftime('%Y%m%d_%H%M%S')}.{FORMATS[fmt][1]}"
+    return name + '.gz' if compress else name
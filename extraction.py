@@ -0,0 +1,206 @@
+import importlib.util
+import logging
+import os
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup, Tag
+from dateutil import parser
+
+from rules import SourceRules
+
+logger = logging.getLogger(__name__)
+
+_HAS_LXML = importlib.util.find_spec('lxml') is not None
+
+# kolejność = priorytet (jak w NewsScraper._extract_date_from_soup)
+DATE_META = (
+    ('property', 'article:published_time'),
+    ('property', 'article:modified_time'),
+    ('property', 'og:published_time'),
+    ('property', 'og:updated_time'),
+    ('name', 'date'),
+    ('name', 'pubdate'),
+    ('itemprop', 'datePublished'),
+    ('itemprop', 'dateModified'),
+)
+
+CHROME_TAGS = frozenset(['script', 'style', 'noscript', 'iframe', 'form', 'header', 'footer', 'nav', 'aside'])
+CHROME_CLASSES = frozenset(['breadcrumb', 'breadcrumbs', 'menu', 'navbar', 'sidebar', 'pagination', 'pager',
+                            'cookie', 'cookies'])
+_ARTICLE_CLASS_RE = re.compile('(entry-content|article-body|field--name-body)', re.I)
+_ARTICLE_ITEMTYPE_RE = re.compile('Article', re.I)
+# reguły strony spoza skonfigurowanych źródeł: domyślne formaty dat, bez kandydatów treści
+_DEFAULT_RULES = SourceRules('default')
+
+
+def html_parser_name() -> str:
+    """Backend BeautifulSoup: HTML_PARSER (lxml / html.parser), domyślnie lxml, jeśli jest zainstalowany."""
+    name = (os.environ.get('HTML_PARSER') or '').strip()
+    if name == 'lxml' and not _HAS_LXML:
+        logger.warning("HTML_PARSER=lxml but lxml is not installed, using html.parser")
+        return 'html.parser'
+    if name:
+        return name
+    return 'lxml' if _HAS_LXML else 'html.parser'
+
+
+def make_soup(markup) -> BeautifulSoup:
+    return BeautifulSoup(markup, html_parser_name())
+
+
+def _class_matches(classes, pattern: re.Pattern) -> bool:
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        return bool(pattern.search(classes))
+    return any(pattern.search(c) for c in classes) or bool(pattern.search(' '.join(classes)))
+
+
+def _paragraph_text(node: Tag) -> str:
+    # jeden przebieg po poddrzewie zamiast osobnych find_all('p') i find_all('li')
+    paras, items = [], []
+    for el in node.descendants:
+        if isinstance(el, Tag):
+            if el.name == 'p':
+                paras.append(el)
+            elif el.name == 'li':
+                items.append(el)
+    parts = [p.get_text(strip=True) for p in paras] + [li.get_text(strip=True) for li in items]
+    return '\n\n'.join(t for t in parts if t)
+
+
+class PageExtract:
+    """Wynik jednego przejścia po drzewie strony.
+
+    Przejście zbiera naraz: meta daty, <time>, sygnały „to jest artykuł”,
+    tytuł, kandydatów na kontener treści i elementy „chrome” do usunięcia.
+    Data i sygnały są liczone od razu, treść dopiero na żądanie
+    (`title_and_content`), bo większość stron odpada wcześniej (data spoza okna).
+    """
+
+    def __init__(self, soup: BeautifulSoup, url: str, rules: SourceRules | None = None):
+        self.soup = soup
+        self.url = url
+        self.rules = rules or _DEFAULT_RULES
+        meta_dates: dict[tuple[str, str], str | None] = {}
+        og_type = None
+        times: list[Tag] = []
+        has_itemtype_article = False
+        article_class_div = False
+        first: dict[str, Tag] = {}
+        chrome: list[Tag] = []
+        # reguły skompilowane przy starcie; tu tylko indeks tag -> kandydaci
+        candidates = self.rules.content
+        cand_nodes: list[list[Tag]] = [[] for _ in candidates]
+        by_tag: dict[str, list[int]] = {}
+        for i, (tag, _pattern, _itemprop) in enumerate(candidates):
+            by_tag.setdefault(tag, []).append(i)
+
+        for el in soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+            name = el.name
+            attrs = el.attrs
+            if name == 'meta':
+                for key, value in DATE_META:
+                    if attrs.get(key) == value and (key, value) not in meta_dates:
+                        meta_dates[(key, value)] = attrs.get('content')
+                if og_type is None and attrs.get('property') == 'og:type':
+                    og_type = attrs.get('content') or ''
+            elif name == 'time':
+                times.append(el)
+            elif name in ('h1', 'title', 'article', 'main'):
+                first.setdefault(name, el)
+            if not has_itemtype_article and 'itemtype' in attrs and _ARTICLE_ITEMTYPE_RE.search(attrs['itemtype'] or ''):
+                has_itemtype_article = True
+            classes = attrs.get('class')
+            if name == 'div' and not article_class_div and _class_matches(classes, _ARTICLE_CLASS_RE):
+                article_class_div = True
+            if name in CHROME_TAGS or (classes and not CHROME_CLASSES.isdisjoint(classes)):
+                chrome.append(el)
+            for i in by_tag.get(name, ()):
+                _tag, pattern, itemprop = candidates[i]
+                if itemprop is not None:
+                    if attrs.get('itemprop') == itemprop:
+                        cand_nodes[i].append(el)
+                elif pattern is None or _class_matches(classes, pattern):
+                    cand_nodes[i].append(el)
+
+        self._meta_dates = meta_dates
+        self._times = times
+        self._first = first
+        self._chrome = chrome
+        self._candidates = candidates
+        self._cand_nodes = cand_nodes
+        self._og_type = og_type
+        self._itemtype_article = has_itemtype_article
+        self._article_class_div = article_class_div
+        self._content: tuple[str, str] | None = None
+
+    def date(self) -> datetime | None:
+        for key in DATE_META:
+            value = self._meta_dates.get(key)
+            if value:
+                try:
+                    return parser.parse(value)
+                except Exception:
+                    continue
+        for time_tag in self._times:
+            dt_val = time_tag.get('datetime') or time_tag.get('content') or time_tag.get_text(strip=True)
+            if not dt_val:
+                continue
+            try:
+                return parser.parse(dt_val, dayfirst=True)
+            except Exception:
+                continue
+        return self.rules.dates.search(self.soup.get_text(' ', strip=True))
+
+    def is_article(self) -> bool:
+        if self._og_type and 'article' in self._og_type.lower():
+            return True
+        if self._itemtype_article:
+            return True
+        art = self._first.get('article')
+        if art is not None:
+            has_h1 = art.find('h1') is not None
+            if has_h1 and len(art.find_all('p', limit=3)) >= 3:
+                return True
+        main = self._first.get('main')
+        if main is not None and len(main.find_all('p', limit=3)) >= 3:
+            return True
+        return self._article_class_div
+
+    def title_and_content(self) -> tuple[str, str]:
+        if self._content is not None:
+            return self._content
+        title_elem = self._first.get('h1') or self._first.get('title')
+        title = title_elem.get_text(strip=True) if title_elem else 'Brak tytułu'
+        # usuń chrome (odpowiednik _clean_soup) – elementy zebrane w tym samym przejściu
+        for el in self._chrome:
+            if not el.decomposed:
+                el.decompose()
+        self._content = (title, self._main_text())
+        return self._content
+
+    def _alive(self, node: Tag | None) -> bool:
+        return node is not None and not node.decomposed
+
+    def _main_text(self) -> str:
+        for nodes in self._cand_nodes:
+            node = next((n for n in nodes if self._alive(n)), None)
+            if node is None:
+                continue
+            text = _paragraph_text(node)
+            if len(text) > 400 and text.count('.') >= 3:
+                return text
+        # Generic fallback: all paragraphs under article/main/body
+        art = self._first.get('article')
+        scope = art if self._alive(art) else self.soup.find('article')
+        if scope is None:
+            main = self._first.get('main')
+            scope = main if self._alive(main) else self.soup.find('main')
+        if scope is None:
+            scope = self.soup
+        paras = scope.find_all(['p', 'li'])
+        return '\n\n'.join(el.get_text(strip=True) for el in paras)
@@ -0,0 +1,193 @@
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlite_store import open_store, store_from_config
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """Klucz cache: mała litera schematu/hosta, bez domyślnego portu, fragmentu i z posortowanym query."""
+    sp = urlsplit(url.strip())
+    scheme = sp.scheme.lower()
+    host = (sp.hostname or '').lower()
+    if sp.port and sp.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{sp.port}"
+    path = sp.path or '/'
+    query = urlencode(sorted(parse_qsl(sp.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class HttpCache:
+    """Trwały cache odpowiedzi HTTP (SQLite) z walidatorami ETag/Last-Modified.
+
+    Obok treści odpowiedzi przechowuje `derived` – wyniki przetwarzania
+    (np. wyekstrahowane pola artykułu, linki z listingu), dzięki którym
+    odpowiedź 304 pomija nie tylko pobieranie, ale i parsowanie HTML.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 14 * 86400, max_bytes: int = 200 * 1024 * 1024,
+                 fresh_seconds: float = 0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' content_type TEXT,'
+            ' encoding TEXT,'
+            ' body BLOB,'
+            ' size INTEGER NOT NULL,'
+            ' derived TEXT,'
+            ' stored_at REAL NOT NULL,'
+            ' validated_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)')
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, state_dir: str) -> 'HttpCache | None':
+        return store_from_config(
+            lambda path, c: cls(
+                path,
+                ttl_seconds=float(c.get('ttl_days', 14)) * 86400,
+                max_bytes=int(float(c.get('max_mb', 200)) * 1024 * 1024),
+                fresh_seconds=float(c.get('fresh_seconds', 0)),
+            ),
+            cfg, state_dir, 'http_cache', 'HTTP_CACHE', 'http_cache.sqlite', 'HTTP cache'
+        )
+
+    def lookup(self, url: str) -> dict | None:
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, content_type, encoding, body, derived, stored_at, validated_at'
+                ' FROM responses WHERE url = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            # TTL od ostatniego potwierdzenia (200 albo 304) – wpis walidowany co uruchomienie nie wygasa
+            if now - row[7] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM responses WHERE url = ?', (key,))
+                self._conn.commit()
+                self.evicted += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (now, key))
+            self._conn.commit()
+        return {
+            'url': key,
+            'etag': row[0],
+            'last_modified': row[1],
+            'content_type': row[2],
+            'encoding': row[3],
+            'body': row[4],
+            'derived': json.loads(row[5]) if row[5] else {},
+            'fresh': (now - row[7]) < self.fresh_seconds,
+        }
+
+    def conditional_headers(self, entry: dict | None) -> dict:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, resp) -> None:
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        body = resp.content or b''
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses'
+                ' (url, etag, last_modified, content_type, encoding, body, size, derived, stored_at, validated_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)',
+                (normalize_url(url), etag, last_modified, resp.headers.get('Content-Type', ''),
+                 resp.encoding, body, len(body), now, now, now)
+            )
+            self._conn.commit()
+            self.stored += 1
+
+    def touch(self, url: str) -> None:
+        """Odpowiedź 304 – wpis nadal aktualny."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('UPDATE responses SET validated_at = ?, accessed_at = ? WHERE url = ?',
+                               (now, now, normalize_url(url)))
+            self._conn.commit()
+
+    def set_derived(self, url: str, key: str, value) -> None:
+        nurl = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute('SELECT derived FROM responses WHERE url = ?', (nurl,)).fetchone()
+            if row is None:
+                return
+            derived = json.loads(row[0]) if row[0] else {}
+            derived[key] = value
+            self._conn.execute('UPDATE responses SET derived = ? WHERE url = ?',
+                               (json.dumps(derived, ensure_ascii=False), nurl))
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """Usuwa wpisy niepotwierdzone przez serwer dłużej niż TTL, potem najdawniej używane ponad limit rozmiaru."""
+        removed = 0
+        with self._lock:
+            cur = self._conn.execute('DELETE FROM responses WHERE validated_at < ?', (time.time() - self.ttl_seconds,))
+            removed += cur.rowcount
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY accessed_at'):
+                    victims.append((url,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany('DELETE FROM responses WHERE url = ?', victims)
+                removed += len(victims)
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'stored': self.stored,
+            'evicted': self.evicted,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def log_report(self) -> None:
+        s = self.stats()
+        logger.info(
+            f"HTTP cache: hits={s['hits']} 304={s['not_modified']} misses={s['misses']} "
+            f"evicted={s['evicted']} entries={s['entries']} size={s['bytes'] / 1024 / 1024:.1f}MB"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
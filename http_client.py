@@ -0,0 +1,247 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+
+def _pool_netloc(pool) -> str:
+    default_port = {'http': 80, 'https': 443}.get(getattr(pool, 'scheme', ''), None)
+    if pool.port and pool.port != default_port:
+        return f"{pool.host}:{pool.port}"
+    return pool.host
+
+
+class _ObservedRetry(Retry):
+    """Retry, który zgłasza odpowiedzi 429/503 obserwatorowi (np. RateLimiter) zanim urllib3 ponowi żądanie."""
+
+    observer = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.observer = self.observer
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and _pool is not None and self.observer is not None:
+            # po wyczerpaniu prób (raise_on_status=False) ta sama odpowiedź wraca do HttpClient.get –
+            # znacznik chroni przed drugim zgłoszeniem (i podwójnym obniżeniem tempa domeny)
+            response.rate_observed = True
+            try:
+                self.observer(_pool_netloc(_pool), response.status, response.headers.get('Retry-After'))
+            except Exception as e:
+                logger.debug(f"Retry observer failed: {e}")
+        return super().increment(method=method, url=url, response=response, error=error,
+                                 _pool=_pool, _stacktrace=_stacktrace)
+
+
+class HttpClient:
+    """Wspólny transport HTTP dla NewsScraper.
+
+    Jedna sesja requests z pulami połączeń keep-alive (osobna pula na hosta),
+    retry z backoffem na 429/5xx oraz licznikami ponownego użycia połączeń.
+    Sesja jest współdzielona przez wątki robocze crawlera. Opcjonalny
+    HttpCache obsługuje warunkowe GET (ETag / Last-Modified).
+    """
+
+    def __init__(self, headers: dict | None = None, pool_size: int = 10, retries: int = 3,
+                 backoff_factor: float = 0.5, status_forcelist=DEFAULT_STATUS_FORCELIST,
+                 timeout: float = 20, cache=None, hosts: int = DEFAULT_POOLSIZE):
+        self.timeout = timeout
+        self.cache = cache
+        # wywoływany z (netloc, status, Retry-After) dla każdej odpowiedzi, także pośrednich prób
+        self.observer = None
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = tuple(status_forcelist or ())
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self._lock = threading.Lock()
+        self._adapters: dict[str, HTTPAdapter] = {}
+        self._requests = 0
+        self._errors = 0
+        # wspólny adapter obsługuje wszystkie hosty bez własnej puli – trzyma pulę każdego z nich
+        default = self._make_adapter(pool_size, max(hosts, DEFAULT_POOLSIZE))
+        self._adapters['*'] = default
+        self.session.mount('http://', default)
+        self.session.mount('https://', default)
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, headers: dict | None = None, cache=None) -> 'HttpClient':
+        """Buduje klienta z sekcji `http` i per-source `pool_size` z configs/sources.yaml."""
+        cfg = cfg or {}
+        http_cfg = cfg.get('http') or {}
+        hosts = {urlparse(u).netloc for src in (cfg.get('sources') or [])
+                 for u in [src.get('base_url') or ''] + list(src.get('listings') or [])} - {''}
+        client = cls(
+            headers=headers,
+            pool_size=int(http_cfg.get('pool_size', 10)),
+            retries=int(http_cfg.get('retries', 3)),
+            backoff_factor=float(http_cfg.get('backoff_factor', 0.5)),
+            status_forcelist=http_cfg.get('status_forcelist') or DEFAULT_STATUS_FORCELIST,
+            timeout=float(http_cfg.get('timeout', 20)),
+            cache=cache,
+            hosts=len(hosts),
+        )
+        for src in (cfg.get('sources') or []):
+            base = src.get('base_url')
+            size = src.get('pool_size')
+            if base and size:
+                try:
+                    client.set_host_pool(base, int(size))
+                except Exception as e:
+                    logger.warning(f"Invalid pool_size for {src.get('name')}: {e}")
+        return client
+
+    def _make_adapter(self, pool_size: int, hosts: int = 1) -> HTTPAdapter:
+        # pool_size – połączenia w puli jednego hosta; hosts – ile pul (hostów) adapter trzyma naraz
+        if pool_size < 1:
+            pool_size = 1
+        retry = _ObservedRetry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        retry.observer = self._observe
+        # pool_block=True: przy pełnej puli wątki czekają na wolne połączenie
+        # zamiast otwierać nadmiarowe (i od razu zamykane) połączenia
+        return HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size,
+                           max_retries=retry, pool_block=True)
+
+    def set_host_pool(self, base_url: str, pool_size: int) -> None:
+        """Osobna pula połączeń (o zadanym rozmiarze) dla hosta z base_url."""
+        sp = urlparse(base_url)
+        if not sp.scheme or not sp.netloc:
+            raise ValueError(f"base_url without scheme/host: {base_url}")
+        prefix = f"{sp.scheme}://{sp.netloc}/"
+        adapter = self._make_adapter(pool_size)
+        with self._lock:
+            self._adapters[sp.netloc] = adapter
+            self.session.mount(prefix, adapter)
+        logger.debug(f"HTTP pool for {sp.netloc}: maxsize={pool_size}")
+
+    def get(self, url: str, use_cache: bool = False, **kwargs) -> requests.Response:
+        """GET przez wspólną sesję. Z `use_cache` – warunkowy GET przez HttpCache.
+
+        Odpowiedź z cache (świeża lub po 304) ma `from_cache = True`.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        entry = None
+        if use_cache and self.cache is not None:
+            entry = self.cache.lookup(url)
+            if entry and entry['fresh']:
+                with self._lock:
+                    self.cache.hits += 1
+                return self._response_from_cache(url, entry)
+            if entry:
+                headers = dict(kwargs.pop('headers', None) or {})
+                headers.update(self.cache.conditional_headers(entry))
+                kwargs['headers'] = headers
+        with self._lock:
+            self._requests += 1
+        try:
+            resp = self.session.get(url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        resp.from_cache = False
+        if not getattr(resp.raw, 'rate_observed', False):
+            try:
+                self._observe(urlparse(resp.url or url).netloc, resp.status_code, resp.headers.get('Retry-After'))
+            except Exception as e:
+                logger.debug(f"Response observer failed for {url}: {e}")
+        if use_cache and self.cache is not None:
+            if resp.status_code == 304 and entry:
+                self.cache.touch(url)
+                with self._lock:
+                    self.cache.not_modified += 1
+                return self._response_from_cache(url, entry)
+            with self._lock:
+                self.cache.misses += 1
+            if resp.status_code == 200:
+                self.cache.store(url, resp)
+        return resp
+
+    def _observe(self, netloc: str, status: int, retry_after) -> None:
+        if self.observer is not None:
+            self.observer(netloc, status, retry_after)
+
+    def _response_from_cache(self, url: str, entry: dict) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = entry['body'] or b''
+        resp.encoding = entry['encoding']
+        resp.headers = CaseInsensitiveDict({'Content-Type': entry['content_type'] or ''})
+        resp.from_cache = True
+        resp.derived = entry['derived']
+        return resp
+
+    def cached_derived(self, resp: requests.Response, key: str):
+        """Wynik przetwarzania zapisany przy wcześniejszym pobraniu (tylko dla odpowiedzi z cache)."""
+        if not getattr(resp, 'from_cache', False):
+            return None
+        return (getattr(resp, 'derived', None) or {}).get(key)
+
+    def store_derived(self, url: str, key: str, value) -> None:
+        if self.cache is not None:
+            try:
+                self.cache.set_derived(url, key, value)
+            except Exception as e:
+                logger.debug(f"Cache derived write failed for {url}: {e}")
+
+    def stats(self) -> dict:
+        """Liczniki połączeń per host: nowe połączenia vs. żądania na istniejących."""
+        hosts: dict[str, dict] = {}
+        with self._lock:
+            adapters = list(self._adapters.values())
+            total_requests = self._requests
+            errors = self._errors
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host
+                h = hosts.setdefault(host, {'connections': 0, 'requests': 0})
+                h['connections'] += pool.num_connections
+                h['requests'] += pool.num_requests
+        for h in hosts.values():
+            h['reused'] = max(0, h['requests'] - h['connections'])
+        return {
+            'requests': total_requests,
+            'errors': errors,
+            'connections': sum(h['connections'] for h in hosts.values()),
+            'reused': sum(h['reused'] for h in hosts.values()),
+            'hosts': hosts,
+        }
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        logger.info(
+            f"HTTP: {s['requests']} requests, {s['connections']} connections opened, "
+            f"{s['reused']} reused, {s['errors']} errors"
+        )
+        for host, h in s['hosts'].items():
+            logger.debug(f"HTTP {host}: connections={h['connections']} requests={h['requests']} reused={h['reused']}")
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from news_scraper import NewsScraper, news_window
+from pipeline import ScrapePipeline
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """Jedno uruchomienie crawl + streszczenia z postępem, wynikami częściowymi i anulowaniem."""
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.status = 'queued'
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.items: list[dict] = []
+        self.progress = {'crawled': 0, 'summarized': 0, 'delivered': 0}
+        self.pipeline: ScrapePipeline | None = None
+        self.metrics: dict | None = None
+        self.cancel_event = threading.Event()
+        # powiadamia strumienie o nowych elementach / zmianie statusu
+        self.changed = threading.Condition()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def add_item(self, item: dict) -> None:
+        with self.changed:
+            self.items.append(item)
+            self.progress['delivered'] = len(self.items)
+            self.changed.notify_all()
+
+    def set_status(self, status: str, error: str | None = None) -> None:
+        with self.changed:
+            self.status = status
+            if error:
+                self.error = error
+            if status == 'running':
+                self.started_at = time.time()
+            elif status not in ACTIVE_STATUSES:
+                self.finished_at = time.time()
+            self.changed.notify_all()
+
+    def wait_items(self, offset: int, timeout: float = 2.0) -> tuple[list[dict], bool]:
+        """Elementy od `offset` (czeka do `timeout` na nowe); drugi element: czy job jeszcze trwa."""
+        with self.changed:
+            if offset >= len(self.items) and self.active:
+                self.changed.wait(timeout)
+            return self.items[offset:], self.active
+
+    def iter_items(self):
+        """Artykuły dostarczone do chwili wywołania – po jednym, bez kopiowania listy (gdy archiwum wyłączone)."""
+        with self.changed:
+            count = len(self.items)
+        # lista tylko rośnie (append), więc indeksy < count są stabilne
+        for i in range(count):
+            yield self.items[i]
+
+    def current_progress(self) -> dict:
+        progress = dict(self.progress)
+        if self.pipeline is not None:
+            progress['crawled'] = self.pipeline.crawled
+            progress['summarized'] = self.pipeline.summarized
+        return progress
+
+    def to_dict(self, offset: int | None = None) -> dict:
+        data = {
+            'job_id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.current_progress(),
+        }
+        if offset is not None:
+            data['offset'] = offset
+            data['items'] = [dict(item) for item in self.items[offset:]]
+        return data
+
+
+class JobManager:
+    """Zarządca zadań /api/jobs.
+
+    Ograniczona pula wykonawcza (JOBS_MAX_WORKERS), limit zadań w kolejce
+    (JOBS_MAX_QUEUED), deduplikacja: zadanie o tym samym kluczu (okno dat +
+    config) dołącza do już trwającego zamiast uruchamiać drugi crawl.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_queued: int | None = None, keep_finished: int = 20):
+        # NEWS_WINDOW_DAYS z .env potrzebny już do klucza zadania (przed pierwszym NewsScraperem)
+        try:
+            load_dotenv()
+        except Exception:
+            pass
+        try:
+            max_workers = max_workers or int(os.environ.get('JOBS_MAX_WORKERS', '2'))
+        except Exception:
+            max_workers = 2
+        try:
+            max_queued = max_queued or int(os.environ.get('JOBS_MAX_QUEUED', '8'))
+        except Exception:
+            max_queued = 8
+        self.max_queued = max(1, max_queued)
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+
+    @staticmethod
+    def job_key(config_path: str) -> str:
+        start_date, today = news_window()
+        return f"{start_date}:{today}:{os.path.abspath(config_path)}"
+
+    def submit(self, scraper_factory=NewsScraper, config_path: str = 'configs/sources.yaml') -> tuple[Job, bool]:
+        """Zwraca (job, created). Przy trwającym zadaniu dla tego samego okna – to zadanie.
+
+        Scraper (cache, rejestry SQLite, pula procesów) powstaje dopiero dla
+        nowego zadania – dołączenie i odrzucenie (JobQueueFull) go nie otwierają.
+        """
+        key = self.job_key(config_path)
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.active:
+                    logger.info(f"Job {job.id} already running for {key}, attaching")
+                    return job, False
+            queued = sum(1 for j in self._jobs.values() if j.status == 'queued')
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs already queued")
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._prune()
+        try:
+            scraper = scraper_factory(config_path)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed to start: {e}")
+            job.set_status('failed', str(e))
+            raise
+        self._pool.submit(self._run, job, scraper)
+        logger.info(f"Job {job.id} queued for {key}")
+        return job, True
+
+    def _prune(self) -> None:
+        finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.finished_at or 0)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            self._jobs.pop(job.id, None)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.active:
+            job.cancel_event.set()
+            if job.status == 'queued':
+                job.set_status('cancelled')
+            logger.info(f"Job {job.id} cancel requested")
+        return job
+
+    def _run(self, job: Job, scraper: NewsScraper) -> None:
+        if job.cancel_event.is_set():
+            scraper.close()
+            return
+        job.set_status('running')
+        try:
+            scraper.cancel_event = job.cancel_event
+            scraper.job_id = job.id
+            pipeline = ScrapePipeline(scraper)
+            job.pipeline = pipeline
+            for item in pipeline.run():
+                job.add_item(item)
+            job.progress = job.current_progress()
+            job.metrics = pipeline.run_metrics
+            job.pipeline = None
+            if job.cancel_event.is_set():
+                job.set_status('cancelled')
+            elif pipeline.error:
+                job.set_status('failed', pipeline.error)
+            else:
+                job.set_status('done')
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.set_status('failed', str(e))
+        finally:
+            scraper.close()
+        logger.info(f"Job {job.id} {job.status}: {len(job.items)} items")
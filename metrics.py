@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# etapy przetwarzania mierzone w crawlu i streszczaniu
+STAGES = ('fetch', 'rate_limit_wait', 'parse', 'date', 'content', 'dedup', 'gemini')
+# granice kubełków histogramu (sekundy) – od parsowania (ms) po wywołania Gemini (s)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UNKNOWN_SOURCE = 'other'
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + '}'
+
+
+class _Histogram:
+    __slots__ = ('count', 'sum', 'max', 'buckets', 'samples')
+
+    def __init__(self, keep_samples: bool):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples: list[float] | None = [] if keep_samples else None
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        if self.samples is not None:
+            self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        data = {'count': self.count, 'total_s': round(self.sum, 4), 'max_ms': round(self.max * 1000, 2)}
+        if self.count:
+            data['mean_ms'] = round(self.sum / self.count * 1000, 2)
+        if self.samples:
+            ordered = sorted(self.samples)
+            data['p50_ms'] = round(_percentile(ordered, 0.5) * 1000, 2)
+            data['p95_ms'] = round(_percentile(ordered, 0.95) * 1000, 2)
+        return data
+
+
+class Metrics:
+    """Czasy etapów (fetch, oczekiwanie na rate limit, parsowanie, data, treść, Gemini) i liczniki.
+
+    Jedna instancja na uruchomienie scrapera (`detailed=True`: próbki do
+    p50/p95 i czasy per URL do podsumowania JSON) przekazuje każdy pomiar
+    także do `REGISTRY` – sum z całego procesu, wystawianych przez
+    /api/metrics w formacie tekstowym Prometheusa.
+    """
+
+    def __init__(self, parent: 'Metrics | None' = None, detailed: bool = False):
+        self.parent = parent
+        self.detailed = detailed
+        self._lock = threading.Lock()
+        self._hist: dict[tuple[str, str], _Histogram] = {}
+        self._counters: dict[tuple[str, str, tuple], float] = {}
+        self._urls: dict[str, dict[str, float]] = {}
+        self._domains: dict[str, str] = {}
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.runs = 0
+        self.last_run: dict | None = None
+
+    @classmethod
+    def for_config(cls, cfg: dict | None, parent: 'Metrics | None' = None) -> 'Metrics':
+        metrics = cls(parent=parent if parent is not None else REGISTRY, detailed=True)
+        metrics.set_sources(cfg)
+        return metrics
+
+    def set_sources(self, cfg: dict | None) -> None:
+        """Mapa domena -> nazwa źródła (z base_url i listings) dla etykiety `source`."""
+        domains = {}
+        for src in ((cfg or {}).get('sources') or []):
+            name = src.get('name')
+            if not name:
+                continue
+            for url in [src.get('base_url')] + list(src.get('listings') or []):
+                if url:
+                    domains[urlparse(url).netloc] = name
+        self._domains = domains
+
+    def source_for(self, url: str) -> str:
+        if not url:
+            return UNKNOWN_SOURCE
+        netloc = urlparse(url).netloc
+        name = self._domains.get(netloc)
+        if name is None and netloc.startswith('www.'):
+            name = self._domains.get(netloc[4:])
+        if name is None:
+            name = self._domains.get('www.' + netloc)
+        return name or UNKNOWN_SOURCE
+
+    def observe(self, stage: str, seconds: float, url: str = '', source: str | None = None) -> None:
+        source = source or self.source_for(url)
+        with self._lock:
+            h = self._hist.get((stage, source))
+            if h is None:
+                h = self._hist[(stage, source)] = _Histogram(self.detailed)
+            h.add(seconds)
+            if self.detailed and url:
+                per_url = self._urls.setdefault(url, {})
+                per_url[stage] = per_url.get(stage, 0.0) + seconds
+        if self.parent is not None:
+            self.parent.observe(stage, seconds, source=source)
+
+    @contextmanager
+    def span(self, stage: str, url: str = ''):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, url)
+
+    def count(self, name: str, url: str = '', value: float = 1, source: str | None = None, **labels) -> None:
+        source = source or self.source_for(url)
+        key = (name, source, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        if self.parent is not None:
+            self.parent.count(name, value=value, source=source, **labels)
+
+    def summary(self) -> dict:
+        """Podsumowanie uruchomienia: etapy (łącznie i per źródło), liczniki, najwolniejsze URL-e."""
+        with self._lock:
+            hist = dict(self._hist)
+            counters = dict(self._counters)
+            urls = {u: dict(s) for u, s in self._urls.items()}
+        finished = self.finished_at or time.time()
+        stages: dict[str, _Histogram] = {}
+        sources: dict[str, dict] = {}
+        for (stage, source), h in sorted(hist.items()):
+            total = stages.setdefault(stage, _Histogram(self.detailed))
+            total.count += h.count
+            total.sum += h.sum
+            total.max = max(total.max, h.max)
+            if h.samples is not None:
+                total.samples.extend(h.samples)
+            sources.setdefault(source, {'stages': {}, 'counters': {}})['stages'][stage] = h.summary()
+        for (name, source, labels), value in sorted(counters.items()):
+            bucket = sources.setdefault(source, {'stages': {}, 'counters': {}})['counters'].setdefault(name, {})
+            bucket[','.join(f'{k}={v}' for k, v in labels) or 'total'] = value
+        slowest = sorted(urls.items(), key=lambda kv: sum(kv[1].values()), reverse=True)[:20]
+        return {
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'finished_at': datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+            'duration_s': round(finished - self.started_at, 3),
+            'stages': {stage: stages[stage].summary() for stage in STAGES if stage in stages},
+            'sources': sources,
+            'slowest_urls': [{'url': u, 'source': self.source_for(u), 'total_s': round(sum(s.values()), 4),
+                              'stages': {k: round(v, 4) for k, v in s.items()}} for u, s in slowest],
+            'urls': {u: {k: round(v, 4) for k, v in s.items()} for u, s in urls.items()},
+        }
+
+    def finish(self, out_dir: str | None = None, keep: int = 20) -> dict:
+        """Zamyka uruchomienie: podsumowanie do logu, pliku JSON (out_dir) i rejestru procesu."""
+        self.finished_at = time.time()
+        summary = self.summary()
+        parts = [f"{stage} {s['total_s']:.1f}s/{s['count']}" for stage, s in summary['stages'].items()]
+        logger.info(f"Run metrics ({summary['duration_s']:.1f}s): " + (', '.join(parts) or 'no spans'))
+        for source, data in summary['sources'].items():
+            outcomes = data['counters'].get('articles')
+            if outcomes:
+                logger.info(f"Run metrics {source}: " + ', '.join(f"{k}={v:g}" for k, v in outcomes.items()))
+        if out_dir:
+            try:
+                os.makedirs(out_dir, exist_ok=True)
+                path = os.path.join(out_dir, f"run-{datetime.fromtimestamp(self.started_at):%Y%m%d-%H%M%S}.json")
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+                summary['path'] = path
+                logger.info(f"Run metrics saved to {path}")
+                old = sorted(n for n in os.listdir(out_dir) if n.startswith('run-') and n.endswith('.json'))
+                for name in old[:max(0, len(old) - keep)]:
+                    os.remove(os.path.join(out_dir, name))
+            except Exception as e:
+                logger.error(f"Failed to write run metrics: {e}")
+        if self.parent is not None:
+            self.parent.record_run(summary)
+        return summary
+
+    def record_run(self, summary: dict) -> None:
+        with self._lock:
+            self.runs += 1
+            self.last_run = summary
+
+    def render_prometheus(self) -> str:
+        """Format tekstowy Prometheusa (exposition format 0.0.4)."""
+        with self._lock:
+            hist = sorted(self._hist.items())
+            counters = sorted(self._counters.items())
+            runs = self.runs
+            last_run = self.last_run
+        lines = [
+            '# HELP scraper_stage_seconds Czas etapów crawl/streszczania per źródło.',
+            '# TYPE scraper_stage_seconds histogram',
+        ]
+        for (stage, source), h in hist:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.buckets):
+                cumulative += n
+                lines.append(f"scraper_stage_seconds_bucket{_labels(stage=stage, source=source, le=bound)} {cumulative}")
+            lines.append(f"scraper_stage_seconds_bucket{_labels(stage=stage, source=source, le='+Inf')} {h.count}")
+            lines.append(f"scraper_stage_seconds_sum{_labels(stage=stage, source=source)} {h.sum:.6f}")
+            lines.append(f"scraper_stage_seconds_count{_labels(stage=stage, source=source)} {h.count}")
+        seen = set()
+        for (name, source, labels), value in counters:
+            metric = f"scraper_{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(source=source, **dict(labels))} {value:g}")
+        lines.append('# TYPE scraper_runs_total counter')
+        lines.append(f"scraper_runs_total {runs}")
+        if last_run:
+            lines.append('# TYPE scraper_last_run_duration_seconds gauge')
+            lines.append(f"scraper_last_run_duration_seconds {last_run['duration_s']}")
+        return '\n'.join(lines) + '\n'
+
+
+# sumy z całego procesu (wszystkie uruchomienia) – /api/metrics
+REGISTRY = Metrics()
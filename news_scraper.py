@@ -1,19 +1,32 @@
-import requests
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import json
 from dateutil import parser
 import logging
-import re
 from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 import threading
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import yaml
 import feedparser
+from article_store import ArticleStore
+from async_engine import AsyncCrawlEngine
+import coordination
+from crawl_state import CrawlState, links_fingerprint
+from dedup import Deduplicator
+from extraction import make_soup
+from enrichment import MODEL_NAME as GEMINI_MODEL, GeminiEnricher
+from http_cache import HttpCache
+from http_client import HttpClient
+from metrics import UNKNOWN_SOURCE, Metrics
+from parse_pool import NEEDS_PAGE, ParsePool, evaluate_page
+from records import ArticleRecord
+from rate_limit import RateLimiter
+from rules import RuleSet
+from sitemaps import modified_since, parse_lastmod, parse_sitemap
+from summary_cache import SummaryCache
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -25,8 +38,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def news_window() -> tuple:
+    """Okno dat (start, dziś): NEWS_WINDOW_DAYS (1–30) dni wstecz od dziś."""
+    try:
+        window_days = int(os.environ.get('NEWS_WINDOW_DAYS', '3'))
+    except Exception:
+        window_days = 3
+    if window_days < 1:
+        window_days = 1
+    if window_days > 30:
+        window_days = 30
+    now = datetime.now()
+    return (now - timedelta(days=window_days)).date(), now.date()
+
+
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, config_path: str = 'configs/sources.yaml'):
         # load .env once
         try:
             load_dotenv()
@@ -36,21 +64,86 @@ class NewsScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7'
         }
-        self.today = datetime.now().date()
-        try:
-            window_days = int(os.environ.get('NEWS_WINDOW_DAYS', '3'))
-        except Exception:
-            window_days = 3
-        if window_days < 1:
-            window_days = 1
-        if window_days > 30:
-            window_days = 30
-        self.start_date = (datetime.now() - timedelta(days=window_days)).date()
+        self.reset_window()
         self.news_items = []
+        # wywoływany dla każdego zaakceptowanego artykułu (np. kolejka streszczeń w ScrapePipeline)
+        self.on_item = None
+        # ustawiany z zewnątrz (np. anulowanie zadania) – przerywa crawl przy najbliższej okazji
+        self.cancel_event = threading.Event()
+        # id zadania (/api/jobs) – artykuły w archiwum są z nim wiązane na potrzeby eksportu
+        self.job_id: str | None = None
         self.genai_model = None
-        # rate-limit per domain
-        self._domain_locks: dict[str, threading.Lock] = {}
-        self._domain_last: dict[str, float] = {}
+        # config + wspólny transport HTTP (pule keep-alive per host)
+        self.config_path = config_path
+        self.config = self._load_config(config_path)
+        self.state_dir = os.environ.get('SCRAPER_STATE_DIR') or self.config.get('state_dir') or '.scraper_state'
+        # reguły per źródło (filtr linków, kandydaci treści, formaty dat) skompilowane raz z configu
+        self.rules = RuleSet.from_config(self.config)
+        # czasy etapów i powody odrzuceń tego uruchomienia (sumy procesu: metrics.REGISTRY)
+        self.metrics = Metrics.for_config(self.config)
+        # linki zlecone w tym uruchomieniu (listingi + sitemapy) i lastmod znany z sitemap
+        self._links_lock = threading.Lock()
+        self._run_links: set[str] = set()
+        self._sitemap_lastmod: dict[str, datetime | None] = {}
+        # data wpisu z feedu – gdy strona artykułu nie ma własnej daty
+        self._feed_dates: dict[str, str] = {}
+        # daty artykułów (z oceny, rejestru, lastmod) – do wykrycia strony listingu sprzed okna
+        self._link_dates: dict[str, str] = {}
+        # rate-limit per domain (token bucket, rate/burst z configu)
+        self.rate_limiter = RateLimiter.from_config(self.config)
+        self.http = self._build_http_client()
+        self.crawl_state = CrawlState.from_config(self.config, self.state_dir)
+        self.summary_cache = SummaryCache.from_config(self.config, self.state_dir)
+        # duplikaty treści (MinHash/LSH) i powtórki starych historii; DEDUP=0 wyłącza
+        self.dedup = Deduplicator.from_config(self.config, self.state_dir)
+        # archiwum artykułów (SQLite + FTS5) zamiast zrzutów JSON; ARTICLE_STORE=0 wyłącza
+        self.article_store = ArticleStore.from_config(self.config, self.state_dir)
+        # zrzut news_<okno>.json tylko na życzenie (SAVE_JSON=1 albo save_json: true)
+        self.save_json = os.environ.get('SAVE_JSON', '1' if self.config.get('save_json') else '0') == '1'
+        # parsowanie stron artykułów w procesach roboczych (poza GIL); SCRAPER_PARSE_PROCESSES=0 – w wątkach
+        self.parse_pool = ParsePool.from_config(self.config)
+        # kilka instancji (gunicorn, kilka hostów): wspólny frontier z dzierżawami, limiter domen, wyniki
+        self.coordinator = coordination.from_config(self.config, self.state_dir)
+        self.rate_limiter.shared = self.coordinator
+
+    def reset_window(self) -> None:
+        """Okno dat od dziś (`news_window`; ponownie w długo działającym harmonogramie)."""
+        self.start_date, self.today = news_window()
+
+    def _build_http_client(self) -> HttpClient:
+        cache = HttpCache.from_config(self.config, self.state_dir)
+        client = HttpClient.from_config(self.config, headers=self.headers, cache=cache)
+        client.observer = self.rate_limiter.observe
+        return client
+
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def close(self) -> None:
+        self.http.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.coordinator is not None:
+            try:
+                self.coordinator.release()
+            except Exception as e:
+                logger.warning(f"Coordination release failed: {e}")
+            self.coordinator.close()
+        for store in (self.crawl_state, self.summary_cache, self.dedup, self.article_store):
+            if store is not None:
+                store.close()
+
+    def finish_metrics(self) -> dict:
+        """Podsumowanie czasów etapów tego uruchomienia (log + <state_dir>/runs/run-*.json)."""
+        return self.metrics.finish(os.path.join(self.state_dir, 'runs'))
+
+    def _load_config(self, config_path: str) -> dict:
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.error(f"Failed to read config {config_path}: {e}")
+            return {}
 
     def _date_in_window(self, dt: datetime) -> bool:
         try:
@@ -59,93 +152,70 @@ class NewsScraper:
             d = dt
         return self.start_date <= d <= self.today
 
-    def _add_item(self, title: str, content: str, link: str, dt: datetime | None):
+    def _add_item(self, title: str, content: str, link: str, dt: datetime | None, signature=None) -> bool:
+        return self._accept_item(title, content, link, dt, signature) == 'added'
+
+    def _accept_item(self, title: str, content: str, link: str, dt: datetime | None, signature=None) -> str:
+        """Dodaje artykuł do wyników; zwraca 'added' albo powód odrzucenia
+        ('single_word_title', 'reported_elsewhere' – zgłosiła go inna instancja,
+        'duplicate' – dołączony do `linki` wcześniejszego artykułu, 'repost').
+        `signature` – sygnatura MinHash policzona wcześniej (ParsePool, indeks)."""
         # Skip titles with a single word
         if len((title or '').split()) <= 1:
             logger.debug(f"Skip single-word title: {title} ({link})")
-            return
-        self.news_items.append({
-            'tytuł': title,
-            'treść': content,
-            'link': link,
-            'data': (dt.date().isoformat() if isinstance(dt, datetime) else (dt.isoformat() if hasattr(dt, 'isoformat') else None))
-        })
-
-    def _extract_date_from_soup(self, soup):
-        # 1) Meta daty (kilka wariantów)
-        meta_props = [
-            {'property': 'article:published_time'},
-            {'property': 'article:modified_time'},
-            {'property': 'og:published_time'},
-            {'property': 'og:updated_time'},
-            {'name': 'date'},
-            {'name': 'pubdate'},
-            {'itemprop': 'datePublished'},
-            {'itemprop': 'dateModified'}
-        ]
-        for attrs in meta_props:
-            meta_time = soup.find('meta', attrs=attrs)
-            if meta_time and meta_time.get('content'):
-                try:
-                    return parser.parse(meta_time['content'])
-                except Exception:
-                    continue
-
-        # 2) <time datetime> lub tekst w <time>
-        for time_tag in soup.find_all('time'):
-            dt_val = time_tag.get('datetime') or time_tag.get('content') or time_tag.get_text(strip=True)
-            if not dt_val:
-                continue
-            try:
-                return parser.parse(dt_val, dayfirst=True)
-            except Exception:
-                continue
-
-        # 3) Szukaj dat w tekście (wiele formatów)
-        full_text = soup.get_text(' ', strip=True)
-        # dd/mm/yyyy
-        m = re.search(r"\b(\d{1,2}/\d{1,2}/\d{4})\b", full_text)
-        if m:
-            try:
-                return datetime.strptime(m.group(1), "%d/%m/%Y")
-            except Exception:
-                pass
-        # dd.mm.yyyy
-        m = re.search(r"\b(\d{1,2}\.\d{1,2}\.\d{4})\b", full_text)
-        if m:
+            return 'single_word_title'
+        item = ArticleRecord(
+            title, content, link,
+            (dt.date().isoformat() if isinstance(dt, datetime) else (dt.isoformat() if hasattr(dt, 'isoformat') else None)),
+            source=self._source_name(link)
+        )
+        if self.coordinator is not None:
             try:
-                return datetime.strptime(m.group(1), "%d.%m.%Y")
-            except Exception:
-                pass
-        # yyyy-mm-dd
-        m = re.search(r"\b(\d{4}-\d{2}-\d{2})\b", full_text)
-        if m:
+                if not self.coordinator.claim_result(link):
+                    logger.debug(f"Already reported by another instance: {link}")
+                    return 'reported_elsewhere'
+            except Exception as e:
+                logger.debug(f"Coordination result check failed for {link}: {e}")
+        if self.dedup is not None:
             try:
-                return datetime.strptime(m.group(1), "%Y-%m-%d")
-            except Exception:
-                pass
-        # 1 września 2025 (polskie miesiące)
-        months = {
-            'stycznia': 1, 'lutego': 2, 'marca': 3, 'kwietnia': 4, 'maja': 5, 'czerwca': 6,
-            'lipca': 7, 'sierpnia': 8, 'września': 9, 'pazdziernika': 10, 'października': 10,
-            'listopada': 11, 'grudnia': 12
-        }
-        m = re.search(r"\b(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|pazdziernika|listopada|grudnia)\s+(\d{4})\b", full_text, re.IGNORECASE)
-        if m:
+                verdict, other = self.dedup.admit(item, self.start_date, signature)
+            except Exception as e:
+                logger.debug(f"Dedup check failed for {link}: {e}")
+                verdict, other = 'new', None
+            if verdict == 'duplicate' and not isinstance(other, ArticleRecord):
+                # historia z wcześniejszego uruchomienia – link dopisany do artykułu w archiwum
+                if self.article_store is not None:
+                    try:
+                        self.article_store.add_link(other['link'], link)
+                    except Exception as e:
+                        logger.debug(f"Article store link merge failed for {link}: {e}")
+                logger.debug(f"Duplicate of archived {other['link']}: {link}")
+                return 'duplicate'
+            if verdict == 'duplicate':
+                with self._links_lock:
+                    links = other.setdefault('linki', [other['link']])
+                    if link not in links:
+                        links.append(link)
+                self.store_item(other)
+                logger.debug(f"Duplicate of {other['link']}: {link}")
+                return 'duplicate'
+            if verdict == 'repost':
+                logger.debug(f"Repost of {other['link']} ({other['date']}): {link}")
+                return 'repost'
+        self.news_items.append(item)
+        # archiwum i indeks wyszukiwania od razu; streszczenie dopisuje kolejny upsert
+        self.store_item(item)
+        if self.on_item is not None:
             try:
-                day = int(m.group(1))
-                month = months[m.group(2).lower()]
-                year = int(m.group(3))
-                return datetime(year, month, day)
-            except Exception:
-                pass
-
-        return None
+                self.on_item(item)
+            except Exception as e:
+                logger.error(f"Item handler failed for {link}: {e}")
+        return 'added'
 
-    def _discover_links(self, base_url: str, soup: BeautifulSoup, max_links: int = 80, allow_substrings: list[str] | None = None, allow_regex: str | None = None, deny_ext: tuple[str, ...] = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip', '.doc', '.docx', '.xls', '.xlsx')):
+    def _discover_links(self, base_url: str, soup: BeautifulSoup, max_links: int = 80, allow_substrings: list[str] | None = None, allow_regex: str | None = None):
         base_netloc = urlparse(base_url).netloc
         links = []
-        regex_compiled = re.compile(allow_regex) if allow_regex else None
+        rules = self.rules.link_filter(base_url, allow_substrings, allow_regex)
         for a in soup.find_all('a', href=True):
             href = a['href']
             if href.startswith('mailto:') or href.startswith('tel:') or href.startswith('javascript:'):
@@ -154,16 +224,7 @@ class NewsScraper:
             # strip fragment
             sp = urlsplit(abs_url)
             abs_url = urlunsplit((sp.scheme, sp.netloc, sp.path, sp.query, ''))
-            if urlparse(abs_url).netloc != base_netloc:
-                continue
-            if any(abs_url.lower().endswith(ext) for ext in deny_ext):
-                continue
-            if allow_substrings and not any(s in abs_url for s in allow_substrings):
-                continue
-            if regex_compiled and not regex_compiled.search(abs_url):
-                continue
-            # Skip edunews listing pages with pagination
-            if 'edunews.pl' in base_netloc and 'aktualnosci' in abs_url and 'start=' in abs_url:
+            if not rules.link_allowed(abs_url, base_netloc):
                 continue
             if abs_url not in links:
                 links.append(abs_url)
@@ -172,145 +233,30 @@ class NewsScraper:
         logger.debug(f"Discovered {len(links)} links from {base_url}")
         return links
 
-    def _extract_title_and_content(self, soup: BeautifulSoup, url: str):
-        # Title
-        title_elem = soup.find('h1') or soup.find('title')
-        title = title_elem.get_text(strip=True) if title_elem else 'Brak tytułu'
-        content = self._extract_main_text(soup, url)
-        return title, content
-
-    def _is_probably_article(self, soup: BeautifulSoup, url: str) -> bool:
-        # Check OpenGraph type
-        og_type = soup.find('meta', attrs={'property': 'og:type'})
-        if og_type and 'article' in (og_type.get('content') or '').lower():
-            return True
-        # Schema.org Article
-        if soup.find(attrs={'itemtype': re.compile('Article', re.I)}):
-            return True
-        # Presence of <article> with h1 and multiple paragraphs
-        art = soup.find('article')
-        if art:
-            has_h1 = art.find('h1') is not None
-            num_p = len(art.find_all('p'))
-            if has_h1 and num_p >= 3:
-                return True
-        # Fallback: main with multiple paragraphs
-        main = soup.find('main')
-        if main and len(main.find_all('p')) >= 3:
-            return True
-        # Some WP/Drupal use class names
-        if soup.find('div', class_=re.compile('(entry-content|article-body|field--name-body)', re.I)):
-            return True
-        return False
-
-    def _clean_soup(self, soup: BeautifulSoup) -> None:
-        # remove scripts/styles and common chrome
-        for sel in ['script', 'style', 'noscript', 'iframe', 'form']:
-            for el in soup.select(sel):
-                el.decompose()
-        chrome_selectors = [
-            'header', 'footer', 'nav', 'aside', '.breadcrumb', '.breadcrumbs',
-            '.menu', '.navbar', '.sidebar', '.pagination', '.pager', '.cookie', '.cookies'
-        ]
-        for sel in chrome_selectors:
-            for el in soup.select(sel):
-                el.decompose()
-
     def _get_domain(self, url: str) -> str:
         return urlparse(url).netloc
 
     def _respect_rate_limit(self, url: str) -> None:
-        try:
-            rps = float(os.environ.get('DOMAIN_RPS', '1.0'))
-        except Exception:
-            rps = 1.0
-        if rps <= 0:
-            rps = 0.1
-        min_interval = 1.0 / rps
-        domain = self._get_domain(url)
-        lock = self._domain_locks.setdefault(domain, threading.Lock())
-        with lock:
-            last = self._domain_last.get(domain, 0.0)
-            now = time.time()
-            wait = last + min_interval - now
-            if wait > 0:
-                time.sleep(wait)
-            self._domain_last[domain] = time.time()
-
-    def _extract_main_text(self, soup: BeautifulSoup, url: str) -> str:
-        self._clean_soup(soup)
-        domain = urlparse(url).netloc
-        candidates: list[tuple[str, list[str]]] = []
-        if 'edunews.pl' in domain:
-            candidates = [
-                ('div', ['itemFullText']),  # Joomla content
-                ('div', ['content']),
-                ('div', ['article-body']),
-                ('div', ['articleContent']),
-                ('div', ['itemprop=articleBody'])
-            ]
-        elif 'frse.org.pl' in domain:
-            candidates = [
-                ('div', ['field--name-body']),  # Drupal body
-                ('div', ['node__content']),
-                ('article', []),
-                ('div', ['entry-content']),
-                ('div', ['content'])
-            ]
-        elif 'youth.europa.eu' in domain:
-            candidates = [
-                ('div', ['field--name-body']),  # Drupal body
-                ('article', []),
-                ('main', [])
-            ]
-        elif 'ibe.edu.pl' in domain:
-            candidates = [
-                ('div', ['entry-content']),
-                ('article', []),
-                ('main', [])
-            ]
-        # Try candidates
-        for tag, classes in candidates:
-            if classes:
-                for cls in classes:
-                    if 'itemprop=' in cls:
-                        itemprop = cls.split('=', 1)[1]
-                        node = soup.find(tag, attrs={'itemprop': itemprop})
-                    else:
-                        node = soup.find(tag, class_=re.compile(cls))
-                    if node:
-                        parts = []
-                        parts.extend(p.get_text(strip=True) for p in node.find_all('p'))
-                        parts.extend(li.get_text(strip=True) for li in node.find_all('li'))
-                        text = '\n\n'.join([t for t in parts if t])
-                        if len(text) > 400 and text.count('.') >= 3:
-                            return text
-            else:
-                node = soup.find(tag)
-                if node:
-                    parts = []
-                    parts.extend(p.get_text(strip=True) for p in node.find_all('p'))
-                    parts.extend(li.get_text(strip=True) for li in node.find_all('li'))
-                    text = '\n\n'.join([t for t in parts if t])
-                    if len(text) > 400 and text.count('.') >= 3:
-                        return text
-        # Generic fallback: all paragraphs under article/main/body
-        scope = soup.find('article') or soup.find('main') or soup
-        paras = scope.find_all(['p', 'li']) if scope else soup.find_all(['p', 'li'])
-        text = '\n\n'.join(el.get_text(strip=True) for el in paras)
-        return text
+        # czekanie poza jakimkolwiek lockiem – inne wątki/domeny nie stoją w kolejce
+        with self.metrics.span('rate_limit_wait', url):
+            self.rate_limiter.wait(url)
+
+    def _get(self, url: str, timeout: float = 20):
+        with self.metrics.span('fetch', url):
+            return self.http.get(url, use_cache=True, timeout=timeout)
 
     def _fetch_sitemaps_from_robots(self, base_url: str):
         robots = urljoin(base_url, '/robots.txt')
         try:
             logger.debug(f"Fetching robots: {robots}")
-            r = requests.get(robots, headers=self.headers, timeout=15)
+            self._respect_rate_limit(robots)
+            r = self._get(robots, timeout=15)
             r.raise_for_status()
             sitemaps = []
             for line in r.text.splitlines():
                 if line.lower().startswith('sitemap:'):
                     sm = line.split(':', 1)[1].strip()
-                    sitemaps.append(sm)
+                    sitemaps.append(urljoin(base_url, sm))
             logger.debug(f"Found {len(sitemaps)} sitemaps in robots")
             return sitemaps
         except Exception as e:
@@ -318,69 +264,393 @@ class NewsScraper:
             return []
 
     def _fetch_sitemap_links(self, sitemap_url: str):
+        """(podmapy, URL-e) jednej sitemapy jako pary (loc, lastmod); po 304 – wynik parsowania z cache."""
         try:
             logger.debug(f"Fetch sitemap: {sitemap_url}")
-            r = requests.get(sitemap_url, headers=self.headers, timeout=20)
+            self._respect_rate_limit(sitemap_url)
+            r = self._get(sitemap_url)
             r.raise_for_status()
-            soup = BeautifulSoup(r.text, 'xml')
-            links = []
-            # sitemap index
-            for sm in soup.find_all('sitemap'):
-                loc = sm.find('loc')
-                if loc and loc.text:
-                    links.extend(self._fetch_sitemap_links(loc.text.strip()))
-            # urlset
-            for url in soup.find_all('url'):
-                loc = url.find('loc')
-                if not loc or not loc.text:
-                    continue
-                lastmod = None
-                lm = url.find('lastmod')
-                if lm and lm.text:
-                    try:
-                        lastmod = parser.parse(lm.text.strip())
-                    except Exception:
-                        lastmod = None
-                links.append((loc.text.strip(), lastmod))
-            return links
+            cached = self.http.cached_derived(r, 'sitemap')
+            if cached:
+                return cached['children'], cached['urls']
+            with self.metrics.span('parse', sitemap_url):
+                children, urls = parse_sitemap(r.content)
+            self.http.store_derived(sitemap_url, 'sitemap', {'children': children, 'urls': urls})
+            return children, urls
         except Exception as e:
             logger.debug(f"Sitemap fetch failed {sitemap_url}: {e}")
-            return []
+            return [], []
+
+    def discover_from_sitemaps(self, src: dict) -> list[str]:
+        """Artykuły źródła z sitemap, zmienione w oknie dat – bez pobierania samych stron.
+
+        Sitemapy (z `sitemaps` źródła, z robots.txt albo /sitemap.xml) są
+        przechodzone poziomami; sitemapy jednego poziomu pobierane równolegle.
+        Podmapy indeksu z lastmod sprzed okna są pomijane w całości. Zwracane
+        są tylko URL-e ze znanym lastmod w oknie (bez lastmod zostają dla
+        listingów); lastmod wszystkich URL-i trafia do `_sitemap_lastmod`,
+        skąd `_filter_known_links` odrzuca też nieaktualne linki z listingów.
+        """
+        name = src.get('name')
+        base = src.get('base_url') or ''
+        opts = self.config.get('sitemaps') or {}
+        try:
+            max_depth = int(opts.get('max_depth', 3))
+            workers = max(1, int(opts.get('workers', 4)))
+        except Exception:
+            max_depth, workers = 3, 4
+        base_netloc = urlparse(base).netloc
+        rules = self.rules.link_filter(base, src.get('allow_substrings'), src.get('allow_regex'))
+
+        level = list(src.get('sitemaps') or []) or self._fetch_sitemaps_from_robots(base) or [urljoin(base, '/sitemap.xml')]
+        seen: set[str] = set()
+        entries: dict[str, datetime | None] = {}
+        pruned = 0
+        for _depth in range(max_depth):
+            level = [u for u in dict.fromkeys(level) if u not in seen]
+            if not level or self.cancelled():
+                break
+            seen.update(level)
+            next_level = []
+            with ThreadPoolExecutor(max_workers=min(workers, len(level))) as executor:
+                for children, urls in executor.map(self._fetch_sitemap_links, level):
+                    for loc, lastmod in children:
+                        if modified_since(parse_lastmod(lastmod), self.start_date):
+                            next_level.append(loc)
+                        else:
+                            pruned += 1
+                    for loc, lastmod in urls:
+                        if rules.link_allowed(loc, base_netloc):
+                            entries[loc] = parse_lastmod(lastmod)
+            level = next_level
+        with self._links_lock:
+            self._sitemap_lastmod.update(entries)
+        fresh = sorted((u for u, lm in entries.items() if lm is not None and modified_since(lm, self.start_date)),
+                       key=lambda u: entries[u], reverse=True)
+        logger.info(f"Sitemaps {name}: {len(seen)} fetched, {pruned} skipped by lastmod, "
+                    f"{len(entries)} urls, {len(fresh)} modified since {self.start_date}")
+        return fresh
+
+    def _evaluate_article(self, url: str, resp) -> tuple[str, dict]:
+        """Wynik oceny strony: 'accepted' albo powód odrzucenia, plus wyekstrahowane pola."""
+        # pola wyekstrahowane przy poprzednim pobraniu (odpowiedź 304 / świeży cache)
+        cached = self.http.cached_derived(resp, 'article')
+        fields = dict(cached or {})
+        fallback_date = self._feed_dates.get(url)
+        # najpierw bez parsowania – pola z cache często wystarczają do decyzji
+        outcome, fields, timings = evaluate_page(url, fields, self.start_date, self.today, fallback_date=fallback_date)
+        if outcome == NEEDS_PAGE:
+            if self.parse_pool is not None:
+                # parsowanie w procesie roboczym – wątek czeka, ale nie trzyma GIL
+                outcome, fields, timings = self.parse_pool.evaluate(url, fields, self.start_date, self.today,
+                                                                    resp.content, resp.encoding, fallback_date)
+            else:
+                outcome, fields, timings = evaluate_page(url, fields, self.start_date, self.today,
+                                                         self.rules.for_url(url), resp.content, resp.encoding,
+                                                         fallback_date, self.dedup.signer if self.dedup else None)
+        for stage, seconds in timings.items():
+            self.metrics.observe(stage, seconds, url)
+        logger.debug(f"Article {url} date extracted: {fields.get('date')}")
+        if fields != (cached or {}):
+            self.http.store_derived(url, 'article', fields)
+        return outcome, fields
 
-    def _process_article(self, url: str):
+    def _process_article(self, url: str, paced: bool = False):
+        if self.cancelled():
+            return False
+        try:
+            if not paced:
+                self._respect_rate_limit(url)
+            resp = self._get(url)
+        except Exception as e:
+            logger.debug(f"Skip article {url}: {e}")
+            self._record_outcome(url, 'error', {})
+            return False
+        return self._handle_article_response(url, resp)
+
+    def _handle_article_response(self, url: str, resp) -> bool:
+        outcome, fields = 'error', {}
         try:
-            self._respect_rate_limit(url)
-            resp = requests.get(url, headers=self.headers, timeout=20)
             resp.raise_for_status()
             ctype = resp.headers.get('Content-Type', '')
             if 'text/html' not in ctype:
                 logger.debug(f"Skip non-HTML {url} ({ctype})")
+                outcome = 'non_html'
                 return False
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            dt = self._extract_date_from_soup(soup)
-            logger.debug(f"Article {url} date extracted: {dt}")
-            if not dt or not self._date_in_window(dt):
+            outcome, fields = self._evaluate_article(url, resp)
+            if outcome != 'accepted':
                 return False
-            if not self._is_probably_article(soup, url):
+            signature = fields.get(self.dedup.signer.key) if self.dedup is not None else None
+            outcome = self._accept_item(fields['title'], fields['content'], url, parser.parse(fields['date']), signature)
+            if outcome != 'added':
                 return False
-            title, content = self._extract_title_and_content(soup, url)
-            if len(content) < 200:
-                # likely teaser/category – skip
-                return False
-            self._add_item(title, content, url, dt)
-            logger.info(f"Added from crawl: {title}")
+            logger.info(f"Added from crawl: {fields['title']}")
             return True
         except Exception as e:
             logger.debug(f"Skip article {url}: {e}")
             return False
+        finally:
+            self._record_outcome(url, outcome, fields)
 
-    def crawl_from_listing(self, list_url: str, allow_substrings: list[str] | None = None, allow_regex: str | None = None):
+    def _record_outcome(self, url: str, outcome: str, fields: dict) -> None:
+        self.metrics.count('articles', url, outcome=outcome)
+        self._link_done(url)
+        if fields.get('date'):
+            self._note_link_date(url, fields['date'])
+        if self.crawl_state is None:
+            return
+        try:
+            self.crawl_state.record(url, outcome, article_date=fields.get('date'),
+                                    title=fields.get('title'), content=fields.get('content'))
+        except Exception as e:
+            logger.debug(f"Crawl state write failed for {url}: {e}")
+
+    def _claim_links(self, links: list[str]) -> list[str]:
+        """Linki jeszcze niezlecone w tym uruchomieniu, bez tych, które wg lastmod z sitemapy nie zmieniły się w oknie."""
+        fresh = []
+        with self._links_lock:
+            for link in links:
+                if link in self._run_links:
+                    continue
+                self._run_links.add(link)
+                lastmod = self._sitemap_lastmod.get(link)
+                if not modified_since(lastmod, self.start_date):
+                    self.metrics.count('articles', link, outcome='stale_lastmod')
+                    self._link_dates[link] = lastmod.isoformat()
+                    continue
+                fresh.append(link)
+        if len(fresh) < len(links):
+            logger.debug(f"{len(links) - len(fresh)}/{len(links)} links already queued or stale by sitemap lastmod")
+        return fresh
+
+    def _lease_links(self, links: list[str]) -> list[str]:
+        """Linki do pobrania wydzierżawione we wspólnym frontierze; te w rękach innej instancji są pomijane."""
+        if self.coordinator is None or not links:
+            return links
+        try:
+            leased = set(self.coordinator.claim(links))
+        except Exception as e:
+            logger.warning(f"Coordination claim failed, crawling {len(links)} links locally: {e}")
+            return links
+        for link in links:
+            if link not in leased:
+                self.metrics.count('articles', link, outcome='leased_elsewhere')
+        return [link for link in links if link in leased]
+
+    def _link_done(self, url: str) -> None:
+        if self.coordinator is None:
+            return
+        try:
+            self.coordinator.complete(url)
+        except Exception as e:
+            logger.debug(f"Coordination complete failed for {url}: {e}")
+
+    def _stored_signature(self, link: str):
+        if self.dedup is None:
+            return None
+        try:
+            return self.dedup.stored_signature(link)
+        except Exception as e:
+            logger.debug(f"Dedup signature read failed for {link}: {e}")
+            return None
+
+    def _filter_known_links(self, links: list[str], known: set[str] | None = None) -> tuple[list[str], int]:
+        """Odsiewa linki znane z rejestru; zaakceptowane wcześniej artykuły odtwarza bez pobierania.
+
+        Linki z `known` (były już na listingu) nie są sprawdzane ponownie po recheck_hours.
+        """
+        links = self._claim_links(links)
+        if self.crawl_state is None:
+            return self._lease_links(links), 0
+        to_fetch = []
+        reused = 0
+        for link in links:
+            try:
+                action, row = self.crawl_state.plan(link, self.start_date, self.today, known=bool(known) and link in known)
+            except Exception as e:
+                logger.debug(f"Crawl state read failed for {link}: {e}")
+                action, row = 'fetch', None
+            if row is not None and row['date']:
+                self._note_link_date(link, row['date'])
+            if action == 'fetch':
+                to_fetch.append(link)
+            elif action == 'reuse':
+                # treść jak przy akceptacji – sygnatura z indeksu deduplikacji zamiast liczenia od nowa
+                signature = self._stored_signature(link)
+                if self._add_item(row['title'], row['content'], link, parser.parse(row['date']), signature):
+                    reused += 1
+                    self.metrics.count('articles', link, outcome='reused')
+            else:
+                self.crawl_state.skipped += 1
+                self.metrics.count('articles', link, outcome='skipped')
+        self.crawl_state.reused += reused
+        self.crawl_state.touch_seen(links)
+        logger.debug(f"Crawl state: {len(to_fetch)}/{len(links)} links to fetch, {reused} reused")
+        # tylko faktycznie pobierane: odtworzenie z (współdzielonego) rejestru nie wymaga dzierżawy
+        return self._lease_links(to_fetch), reused
+
+    def crawl_from_listing(self, list_url: str, allow_substrings: list[str] | None = None, allow_regex: str | None = None,
+                           pagination: dict | None = None) -> int:
+        """Crawl listingu; z `pagination` także kolejnych stron, aż cała strona będzie sprzed okna.
+
+        Następna strona listingu jest pobierana w tle, gdy trwa przetwarzanie
+        artykułów bieżącej (najwyżej jedno zbędne żądanie przy zatrzymaniu).
+        Z rejestrem crawla: ten sam zbiór linków na pierwszej stronie co
+        w poprzednim uruchomieniu kończy listing bez paginacji i pobierania
+        artykułów (`_check_listing`); po zmianie linki znane z poprzedniego
+        przebiegu nie są ponownie sprawdzane – pobierane są tylko nowe.
+        """
+        opts = self._pagination_opts(pagination)
+        added = 0
+        seen: set[str] = set()
+        found: list[str] = []
+        fingerprint, known = None, set()
+        page_url, page_index = list_url, 0
+        prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix='listing-next') if opts else None
+        try:
+            r = self._fetch_listing_page(list_url)
+            while True:
+                links, next_url = self._listing_step(list_url, page_url, page_index, r, allow_substrings, allow_regex, opts, seen)
+                if links is None:
+                    break
+                if page_index == 0:
+                    fingerprint, known, unchanged = self._check_listing(list_url, links)
+                    if unchanged is not None:
+                        return self.crawl_links(unchanged, list_url, known)
+                pending = prefetch.submit(self._fetch_listing_page, next_url) if next_url else None
+                found.extend(links)
+                added += self.crawl_links(links, page_url, known)
+                if pending is None or self.cancelled() or self._page_is_old(list_url, page_index, links):
+                    break
+                r = pending.result()
+                page_url, page_index = next_url, page_index + 1
+            self._record_listing(list_url, fingerprint, found, known)
+        except Exception as e:
+            logger.error(f"Crawl failed for {page_url}: {e}")
+        finally:
+            if prefetch is not None:
+                prefetch.shutdown(wait=False)
+        return added
+
+    def _check_listing(self, list_url: str, links: list[str]) -> tuple[str | None, set[str], list[str] | None]:
+        """Porównanie pierwszej strony listingu z poprzednim uruchomieniem.
+
+        Zwraca (odcisk, linki z poprzedniego przebiegu, linki całego listingu,
+        jeśli się nie zmienił – wtedy bez paginacji: artykuły z okna są
+        odtwarzane z rejestru, pobierane tylko linki z błędem).
+        """
+        if self.crawl_state is None:
+            return None, set(), None
+        fingerprint = links_fingerprint(links)
+        try:
+            previous = self.crawl_state.listing(list_url)
+        except Exception as e:
+            logger.debug(f"Crawl state read failed for listing {list_url}: {e}")
+            return fingerprint, set(), None
+        if previous is None:
+            return fingerprint, set(), None
+        # poszerzone okno dat – starsze strony paginacji mogą mieć artykuły z okna
+        if previous['fingerprint'] == fingerprint and previous['window_start'] <= self.start_date.isoformat():
+            logger.info(f"Listing {list_url} unchanged since last run ({len(previous['links'])} links), skipping pagination")
+            self.crawl_state.listings_unchanged += 1
+            self.crawl_state.touch_listing(list_url)
+            return fingerprint, set(previous['links']), previous['links']
+        return fingerprint, set(previous['links']), None
+
+    def _record_listing(self, list_url: str, fingerprint: str | None, found: list[str], known: set[str]) -> None:
+        # przerwany crawl nie zapisuje odcisku – dalsze strony nie zostałyby przejrzane
+        if fingerprint is None or self.cancelled():
+            return
+        logger.info(f"Listing {list_url}: {len(set(found) - known)}/{len(found)} links new since last run")
+        try:
+            self.crawl_state.record_listing(list_url, fingerprint, found, self.start_date)
+        except Exception as e:
+            logger.debug(f"Crawl state write failed for listing {list_url}: {e}")
+
+    def _pagination_opts(self, pagination: dict | None) -> dict | None:
+        """Ustawienia `pagination` źródła: pattern ({listing}, {page}, {offset}) albo next_selector (CSS)."""
+        if not pagination or not (pagination.get('pattern') or pagination.get('next_selector')):
+            return None
+        try:
+            return {
+                'pattern': pagination.get('pattern'),
+                'next_selector': pagination.get('next_selector'),
+                'step': int(pagination.get('step', 10)),
+                'page_base': int(pagination.get('page_base', 1)),
+                'max_pages': max(1, min(int(pagination.get('max_pages', 10)), 50)),
+            }
+        except Exception as e:
+            logger.warning(f"Invalid pagination config {pagination}: {e}")
+            return None
+
+    def _next_page_url(self, list_url: str, opts: dict, page_index: int, next_href: str | None) -> str | None:
+        if page_index >= opts['max_pages']:
+            return None
+        if opts['pattern']:
+            return opts['pattern'].format(listing=list_url.rstrip('/'), page=page_index + opts['page_base'],
+                                          offset=page_index * opts['step'])
+        return next_href
+
+    def _listing_step(self, list_url: str, page_url: str, page_index: int, r, allow_substrings, allow_regex,
+                      opts: dict | None, seen: set[str]) -> tuple[list[str] | None, str | None]:
+        """Linki artykułów ze strony listingu i adres następnej; (None, None) = koniec paginacji."""
+        try:
+            links, next_href = self._listing_page(page_url, r, allow_substrings, allow_regex,
+                                                  opts['next_selector'] if opts else None)
+        except Exception as e:
+            if page_index == 0:
+                raise
+            logger.info(f"Listing {list_url}: no page {page_index + 1} ({e})")
+            return None, None
+        next_url = self._next_page_url(list_url, opts, page_index + 1, next_href) if opts else None
+        new_links = [link for link in links if link not in seen and link != next_url]
+        if page_index > 0 and not new_links:
+            # strona bez nowych linków – koniec archiwum albo serwis zwraca ciągle tę samą stronę
+            logger.info(f"Listing {list_url}: page {page_index + 1} has no new links, stopping")
+            return None, None
+        seen.update(links)
+        return new_links, next_url
+
+    def _fetch_listing_page(self, url: str):
+        self._respect_rate_limit(url)
+        return self._get(url)
+
+    def _note_link_date(self, url: str, date_iso: str) -> None:
+        with self._links_lock:
+            self._link_dates[url] = date_iso
+
+    def _page_is_old(self, list_url: str, page_index: int, links: list[str]) -> bool:
+        """Cała strona sprzed okna: każdy link o znanej dacie jest starszy niż start_date."""
+        with self._links_lock:
+            dates = [self._link_dates.get(link) for link in links]
+        known = []
+        for d in dates:
+            if not d:
+                continue
+            try:
+                known.append(parser.parse(d).date())
+            except Exception:
+                continue
+        if known and all(d < self.start_date for d in known):
+            logger.info(f"Listing {list_url}: page {page_index + 1} older than {self.start_date}, stopping")
+            return True
+        return False
+
+    def crawl_links(self, links: list[str], origin: str, known: set[str] | None = None) -> int:
+        """Pobiera i ocenia artykuły z listy linków (z listingu albo sitemapy); `known` – linki z poprzedniego przebiegu listingu."""
+        try:
+            links, added = self._filter_known_links(links, known)
+        except Exception as e:
+            logger.error(f"Crawl failed for {origin}: {e}")
+            return 0
+        return self._fetch_links(links, origin, added)
+
+    def _fetch_links(self, links: list[str], origin: str, added: int = 0) -> int:
+        """Równoległe pobranie linków już przefiltrowanych przez _filter_known_links."""
+        if not links:
+            logger.info(f"Crawl from {origin}: added {added} articles, nothing to fetch")
+            return added
         try:
-            r = requests.get(list_url, headers=self.headers, timeout=20)
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, 'html.parser')
-            links = self._discover_links(list_url, soup, allow_substrings=allow_substrings, allow_regex=allow_regex)
-            added = 0
             # równoległe przetwarzanie artykułów
             try:
                 workers = int(os.environ.get('SCRAPER_WORKERS', '12'))
@@ -389,54 +659,190 @@ class NewsScraper:
             if workers < 1:
                 workers = 1
             with ThreadPoolExecutor(max_workers=workers) as executor:
-                future_map = {executor.submit(self._process_article, link): link for link in links}
+                future_map = self._submit_paced(executor, links, workers)
                 for future in as_completed(future_map):
                     try:
                         if future.result():
                             added += 1
                     except Exception as e:
                         logger.debug(f"Article task failed for {future_map[future]}: {e}")
-            logger.info(f"Crawl from {list_url}: added {added} articles")
+            logger.info(f"Crawl from {origin}: added {added} articles")
+            return added
         except Exception as e:
-            logger.error(f"Crawl failed for {list_url}: {e}")
+            logger.error(f"Crawl failed for {origin}: {e}")
+            return 0
+
+    def _submit_paced(self, executor: ThreadPoolExecutor, links: list[str], workers: int) -> dict:
+        """Zleca artykuły dopiero, gdy limiter domeny wyda token.
+
+        Na limit czeka wątek zlecający, nie robocze – te obsługują tylko
+        gotowe żądania. Liczba zadań w locie jest ograniczona do `workers`,
+        więc token jest pobierany tuż przed faktycznym wysłaniem żądania.
+        """
+        slots = threading.Semaphore(workers)
+        future_map = {}
+        for link in links:
+            slots.acquire()
+            if self.cancelled():
+                slots.release()
+                break
+            self._respect_rate_limit(link)
+            future = executor.submit(self._process_article, link, True)
+            future.add_done_callback(lambda _f: slots.release())
+            future_map[future] = link
+        return future_map
+
+    def _listing_links(self, list_url: str, r, allow_substrings: list[str] | None = None, allow_regex: str | None = None) -> list[str]:
+        return self._listing_page(list_url, r, allow_substrings, allow_regex)[0]
+
+    def _listing_page(self, list_url: str, r, allow_substrings: list[str] | None = None, allow_regex: str | None = None,
+                      next_selector: str | None = None) -> tuple[list[str], str | None]:
+        """Linki artykułów ze strony listingu i (z next_selector) adres następnej strony."""
+        r.raise_for_status()
+        params = [allow_substrings or [], allow_regex or '', next_selector or '']
+        cached = self.http.cached_derived(r, 'links')
+        if cached and cached.get('params') == params:
+            links = cached['links']
+            logger.debug(f"Listing {list_url} unchanged, {len(links)} links from cache")
+            return links, cached.get('next')
+        next_url = None
+        with self.metrics.span('parse', list_url):
+            soup = make_soup(r.text)
+            links = self._discover_links(list_url, soup, allow_substrings=allow_substrings, allow_regex=allow_regex)
+            if next_selector:
+                el = soup.select_one(next_selector)
+                if el is not None and el.get('href'):
+                    next_url = urljoin(list_url, el['href'])
+        self.http.store_derived(list_url, 'links', {'params': params, 'links': links, 'next': next_url})
+        return links, next_url
 
     # ===== Config-driven scraping =====
-    def scrape_from_config(self, config_path: str = 'configs/sources.yaml'):
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                cfg = yaml.safe_load(f) or {}
-        except Exception as e:
-            logger.error(f"Failed to read config {config_path}: {e}")
+    def _crawl_engine(self) -> str:
+        return (os.environ.get('SCRAPER_ENGINE') or self.config.get('engine') or 'threads').strip().lower()
+
+    def scrape_from_config(self, config_path: str | None = None):
+        if config_path and config_path != self.config_path:
+            self.config_path = config_path
+            self.config = self._load_config(config_path)
+            self.metrics.set_sources(self.config)
+            self.rules = RuleSet.from_config(self.config)
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+            self.parse_pool = ParsePool.from_config(self.config)
+            self.http.close()
+            self.http = self._build_http_client()
+        cfg = self.config
+        if not cfg:
             return
+        self.begin_run()
         sources = (cfg.get('sources') or [])
+        if self._crawl_engine() == 'async':
+            # wszystkie źródła równolegle, wspólny budżet współbieżności
+            try:
+                AsyncCrawlEngine(self).run(sources)
+            except Exception as e:
+                logger.error(f"Async crawl failed: {e}")
+            self._log_run_stats()
+            return
         for src in sources:
+            if self.cancelled():
+                logger.info("Crawl cancelled")
+                break
+            self.scrape_source(src)
+        self._log_run_stats()
+
+    def begin_run(self) -> None:
+        """Czyści stan uruchomienia (linki zlecone, lastmod, daty z feedów, duplikaty bieżącego przebiegu)."""
+        with self._links_lock:
+            self._run_links.clear()
+            self._sitemap_lastmod.clear()
+            self._feed_dates.clear()
+            self._link_dates.clear()
+        if self.dedup is not None:
+            self.dedup.begin_run()
+
+    def scrape_source(self, src: dict) -> None:
+        """Crawl jednego źródła z configu: feed, sitemapy, listingi."""
+        try:
+            name = src.get('name')
+            listings = src.get('listings') or []
+            allow_substrings = src.get('allow_substrings') or None
+            allow_regex = src.get('allow_regex') or None
+            rps = src.get('rate_limit_rps')
+            if rps:
+                logger.info(f"Config for {name}: rate_limit_rps={rps} burst={src.get('rate_limit_burst') or 1}")
+            logger.info(f"Source {name}: listings={len(listings)}")
+            if src.get('prefer_feed') and src.get('feed_urls'):
+                feed_links = self.ingest_feeds(src)
+                if feed_links is not None:
+                    # feed zastępuje crawl listingów; strony tylko dla wpisów bez pełnej treści
+                    self._fetch_links(feed_links, f"feeds of {name}")
+                    return
+            # sitemapy najpierw: ich lastmod odsiewa też nieaktualne linki z listingów
+            sitemap_links = self.discover_from_sitemaps(src) if src.get('sitemap_discovery') else []
+            for list_url in listings:
+                if self.cancelled():
+                    break
+                self.crawl_from_listing(list_url, allow_substrings=allow_substrings, allow_regex=allow_regex,
+                                        pagination=src.get('pagination'))
+            if sitemap_links and not self.cancelled():
+                self.crawl_links(sitemap_links, f"sitemaps of {name}")
+        except Exception as e:
+            logger.error(f"Config source error: {e}")
+
+    def _log_run_stats(self) -> None:
+        self.http.log_stats()
+        for domain, b in self.rate_limiter.stats().items():
+            if b['throttled']:
+                logger.info(f"Rate limit {domain}: throttled {b['throttled']}x, rate {b['rate']}/{b['base_rate']} rps")
+        if self.http.cache is not None:
+            self.http.cache.evict()
+            self.http.cache.log_report()
+        if self.crawl_state is not None:
+            self.crawl_state.log_report()
+        if self.dedup is not None:
+            self.dedup.evict()
+            self.dedup.log_report()
+        if self.coordinator is not None:
             try:
-                name = src.get('name')
-                listings = src.get('listings') or []
-                allow_substrings = src.get('allow_substrings') or None
-                allow_regex = src.get('allow_regex') or None
-                rps = src.get('rate_limit_rps')
-                # override per-domain rate-limit if provided
-                if rps:
-                    base = src.get('base_url')
-                    if base:
-                        domain = urlparse(base).netloc
-                        self._domain_last[domain] = 0.0
-                        # store per-domain min interval using negative placeholder in last map
-                        # we'll interpret presence of domain in _domain_last as tracked
-                        # rps applied dynamically in _respect_rate_limit by global env; for now, log info
-                        logger.info(f"Config for {name}: rate_limit_rps={rps}")
-                logger.info(f"Source {name}: listings={len(listings)}")
-                for list_url in listings:
-                    self.crawl_from_listing(list_url, allow_substrings=allow_substrings, allow_regex=allow_regex)
+                self.coordinator.prune()
             except Exception as e:
-                logger.error(f"Config source error: {e}")
+                logger.debug(f"Coordination prune failed: {e}")
+            self.coordinator.log_report()
+
+    def _feed_entry_text(self, entry) -> str:
+        # pełna treść (content:encoded / atom:content) ma pierwszeństwo przed zajawką
+        html = ''
+        if 'content' in entry and entry.content:
+            html = max((c.get('value') or '' for c in entry.content), key=len)
+        if not html and 'summary' in entry and entry.summary:
+            html = entry.summary
+        if not html:
+            return ''
+        soup = make_soup(html)
+        parts = [el.get_text(strip=True) for el in soup.find_all(['p', 'li'])]
+        text = '\n\n'.join(t for t in parts if t)
+        return text or soup.get_text(' ', strip=True)
 
     def _parse_feed(self, feed_url: str, source_name: str):
+        """Wpisy feedu jako słowniki (link, tytuł, data ISO, tekst); po 304 – wynik parsowania z cache.
+
+        Zwraca None, gdy feedu nie udało się pobrać lub sparsować.
+        """
         try:
             logger.debug(f"Fetching feed: {feed_url}")
-            fp = feedparser.parse(feed_url)
-            count_before = len(self.news_items)
+            self._respect_rate_limit(feed_url)
+            r = self._get(feed_url)
+            r.raise_for_status()
+            cached = self.http.cached_derived(r, 'feed')
+            if cached is not None:
+                logger.debug(f"Feed {feed_url} unchanged, {len(cached)} entries from cache")
+                return cached
+            with self.metrics.span('parse', feed_url):
+                fp = feedparser.parse(r.content)
+            if fp.bozo and not fp.entries:
+                raise ValueError(f"not a feed: {fp.get('bozo_exception')}")
+            entries = []
             for entry in fp.entries:
                 # Determine date
                 dt = None
@@ -449,23 +855,72 @@ class NewsScraper:
                             continue
                 if not dt and 'published_parsed' in entry and entry.published_parsed:
                     dt = datetime(*entry.published_parsed[:6])
-                if not dt:
-                    continue
-                if not self._date_in_window(dt):
-                    continue
-
-                title = entry.title if 'title' in entry else source_name
                 link = entry.link if 'link' in entry else ''
-                summary = ''
-                if 'summary' in entry and entry.summary:
-                    summary = BeautifulSoup(entry.summary, 'html.parser').get_text(strip=True)
-                elif 'content' in entry and entry.content:
-                    summary = BeautifulSoup(entry.content[0].value, 'html.parser').get_text(strip=True)
-
-                self._add_item(title, summary, link)
-            logger.info(f"Feed {source_name}: added {len(self.news_items)-count_before} items")
+                if not link:
+                    continue
+                entries.append({
+                    'link': urljoin(feed_url, link),
+                    'title': entry.title if 'title' in entry else source_name,
+                    'date': dt.isoformat() if dt else None,
+                    'text': self._feed_entry_text(entry),
+                })
+            self.http.store_derived(feed_url, 'feed', entries)
+            return entries
         except Exception as e:
             logger.warning(f"Feed parse failed for {feed_url}: {e}")
+            return None
+
+    def ingest_feeds(self, src: dict) -> list[str] | None:
+        """Artykuły źródła z feedów (feed_urls) zamiast z listingów.
+
+        Data wpisu decyduje o oknie; wpisy z treścią co najmniej
+        `feed_min_chars` trafiają do wyników bez pobierania strony. Zwraca
+        linki (po _filter_known_links), które trzeba pobrać w całości, albo
+        None, gdy żaden feed nie zadziałał – wtedy źródło idzie listingami.
+        """
+        name = src.get('name')
+        try:
+            min_chars = int(src.get('feed_min_chars', 1000))
+        except Exception:
+            min_chars = 1000
+        entries = {}
+        usable = False
+        for feed_url in src.get('feed_urls') or []:
+            parsed = self._parse_feed(feed_url, name)
+            if parsed is None:
+                continue
+            usable = True
+            for entry in parsed:
+                entries.setdefault(entry['link'], entry)
+        if not usable:
+            logger.info(f"Feeds of {name} unavailable, falling back to listings")
+            return None
+        in_window = []
+        for link, entry in entries.items():
+            dt = parser.parse(entry['date']) if entry['date'] else None
+            if dt is not None and not self._date_in_window(dt):
+                continue
+            in_window.append(link)
+            if dt is not None:
+                with self._links_lock:
+                    self._feed_dates[link] = entry['date']
+        links, added = self._filter_known_links(in_window)
+        to_fetch = []
+        for link in links:
+            entry = entries[link]
+            text = entry['text'] or ''
+            if entry['date'] and len(text) >= min_chars:
+                fields = {'date': entry['date'], 'title': entry['title'], 'content': text}
+                outcome = self._accept_item(entry['title'], text, link, parser.parse(entry['date']))
+                if outcome != 'single_word_title':
+                    # duplikat / powtórka nie wymaga pobrania strony
+                    added += outcome == 'added'
+                    self._record_outcome(link, outcome, fields)
+                    continue
+            to_fetch.append(link)
+        logger.info(f"Feeds of {name}: {len(entries)} entries, {len(in_window)} in window, "
+                    f"{added} added from feed, {len(to_fetch)} need a page fetch")
+        return to_fetch
 
     def scrape_edunews(self):
         self.crawl_from_listing(
@@ -492,11 +947,40 @@ class NewsScraper:
     def scrape_ibe(self):
         self.crawl_from_listing("https://ibe.edu.pl/pl/aktualnosci", allow_substrings=["/pl/aktualnosci/"])
 
+    def _source_name(self, link: str) -> str:
+        source = self.metrics.source_for(link)
+        if source == UNKNOWN_SOURCE:
+            source = urlparse(link).netloc or source
+        return source
+
+    def store_item(self, item: ArticleRecord | dict, spill: bool = False) -> None:
+        """Upsert gotowego (ew. streszczonego) artykułu do archiwum.
+
+        spill=True (artykuł już streszczony): po zapisie rekord zwalnia treść
+        z pamięci – długie okno nie trzyma wszystkich treści naraz.
+        """
+        if self.article_store is None:
+            return
+        link = item.get('link', '')
+        source = getattr(item, 'source', None) or self._source_name(link)
+        try:
+            self.article_store.upsert(item, source, self.job_id)
+        except Exception as e:
+            logger.error(f"Article store write failed for {link}: {e}")
+            return
+        if spill and isinstance(item, ArticleRecord):
+            item.spill(self.article_store)
+
     def save_to_json(self):
         output_file = f"news_{self.start_date}_to_{self.today}.json"
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(self.news_items, f, ensure_ascii=False, indent=4)
+                # po jednym artykule (treść zrzuconych rekordów czytana z archiwum); wynik jak json.dump(..., indent=4)
+                f.write('[')
+                for i, item in enumerate(self.news_items):
+                    body = json.dumps(dict(item), ensure_ascii=False, indent=4)
+                    f.write((',\n' if i else '\n') + '\n'.join('    ' + line for line in body.split('\n')))
+                f.write('\n]' if self.news_items else ']')
             logger.info(f"Saved {len(self.news_items)} news items to {output_file}")
         except Exception as e:
             logger.error(f"Error saving to JSON: {e}")
@@ -510,79 +994,25 @@ class NewsScraper:
             raise RuntimeError('Brak klucza API: ustaw zmienną środowiskową GOOGLE_API_KEY lub GEMINI_API_KEY')
         genai.configure(api_key=api_key)
         # Official model name requested: gemini-2.5-flash
-        self.genai_model = genai.GenerativeModel('gemini-2.5-flash')
+        self.genai_model = genai.GenerativeModel(GEMINI_MODEL)
 
     def enrich_with_gemini(self):
-        try:
-            self._ensure_gemini()
-        except Exception as e:
-            logger.error(f"Gemini init failed: {e}")
-            return
-        for item in self.news_items:
-            # Czyszczenie starych pól
-            item.pop('gemini_tytul', None)
-            
-            if item.get('gemini_tresc'):
-                continue
-            original_title = item.get('tytuł', '')
-            date_str = item.get('data', '')
-            link = item.get('link', '')
-            text = item.get('treść', '')
-            # Trim very long content to keep response fast
-            if len(text) > 12000:
-                text = text[:12000]
-            start_ts = datetime.now()
-            logger.info(f"Gemini start for: {link}")
-            prompt = (
-                "Jesteś rzetelnym redaktorem. Na podstawie dostarczonej treści artykułu napisz streszczenie w 3-4 akapitach. "
-                "Używaj wyłącznie informacji zawartych w tekście, bez dopowiadania i interpretacji. "
-                "Sformatuj treść w oddzielne akapity (oddziel pustą linią). "
-                "WAŻNE: Zawsze zwróć treść, nie zostawiaj pola puste.\n\n"
-                f"TYTUŁ: {original_title}\n"
-                f"DATA: {date_str}\n"
-                f"LINK: {link}\n"
-                f"TEKST:\n{text}"
-            )
+        enricher = GeminiEnricher.from_env(None, cache=self.summary_cache, model_name=GEMINI_MODEL,
+                                           metrics=self.metrics)
+        # najpierw cache streszczeń – model (i klucz API) potrzebny tylko dla nowych treści
+        pending = enricher.take_cached(self.news_items)
+        logger.info(f"Gemini: {len(self.news_items) - len(pending)} summaries from cache, {len(pending)} to generate")
+        if pending:
             try:
-                resp = self.genai_model.generate_content(
-                    prompt,
-                    generation_config={'response_mime_type': 'application/json'}
-                )
-                resp_text = getattr(resp, 'text', '') or ''
-                parsed_body = None
-                # Strip markdown code fences if present
-                fenced = resp_text.strip()
-                if fenced.startswith('```'):
-                    # remove first fence line
-                    lines = fenced.splitlines()
-                    # drop first and last triple-backticks if present
-                    if lines and lines[0].startswith('```'):
-                        lines = lines[1:]
-                    if lines and lines[-1].startswith('```'):
-                        lines = lines[:-1]
-                    resp_text = '\n'.join(lines)
-                # Try strict JSON parse on the largest object span
-                try:
-                    start = resp_text.find('{')
-                    end = resp_text.rfind('}')
-                    if start != -1 and end != -1 and end > start:
-                        payload = json.loads(resp_text[start:end+1])
-                        parsed_body = (payload.get('gemini_tresc') or payload.get('gemini_content') or payload.get('content'))
-                except Exception:
-                    pass
-                # Fallback heuristic if JSON parse failed
-                if not parsed_body:
-                    lines = [ln.strip() for ln in resp_text.splitlines() if ln.strip()]
-                    if lines:
-                        parsed_body = '\n\n'.join(lines)
-                if parsed_body:
-                    item['gemini_tresc'] = parsed_body
-                    elapsed = (datetime.now() - start_ts).total_seconds()
-                    logger.info(f"Gemini done for: {link} in {elapsed:.2f}s")
-                else:
-                    logger.debug(f"Gemini returned unparseable content for {link}")
+                self._ensure_gemini()
             except Exception as e:
-                logger.error(f"Gemini enrichment failed for {link}: {e}")
+                logger.error(f"Gemini init failed: {e}")
+                return
+            enricher.model = self.genai_model
+            enricher.summarize(pending)
+        if self.summary_cache is not None:
+            self.summary_cache.evict()
+            self.summary_cache.log_report()
 
 def main():
     scraper = NewsScraper()
@@ -590,9 +1020,14 @@ def main():
     scraper.scrape_edunews()
     scraper.scrape_frse()
     scraper.scrape_ibe()
+    scraper._log_run_stats()
     # Enrichment via Gemini
     scraper.enrich_with_gemini()
-    scraper.save_to_json()
+    for item in scraper.news_items:
+        scraper.store_item(item, spill=True)
+    if scraper.save_json:
+        scraper.save_to_json()
+    scraper.finish_metrics()
 
 if __name__ == "__main__":
     main()
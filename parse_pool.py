@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from dateutil import parser
+
+from dedup import ContentSigner, signer_from_config
+from extraction import PageExtract, make_soup
+from rules import RuleSet, SourceRules
+
+logger = logging.getLogger(__name__)
+
+# wynik oceny, gdy pola z cache nie wystarczają i trzeba sparsować stronę
+NEEDS_PAGE = 'needs_page'
+MIN_CONTENT_LENGTH = 200
+
+
+def _decode(markup: bytes, encoding: str | None):
+    # jak requests.Response.text; bez znanego kodowania wykrywa je BeautifulSoup (meta charset)
+    if encoding is None:
+        return markup
+    try:
+        return str(markup, encoding, errors='replace')
+    except (LookupError, TypeError):
+        return str(markup, errors='replace')
+
+
+def evaluate_page(url: str, fields: dict, start_date: date, today: date, rules: SourceRules | None = None,
+                  markup: bytes | None = None, encoding: str | None = None,
+                  fallback_date: str | None = None,
+                  signer: ContentSigner | None = None) -> tuple[str, dict, dict[str, float]]:
+    """Ocena strony artykułu: (wynik, pola, czasy etapów w sekundach).
+
+    Wynik to 'accepted' albo powód odrzucenia; `fields` (data, is_article,
+    tytuł, treść) uzupełnia tylko to, czego brakuje – strona jest parsowana
+    dopiero, gdy jest potrzebna. Bez `markup` zwraca NEEDS_PAGE, jeśli
+    decyzja wymaga parsowania. Z `signer` zaakceptowana strona dostaje też
+    sygnaturę MinHash treści (pole `signer.key`). Czysta funkcja – wykonywana w wątku albo
+    w procesie ParsePool (wynik jest mały i serializowalny).
+    """
+    fields = dict(fields)
+    timings: dict[str, float] = {}
+    page = None
+
+    def extract() -> PageExtract | None:
+        nonlocal page
+        if page is None and markup is not None:
+            started = time.perf_counter()
+            page = PageExtract(make_soup(_decode(markup, encoding)), url, rules)
+            timings['parse'] = time.perf_counter() - started
+        return page
+
+    if 'date' not in fields:
+        if extract() is None:
+            return NEEDS_PAGE, fields, timings
+        started = time.perf_counter()
+        dt = page.date()
+        timings['date'] = time.perf_counter() - started
+        fields['date'] = dt.isoformat() if dt else None
+    if not fields['date'] and fallback_date:
+        fields['date'] = fallback_date
+    dt = parser.parse(fields['date']) if fields['date'] else None
+    if not dt:
+        return 'no_date', fields, timings
+    if not start_date <= dt.date() <= today:
+        return 'out_of_window', fields, timings
+    if 'is_article' not in fields:
+        if extract() is None:
+            return NEEDS_PAGE, fields, timings
+        started = time.perf_counter()
+        fields['is_article'] = page.is_article()
+        timings['content'] = time.perf_counter() - started
+    if not fields['is_article']:
+        return 'not_article', fields, timings
+    if 'content' not in fields:
+        if extract() is None:
+            return NEEDS_PAGE, fields, timings
+        started = time.perf_counter()
+        fields['title'], fields['content'] = page.title_and_content()
+        timings['content'] = timings.get('content', 0.0) + time.perf_counter() - started
+    if len(fields['content']) < MIN_CONTENT_LENGTH:
+        # likely teaser/category – skip
+        return 'too_short', fields, timings
+    if signer is not None and signer.key not in fields:
+        started = time.perf_counter()
+        fields[signer.key] = list(signer.sign(fields['content']))
+        timings['dedup'] = time.perf_counter() - started
+    return 'accepted', fields, timings
+
+
+# reguły i podpisywanie treści w procesie roboczym – tworzone raz, przy starcie procesu
+_worker_rules: RuleSet | None = None
+_worker_signer: ContentSigner | None = None
+
+
+def _init_worker(config: dict) -> None:
+    global _worker_rules, _worker_signer
+    _worker_rules = RuleSet.from_config(config)
+    _worker_signer = signer_from_config(config)
+
+
+def _evaluate_in_worker(url: str, fields: dict, start_date: date, today: date, markup: bytes, encoding: str | None,
+                        fallback_date: str | None):
+    return evaluate_page(url, fields, start_date, today, _worker_rules.for_url(url), markup, encoding, fallback_date,
+                         _worker_signer)
+
+
+class ParsePool:
+    """Etap parsowania HTML w osobnych procesach (ProcessPoolExecutor).
+
+    BeautifulSoup, PageExtract i skan dat to czysty Python – w wątkach
+    roboczych crawla serializują się na GIL. Wątki nadal pobierają strony,
+    ale ocenę oddają tutaj: do procesu idą surowe bajty odpowiedzi, wraca
+    tylko wynik i pola (data, tytuł, treść, is_article, sygnatura MinHash
+    dla deduplikacji), nigdy drzewo.
+    Procesy startują przy pierwszym zadaniu z regułami z configu.
+    `parse_pool.workers` / SCRAPER_PARSE_PROCESSES (domyślnie liczba
+    rdzeni); 0 – parsowanie w wątkach, jak dawniej.
+    """
+
+    def __init__(self, config: dict, workers: int):
+        self.config = config
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = self._make_executor()
+        self.restarts = 0
+
+    def _make_executor(self) -> ProcessPoolExecutor:
+        # bez fork: proces ma wątki crawla/streszczeń i połączenia SQLite – skopiowany trzymany lock
+        # (logging, sqlite) zakleszczyłby proces roboczy; stan i tak odtwarza _init_worker z configu
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method),
+                                   initializer=_init_worker, initargs=(self.config,))
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> 'ParsePool | None':
+        cfg = cfg or {}
+        c = cfg.get('parse_pool') or {}
+        if not c.get('enabled', True):
+            return None
+        try:
+            workers = int(os.environ.get('SCRAPER_PARSE_PROCESSES', c.get('workers') or os.cpu_count() or 1))
+        except Exception:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            return None
+        try:
+            return cls(cfg, workers)
+        except Exception as e:
+            logger.warning(f"Parse pool disabled, parsing in threads: {e}")
+            return None
+
+    def evaluate(self, url: str, fields: dict, start_date: date, today: date, markup: bytes,
+                 encoding: str | None = None, fallback_date: str | None = None) -> tuple[str, dict, dict[str, float]]:
+        executor = self._executor
+        try:
+            return executor.submit(_evaluate_in_worker, url, fields, start_date, today, markup, encoding,
+                                   fallback_date).result()
+        except BrokenProcessPool:
+            # proces padł (np. brak pamięci na ogromnej stronie) – ta strona przepada, pula startuje od nowa
+            with self._lock:
+                if self._executor is executor:
+                    logger.warning(f"Parse pool broken while parsing {url}, restarting")
+                    self._executor = self._make_executor()
+                    self.restarts += 1
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._executor.shutdown(wait=True, cancel_futures=True)
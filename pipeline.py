@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from enrichment import GeminiEnricher, MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class ScrapePipeline:
+    """Crawl, streszczanie i dostarczanie wyników nakładające się w czasie.
+
+    Każdy artykuł zaakceptowany przez `_add_item` trafia od razu do puli
+    streszczeń (GEMINI_CONCURRENCY), a gotowe artykuły są oddawane przez
+    generator `run()` – zanim crawl pozostałych źródeł się skończy. Czas
+    całości to ~max(crawl, streszczanie) zamiast ich sumy. Przy
+    GEMINI_BATCH_SIZE > 1 krótkie artykuły są zbierane we wsady – wsad
+    idzie do modelu po zapełnieniu albo po GEMINI_BATCH_WAIT sekundach.
+    """
+
+    def __init__(self, scraper, enrich: bool = True):
+        self.scraper = scraper
+        self.enrich = enrich
+        self.enricher = GeminiEnricher.from_env(None, cache=scraper.summary_cache, model_name=MODEL_NAME,
+                                                metrics=scraper.metrics)
+        self._model_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._model_failed = False
+        self._out: Queue = Queue()
+        self._pool = ThreadPoolExecutor(max_workers=self.enricher.concurrency, thread_name_prefix='enrich')
+        # zbierany wsad krótkich artykułów i timer wysyłający go niepełnym
+        self._batch_lock = threading.Lock()
+        self._batch: list[dict] = []
+        self._batch_timer: threading.Timer | None = None
+        self.crawled = 0
+        self.summarized = 0
+        self.error: str | None = None
+        # podsumowanie metrics.Metrics po zakończeniu run()
+        self.run_metrics: dict | None = None
+
+    def _ensure_model(self) -> bool:
+        with self._model_lock:
+            if self.enricher.model is not None:
+                return True
+            if self._model_failed:
+                return False
+            try:
+                self.scraper._ensure_gemini()
+                self.enricher.model = self.scraper.genai_model
+                return True
+            except Exception as e:
+                self._model_failed = True
+                logger.error(f"Gemini init failed: {e}")
+                return False
+
+    def _enrich_items(self, items: list[dict]) -> None:
+        try:
+            pending = self.enricher.take_cached(items) if self.enrich else []
+            if pending and not self.scraper.cancelled() and self._ensure_model():
+                # jeden artykuł – zwykły prompt (summarize_batch przekazuje go do summarize_one)
+                done = self.enricher.summarize_batch(pending)
+                with self._count_lock:
+                    self.summarized += done
+        except Exception as e:
+            logger.error(f"Enrichment failed for {', '.join(i.get('link', '') for i in items)}: {e}")
+        finally:
+            # archiwum zapisywane przyrostowo – także przy anulowaniu zostaje to, co gotowe;
+            # treść streszczonego artykułu zostaje już tylko w archiwum
+            for item in items:
+                self.scraper.store_item(item, spill=True)
+                self._out.put(item)
+
+    def _on_item(self, item: dict) -> None:
+        with self._count_lock:
+            self.crawled += 1
+        if not (self.enrich and self.enricher.batchable(item)):
+            self._pool.submit(self._enrich_items, [item])
+            return
+        with self._batch_lock:
+            self._batch.append(item)
+            if len(self._batch) < self.enricher.batch_size:
+                if self._batch_timer is None:
+                    self._batch_timer = threading.Timer(self.enricher.batch_wait, self._flush_batch,
+                                                        args=(self._batch,))
+                    self._batch_timer.daemon = True
+                    self._batch_timer.start()
+                return
+        self._flush_batch()
+
+    def _flush_batch(self, expected: list[dict] | None = None) -> None:
+        """Wysyła zebrany wsad; z timera tylko wtedy, gdy to nadal ten sam wsad."""
+        with self._batch_lock:
+            if not self._batch or (expected is not None and self._batch is not expected):
+                return
+            batch, self._batch = self._batch, []
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+            self._pool.submit(self._enrich_items, batch)
+
+    def _crawl(self) -> None:
+        try:
+            self.scraper.on_item = self._on_item
+            self.scraper.scrape_from_config()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Pipeline crawl failed: {e}")
+        finally:
+            self.scraper.on_item = None
+            self._flush_batch()
+            # czekamy na streszczenia już zleconych artykułów
+            self._pool.shutdown(wait=True)
+            self._out.put(_DONE)
+
+    def run(self):
+        """Generator gotowych (streszczonych) artykułów w kolejności ukończenia."""
+        started = time.monotonic()
+        threading.Thread(target=self._crawl, name='pipeline-crawl', daemon=True).start()
+        while True:
+            item = self._out.get()
+            if item is _DONE:
+                break
+            yield item
+        self.enricher.log_report(self.crawled, self.summarized, time.monotonic() - started)
+        if self.scraper.summary_cache is not None:
+            self.scraper.summary_cache.evict()
+            self.scraper.summary_cache.log_report()
+        if self.scraper.article_store is not None:
+            self.scraper.article_store.log_report()
+        if self.scraper.cancelled():
+            # niepełny wynik nie nadpisuje zrzutu z pełnego uruchomienia
+            logger.info(f"Pipeline cancelled after {self.crawled} articles")
+        elif self.scraper.save_json:
+            self.scraper.save_to_json()
+        self.run_metrics = self.scraper.finish_metrics()
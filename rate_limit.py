@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value) -> float | None:
+    """Retry-After w sekundach (liczba albo data HTTP)."""
+    if value is None or value == '':
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    """Token bucket w wariancie GCRA: `reserve()` pobiera token i zwraca czas oczekiwania.
+
+    Sama rezerwacja nie śpi – lock chroni tylko obliczenie, a czekanie odbywa
+    się poza nim (time.sleep albo asyncio.sleep po stronie wywołującego).
+    Tempo adaptuje się: 429/503 obniża rate i blokuje kubełek na Retry-After,
+    kolejne udane odpowiedzi stopniowo przywracają rate bazowy.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate_factor: float = 0.1):
+        self.base_rate = rate if rate > 0 else 0.1
+        self.rate = self.base_rate
+        self.burst = max(1, int(burst))
+        self.min_rate = self.base_rate * min_rate_factor
+        self._tat = 0.0  # theoretical arrival time następnego żądania
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Pobiera `cost` tokenów (np. szacowaną liczbę tokenów promptu) i zwraca czas oczekiwania."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tolerance = (self.burst - 1) * interval
+            tat = max(self._tat, now)
+            wait = max(0.0, tat - tolerance - now)
+            self._tat = tat + interval * min(cost, self.burst)
+            return wait
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            interval = 1.0 / self.rate
+            pause = retry_after if retry_after is not None else interval
+            # następny token dopiero po Retry-After (cała tolerancja burst wyczerpana)
+            self._tat = max(self._tat, time.monotonic() + pause + (self.burst - 1) * interval)
+
+    def recover(self) -> None:
+        if self.rate >= self.base_rate:
+            return
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+class RateLimiter:
+    """Kubełki per domena; rate/burst z rate_limit_rps / rate_limit_burst źródeł, domyślnie DOMAIN_RPS.
+
+    Z `shared` (coordination.Coordinator) tokeny pochodzą ze wspólnego
+    kubełka wszystkich instancji – lokalny kubełek wyznacza wtedy tylko
+    bieżący rate (adaptacja po 429/503) i burst.
+    """
+
+    def __init__(self, default_rps: float | None = None, default_burst: int = 1):
+        if default_rps is None:
+            try:
+                default_rps = float(os.environ.get('DOMAIN_RPS', '1.0'))
+            except Exception:
+                default_rps = 1.0
+        self.default_rps = default_rps if default_rps > 0 else 0.1
+        self.default_burst = default_burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.shared = None
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> 'RateLimiter':
+        limiter = cls()
+        for src in ((cfg or {}).get('sources') or []):
+            rps = src.get('rate_limit_rps')
+            if not rps:
+                continue
+            domains = {urlparse(u).netloc for u in (src.get('listings') or [])}
+            if src.get('base_url'):
+                domains.add(urlparse(src['base_url']).netloc)
+            for domain in domains:
+                limiter.configure(domain, float(rps), int(src.get('rate_limit_burst') or 1))
+            logger.debug(f"Rate limit for {src.get('name')}: {rps} rps, burst {src.get('rate_limit_burst') or 1}")
+        return limiter
+
+    def configure(self, domain: str, rps: float, burst: int = 1) -> None:
+        with self._lock:
+            self._buckets[domain] = TokenBucket(rps, burst)
+
+    def bucket(self, domain: str) -> TokenBucket:
+        b = self._buckets.get(domain)
+        if b is None:
+            with self._lock:
+                b = self._buckets.setdefault(domain, TokenBucket(self.default_rps, self.default_burst))
+        return b
+
+    def reserve(self, url: str) -> float:
+        domain = urlparse(url).netloc
+        b = self.bucket(domain)
+        if self.shared is not None:
+            try:
+                return self.shared.reserve(domain, b.rate, b.burst)
+            except Exception as e:
+                logger.warning(f"Shared rate limit unavailable for {domain}, using local bucket: {e}")
+        return b.reserve()
+
+    def wait(self, url: str) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url: str) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, domain: str, status: int, retry_after=None) -> None:
+        """Sprzężenie zwrotne z transportu HTTP (także z pośrednich prób retry)."""
+        b = self.bucket(domain)
+        if status in THROTTLE_STATUSES:
+            delay = parse_retry_after(retry_after)
+            b.penalize(delay)
+            if self.shared is not None:
+                try:
+                    self.shared.pause(domain, delay if delay is not None else 1.0 / b.rate, b.rate, b.burst)
+                except Exception as e:
+                    logger.warning(f"Shared rate limit pause failed for {domain}: {e}")
+            logger.info(f"Throttled by {domain} ({status}), rate now {b.rate:.2f} rps"
+                        + (f", retry after {delay:.0f}s" if delay is not None else ''))
+        elif 200 <= status < 400:
+            b.recover()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {d: {'rate': round(b.rate, 3), 'base_rate': b.base_rate, 'burst': b.burst, 'throttled': b.throttled}
+                    for d, b in self._buckets.items()}
@@ -0,0 +1,117 @@
+import sys
+
+# klucz JSON (schemat UI i zrzutów) -> pole rekordu
+FIELDS = {
+    'tytuł': 'title',
+    'treść': 'content',
+    'link': 'link',
+    'data': 'date',
+    'linki': 'links',
+    'gemini_tresc': 'summary',
+}
+
+
+class ArticleRecord:
+    """Artykuł zebrany w tym uruchomieniu – zwarty rekord zamiast słownika.
+
+    Sloty zamiast __dict__; nazwa źródła i data internowane (ten sam obiekt
+    str dla wszystkich artykułów źródła / dnia). Interfejs słownika po
+    kluczach JSON (`get`, `[]`, `setdefault`, `keys`), więc `dict(record)`
+    daje dokładnie dotychczasowy element – brakujące pola (None) nie są
+    kluczami.
+
+    Po streszczeniu treść może zostać zrzucona do archiwum (`spill`): rekord
+    trzyma wtedy tylko tytuł, link, datę i streszczenie, a 'treść' jest
+    wczytywana z ArticleStore przy odczycie.
+    """
+
+    __slots__ = ('title', 'content', 'link', 'date', 'links', 'summary', 'source', '_store')
+
+    def __init__(self, title: str, content: str | None, link: str, date: str | None, source: str | None = None):
+        self.title = title
+        self.content = content
+        self.link = link
+        self.date = sys.intern(date) if date else None
+        self.links: list[str] | None = None
+        self.summary: str | None = None
+        self.source = sys.intern(source) if source else None
+        self._store = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._store is not None
+
+    def spill(self, store) -> None:
+        """Zwalnia treść z pamięci; odtąd czytana z `store` (artykuł musi już być w archiwum)."""
+        self._store = store
+        self.content = None
+
+    def _value(self, attr: str):
+        if attr == 'content' and self._store is not None:
+            return self._store.content(self.link) or ''
+        return getattr(self, attr)
+
+    def __getitem__(self, key: str):
+        try:
+            value = self._value(FIELDS[key])
+        except KeyError:
+            raise KeyError(key) from None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value) -> None:
+        attr = FIELDS[key]
+        if attr == 'content':
+            self._store = None
+        setattr(self, attr, value)
+
+    def __contains__(self, key: str) -> bool:
+        attr = FIELDS.get(key)
+        if attr is None:
+            return False
+        if attr == 'content' and self._store is not None:
+            return True
+        return getattr(self, attr) is not None
+
+    def get(self, key: str, default=None):
+        attr = FIELDS.get(key)
+        if attr is None:
+            return default
+        value = self._value(attr)
+        return default if value is None else value
+
+    def setdefault(self, key: str, default=None):
+        value = self.get(key)
+        if value is None:
+            self[key] = value = default
+        return value
+
+    def pop(self, key: str, default=None):
+        # dawne pola (np. gemini_tytul) nie istnieją w rekordzie
+        if key not in FIELDS:
+            return default
+        value = self.get(key, default)
+        if key in self:
+            self[key] = None
+        return value
+
+    def keys(self) -> list[str]:
+        return [key for key in FIELDS if key in self]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def to_dict(self) -> dict:
+        out = {}
+        for key, attr in FIELDS.items():
+            value = self._value(attr)
+            if value is not None:
+                out[key] = value
+        return out
+
+    def __repr__(self) -> str:
+        return f"ArticleRecord({self.link!r}, {self.date!r}, spilled={self.spilled})"
@@ -0,0 +1,191 @@
+import logging
+import re
+from datetime import datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DENY_EXT = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip', '.doc', '.docx', '.xls', '.xlsx')
+
+PL_MONTHS = {
+    'stycznia': 1, 'lutego': 2, 'marca': 3, 'kwietnia': 4, 'maja': 5, 'czerwca': 6,
+    'lipca': 7, 'sierpnia': 8, 'września': 9, 'pazdziernika': 10, 'października': 10,
+    'listopada': 11, 'grudnia': 12
+}
+
+# formaty dat szukane w tekście strony (bez grup przechwytujących – nazwy nadaje DateRules)
+DATE_TEXT_PATTERNS = {
+    'dmy_slash': r'\b\d{1,2}/\d{1,2}/\d{4}\b',  # 16/10/2025
+    'dmy_dot': r'\b\d{1,2}\.\d{1,2}\.\d{4}\b',  # 16.10.2025
+    'iso': r'\b\d{4}-\d{2}-\d{2}\b',  # 2025-10-16
+    'pl_month': r'\b\d{1,2}\s+(?:' + '|'.join(PL_MONTHS) + r')\s+\d{4}\b',  # 16 października 2025
+}
+_STRPTIME = {'dmy_slash': '%d/%m/%Y', 'dmy_dot': '%d.%m.%Y', 'iso': '%Y-%m-%d'}
+# kolejność = priorytet
+DEFAULT_DATE_FORMATS = ('dmy_slash', 'dmy_dot', 'iso', 'pl_month')
+
+# selektor kandydata na kontener treści: 'tag', 'tag.klasa-regex' albo 'tag[itemprop=wartość]'
+_SELECTOR_RE = re.compile(r'^(\w+)(?:\[itemprop=([^\]]+)\]|\.(.+))?$')
+
+
+def _convert(fmt: str, text: str) -> datetime | None:
+    try:
+        if fmt == 'pl_month':
+            day, month, year = text.split()
+            return datetime(int(year), PL_MONTHS[month.lower()], int(day))
+        return datetime.strptime(text, _STRPTIME[fmt])
+    except Exception:
+        return None
+
+
+class DateRules:
+    """Formaty dat w tekście strony połączone w jedno wyrażenie – jeden przebieg po tekście.
+
+    Zachowuje semantykę osobnych wyszukiwań: liczy się pierwsze wystąpienie
+    każdego formatu, a formaty są próbowane w kolejności priorytetu.
+    """
+
+    def __init__(self, formats=DEFAULT_DATE_FORMATS):
+        self.formats = tuple(f for f in formats if f in DATE_TEXT_PATTERNS) or DEFAULT_DATE_FORMATS
+        unknown = [f for f in formats if f not in DATE_TEXT_PATTERNS]
+        if unknown:
+            logger.warning(f"Unknown date formats ignored: {unknown}")
+        self.regex = re.compile('|'.join(f'(?P<{f}>{DATE_TEXT_PATTERNS[f]})' for f in self.formats), re.IGNORECASE)
+
+    def search(self, text: str) -> datetime | None:
+        found: dict[str, datetime | None] = {}
+        for m in self.regex.finditer(text):
+            fmt = m.lastgroup
+            if fmt in found:
+                continue
+            found[fmt] = _convert(fmt, m.group())
+            # wynik przesądzony, gdy wszystkie formaty o wyższym priorytecie są już rozstrzygnięte
+            for f in self.formats:
+                if f not in found:
+                    break
+                if found[f] is not None:
+                    return found[f]
+            else:
+                return None
+        for f in self.formats:
+            if found.get(f) is not None:
+                return found[f]
+        return None
+
+
+def parse_selector(selector: str) -> tuple[str, re.Pattern | None, str | None]:
+    """'div.itemFullText' -> ('div', re(itemFullText), None); 'div[itemprop=articleBody]' -> ('div', None, 'articleBody')."""
+    m = _SELECTOR_RE.match(selector.strip())
+    if not m:
+        raise ValueError(f"invalid content selector: {selector!r}")
+    tag, itemprop, cls = m.groups()
+    return tag, (re.compile(cls) if cls else None), itemprop
+
+
+class SourceRules:
+    """Skompilowane reguły jednego źródła: filtr linków, kandydaci na treść, formaty dat."""
+
+    def __init__(self, name: str, allow_substrings=None, allow_regex: str | None = None, deny_regex: str | None = None,
+                 deny_ext=DENY_EXT, content=(), date_formats=DEFAULT_DATE_FORMATS):
+        self.name = name
+        self.allow_substrings = tuple(allow_substrings or ())
+        self.allow_regex = re.compile(allow_regex) if allow_regex else None
+        self.deny_regex = re.compile(deny_regex) if deny_regex else None
+        self.deny_ext = tuple(e.lower() for e in (deny_ext or ()))
+        self.content: list[tuple[str, re.Pattern | None, str | None]] = []
+        for selector in content or ():
+            try:
+                self.content.append(parse_selector(selector))
+            except ValueError as e:
+                logger.warning(f"Rules {name}: {e}")
+        self.dates = DateRules(date_formats or DEFAULT_DATE_FORMATS)
+
+    @classmethod
+    def from_source(cls, src: dict, content=None) -> 'SourceRules':
+        return cls(
+            src.get('name') or '',
+            allow_substrings=src.get('allow_substrings'),
+            allow_regex=src.get('allow_regex') or None,
+            deny_regex=src.get('deny_regex') or None,
+            deny_ext=src.get('deny_ext') or DENY_EXT,
+            content=src.get('content_selectors') if content is None else content,
+            date_formats=src.get('date_formats') or DEFAULT_DATE_FORMATS,
+        )
+
+    def with_links(self, allow_substrings, allow_regex: str | None) -> 'SourceRules':
+        """Kopia z innym filtrem allow (wywołania z jawnymi allow_substrings / allow_regex)."""
+        other = object.__new__(SourceRules)
+        other.__dict__.update(self.__dict__)
+        other.allow_substrings = tuple(allow_substrings or ())
+        other.allow_regex = re.compile(allow_regex) if allow_regex else None
+        return other
+
+    def link_allowed(self, abs_url: str, base_netloc: str) -> bool:
+        if urlparse(abs_url).netloc != base_netloc:
+            return False
+        if abs_url.lower().endswith(self.deny_ext):
+            return False
+        if self.allow_substrings and not any(s in abs_url for s in self.allow_substrings):
+            return False
+        if self.allow_regex and not self.allow_regex.search(abs_url):
+            return False
+        if self.deny_regex and self.deny_regex.search(abs_url):
+            return False
+        return True
+
+
+class RuleSet:
+    """Reguły wszystkich źródeł z configu, kompilowane raz; wybór po domenie URL-a.
+
+    Domeny źródła to base_url i listingi; `content_rules` (domena -> selektory)
+    dodaje kandydatów treści dla domen spoza `sources`. Nieznana domena
+    dostaje reguły domyślne (bez kandydatów – ogólny fallback treści).
+    """
+
+    def __init__(self, default: SourceRules | None = None):
+        self.default = default or SourceRules('default')
+        self._by_domain: dict[str, SourceRules] = {}
+        self._variants: dict[tuple, SourceRules] = {}
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> 'RuleSet':
+        cfg = cfg or {}
+        ruleset = cls()
+        for domain, selectors in (cfg.get('content_rules') or {}).items():
+            ruleset.add(domain, SourceRules(domain, content=selectors or ()))
+        for src in (cfg.get('sources') or []):
+            try:
+                rules = SourceRules.from_source(src)
+            except re.error as e:
+                logger.error(f"Invalid rules for {src.get('name')}: {e}")
+                continue
+            domains = {urlparse(u).netloc for u in (src.get('listings') or [])}
+            if src.get('base_url'):
+                domains.add(urlparse(src['base_url']).netloc)
+            for domain in domains:
+                ruleset.add(domain, rules)
+        return ruleset
+
+    def add(self, domain: str, rules: SourceRules) -> None:
+        self._by_domain[domain] = rules
+
+    def for_url(self, url: str) -> SourceRules:
+        netloc = urlparse(url).netloc if '/' in url else url
+        rules = self._by_domain.get(netloc)
+        if rules is None and netloc.startswith('www.'):
+            rules = self._by_domain.get(netloc[4:])
+        if rules is None:
+            rules = self._by_domain.get('www.' + netloc)
+        return rules or self.default
+
+    def link_filter(self, url: str, allow_substrings=None, allow_regex: str | None = None) -> SourceRules:
+        """Reguły linków dla strony `url`; jawne allow_substrings / allow_regex nadpisują te ze źródła."""
+        rules = self.for_url(url)
+        allow = tuple(allow_substrings or ())
+        if allow == rules.allow_substrings and (allow_regex or None) == (rules.allow_regex.pattern if rules.allow_regex else None):
+            return rules
+        key = (id(rules), allow, allow_regex or '')
+        variant = self._variants.get(key)
+        if variant is None:
+            variant = self._variants[key] = rules.with_links(allow, allow_regex)
+        return variant
@@ -0,0 +1,276 @@
+"""Tryb ciągły: każde źródło z configu odpytywane we własnym, adaptacyjnym odstępie.
+
+Zebrane artykuły trafiają do archiwum (ArticleStore), z którego czyta UI
+(/api/articles, /api/search) – zapytania użytkownika nie uruchamiają crawla.
+
+Uruchomienie (z katalogu repozytorium):
+    python scheduler.py [--config configs/sources.yaml] [--once]
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import threading
+import time
+
+from async_engine import AsyncCrawlEngine
+from metrics import Metrics
+from news_scraper import NewsScraper
+from sqlite_store import open_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'initial_minutes': 30,
+    'min_minutes': 10,
+    'max_minutes': 360,
+    # odstęp dobierany tak, by na jedno odpytanie przypadało średnio tyle nowych artykułów
+    'target_new_per_poll': 1.0,
+    # mnożnik odstępu, gdy listing się nie zmienił / brak nowych artykułów
+    'backoff': 1.5,
+    # waga ostatniego odpytania w średniej (EWMA) tempa nowych artykułów
+    'rate_weight': 0.3,
+    'jitter': 0.1,
+    'tick_seconds': 30,
+}
+
+
+def schedule_path(cfg: dict, state_dir: str) -> str:
+    return (cfg.get('scheduler') or {}).get('path') or os.path.join(state_dir, 'scheduler.sqlite')
+
+
+def next_interval(interval: float, rate_per_hour: float, changed: bool, new: int, opts: dict) -> float:
+    """Nowy odstęp (s): z tempa nowych artykułów, a bez nowości – wydłużany o `backoff`."""
+    lo, hi = opts['min_minutes'] * 60, opts['max_minutes'] * 60
+    if not changed or rate_per_hour <= 0:
+        interval *= opts['backoff']
+    elif new > 0:
+        interval = opts['target_new_per_poll'] / rate_per_hour * 3600
+    else:
+        interval = max(interval, opts['target_new_per_poll'] / rate_per_hour * 3600)
+    return min(hi, max(lo, interval))
+
+
+class ScheduleStore:
+    """Stan harmonogramu per źródło (SQLite w state_dir) – przetrwa restart demona.
+
+    Odpytanie źródła jest przejmowane atomowo (`claim_due`), więc kilka
+    demonów na jednym state_dir nie odpytuje tego samego źródła naraz.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sources ('
+            ' name TEXT PRIMARY KEY,'
+            ' interval REAL NOT NULL,'
+            ' next_run REAL NOT NULL,'
+            ' last_run REAL,'
+            ' last_new INTEGER NOT NULL DEFAULT 0,'
+            ' rate_per_hour REAL NOT NULL DEFAULT 0,'
+            ' polls INTEGER NOT NULL DEFAULT 0,'
+            ' changes INTEGER NOT NULL DEFAULT 0)'
+        )
+        self._conn.commit()
+
+    def ensure(self, name: str, interval: float, now: float) -> None:
+        with self._lock:
+            self._conn.execute('INSERT OR IGNORE INTO sources (name, interval, next_run) VALUES (?, ?, ?)',
+                               (name, interval, now))
+            self._conn.commit()
+
+    def get(self, name: str) -> dict | None:
+        with self._lock:
+            cur = self._conn.execute('SELECT * FROM sources WHERE name = ?', (name,))
+            row = cur.fetchone()
+            return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            cur = self._conn.execute('SELECT * FROM sources ORDER BY next_run')
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def claim_due(self, name: str, now: float, hold_seconds: float) -> bool:
+        """Przejmuje odpytanie, jeśli termin minął; do końca odpytania (najwyżej hold_seconds) inni je pomijają."""
+        with self._lock:
+            cur = self._conn.execute('UPDATE sources SET next_run = ? WHERE name = ? AND next_run <= ?',
+                                     (now + hold_seconds, name, now))
+            self._conn.commit()
+            return cur.rowcount == 1
+
+    def record(self, name: str, interval: float, next_run: float, last_run: float, new: int, rate_per_hour: float,
+               changed: bool) -> None:
+        with self._lock:
+            self._conn.execute(
+                'UPDATE sources SET interval = ?, next_run = ?, last_run = ?, last_new = ?, rate_per_hour = ?,'
+                ' polls = polls + 1, changes = changes + ? WHERE name = ?',
+                (interval, next_run, last_run, new, rate_per_hour, int(changed), name)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class Scheduler:
+    """Demon crawla: odpytuje źródła w ich terminach jednym długo żyjącym NewsScraperem.
+
+    Niezmieniony listing (odcisk zbioru linków w rejestrze crawla, zob.
+    NewsScraper._check_listing) kosztuje jedno żądanie, a odstęp rośnie.
+    Po zmianie odstęp wynika z tempa
+    nowych artykułów (nowych w archiwum, nie odtworzonych z rejestru):
+    częste nowości – odpytania częściej, cisza – rzadziej, w granicach
+    min_minutes..max_minutes (`scheduler` w configu, `poll_minutes` źródła).
+    """
+
+    def __init__(self, config_path: str = 'configs/sources.yaml', scraper: NewsScraper | None = None):
+        self.scraper = scraper or NewsScraper(config_path)
+        cfg = self.scraper.config
+        opts = dict(DEFAULTS)
+        opts.update((cfg.get('scheduler') or {}))
+        self.opts = opts
+        self.sources = [s for s in (cfg.get('sources') or []) if s.get('name')]
+        self.store = ScheduleStore(schedule_path(cfg, self.scraper.state_dir))
+        self.stop_event = threading.Event()
+        now = time.time()
+        for src in self.sources:
+            self.store.ensure(src['name'], self._initial_interval(src), now)
+
+    def _initial_interval(self, src: dict) -> float:
+        try:
+            return float(src.get('poll_minutes') or self.opts['initial_minutes']) * 60
+        except Exception:
+            return float(DEFAULTS['initial_minutes']) * 60
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.scraper.cancel_event.set()
+
+    def listings_changed(self, src: dict, since: float) -> bool:
+        """Czy odpytanie zmieniło listingi źródła; bez rejestru crawla, dla feedów i sitemap – zawsze tak."""
+        state = self.scraper.crawl_state
+        if state is None or src.get('prefer_feed') or src.get('sitemap_discovery') or not src.get('listings'):
+            return True
+        for list_url in src['listings']:
+            row = state.listing(list_url)
+            if row is None or row['last_changed'] >= since:
+                return True
+        return False
+
+    def poll(self, src: dict, state: dict) -> None:
+        name = src['name']
+        started = time.time()
+        added_before = len(self.scraper.news_items)
+        if self.scraper._crawl_engine() == 'async':
+            AsyncCrawlEngine(self.scraper).run([src])
+        else:
+            self.scraper.scrape_source(src)
+        try:
+            changed = self.listings_changed(src, started)
+        except Exception as e:
+            logger.debug(f"Scheduler {name}: listing state read failed: {e}")
+            changed = True
+        store = self.scraper.article_store
+        if store is not None:
+            new = store.count_new(started, name)
+        else:
+            new = len(self.scraper.news_items) - added_before
+        hours = max(1 / 60, (started - (state['last_run'] or started - state['interval'])) / 3600)
+        w = self.opts['rate_weight']
+        rate = w * (new / hours) + (1 - w) * state['rate_per_hour']
+        interval = next_interval(state['interval'], rate, changed, new, self.opts)
+        jitter = 1 + random.uniform(-self.opts['jitter'], self.opts['jitter'])
+        self.store.record(name, interval, time.time() + interval * jitter, started, new, rate, changed)
+        logger.info(f"Scheduler {name}: {'changed' if changed else 'listings unchanged'}, {new} new, "
+                    f"rate {rate:.2f}/h, next poll in {interval / 60:.0f} min")
+
+    def run_due(self) -> int:
+        """Odpytuje źródła z minionym terminem; zwraca ich liczbę."""
+        scraper = self.scraper
+        hold = self.opts['max_minutes'] * 60
+        due = []
+        for src in self.sources:
+            if scraper.cancelled():
+                break
+            if self.store.claim_due(src['name'], time.time(), hold):
+                due.append((src, self.store.get(src['name'])))
+        if not due:
+            return 0
+        # okno dat liczone od dziś także w demonie działającym wiele dni
+        scraper.reset_window()
+        scraper.begin_run()
+        scraper.news_items = []
+        for src, state in due:
+            if scraper.cancelled():
+                # przerwane przed odpytaniem – termin wraca, źródło zostanie odpytane po restarcie
+                self.store.record(src['name'], state['interval'], time.time(), state['last_run'] or 0,
+                                  state['last_new'], state['rate_per_hour'], False)
+                continue
+            try:
+                self.poll(src, state)
+            except Exception as e:
+                logger.error(f"Scheduler {src['name']}: poll failed: {e}")
+                self.store.record(src['name'], state['interval'], time.time() + state['interval'], time.time(),
+                                  0, state['rate_per_hour'], False)
+        self._finish_cycle()
+        return len(due)
+
+    def _finish_cycle(self) -> None:
+        scraper = self.scraper
+        scraper._log_run_stats()
+        if scraper.news_items and (os.environ.get('GOOGLE_API_KEY') or os.environ.get('GEMINI_API_KEY')):
+            scraper.enrich_with_gemini()
+        for item in scraper.news_items:
+            scraper.store_item(item, spill=True)
+        scraper.news_items = []
+        scraper.finish_metrics()
+        scraper.metrics = Metrics.for_config(scraper.config)
+
+    def seconds_to_next(self) -> float:
+        names = {s['name'] for s in self.sources}
+        upcoming = [row['next_run'] for row in self.store.all() if row['name'] in names]
+        if not upcoming:
+            return self.opts['tick_seconds']
+        return max(0.0, min(upcoming) - time.time())
+
+    def run_forever(self) -> None:
+        logger.info(f"Scheduler started: {len(self.sources)} sources, "
+                    f"intervals {self.opts['min_minutes']}-{self.opts['max_minutes']} min")
+        while not self.stop_event.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"Scheduler cycle failed: {e}")
+            # budzenie najpóźniej co tick_seconds – terminy mogą się zmienić (inny demon, restart)
+            self.stop_event.wait(min(self.seconds_to_next(), self.opts['tick_seconds']))
+        logger.info("Scheduler stopped")
+
+    def close(self) -> None:
+        self.store.close()
+        self.scraper.close()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--config', default='configs/sources.yaml')
+    ap.add_argument('--once', action='store_true', help='odpytaj źródła z minionym terminem i zakończ')
+    args = ap.parse_args(argv)
+    scheduler = Scheduler(args.config)
+    try:
+        if args.once:
+            scheduler.run_due()
+            return
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: scheduler.stop())
+        scheduler.run_forever()
+    finally:
+        scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import html
+import re
+from functools import lru_cache
+
+# wersja analizatora – zmiana przebudowuje indeks wyszukiwania (ArticleStore)
+ANALYZER_VERSION = '1'
+
+_WORD_RE = re.compile(r'\w+')
+_PHRASE_RE = re.compile(r'"([^"]*)"|(\S+)')
+_FOLD = str.maketrans('ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzACELNOSZZ')
+
+# końcówki fleksyjne (po zdjęciu diakrytyków), od najdłuższych; lekki stemmer – bez słownika
+_SUFFIXES = frozenset({
+    'owaniami', 'owaniach', 'owaniem', 'owania', 'owanie', 'owaniu',
+    'iami', 'iach', 'owie', 'ami', 'ach', 'om', 'ow', 'owi', 'em', 'ie', 'ia', 'iu', 'io',
+    'ego', 'emu', 'ymi', 'imi', 'ych', 'ich', 'ej', 'ym', 'im', 'ze',
+    'a', 'e', 'i', 'o', 'u', 'y',
+})
+_SUFFIX_LENGTHS = sorted({len(x) for x in _SUFFIXES}, reverse=True)
+MIN_STEM = 4
+STOPWORDS = frozenset(
+    'a aby ale albo bo by co czy do dla gdy i ich im jak jest jego jej juz ktora ktore ktory lub na nad nie '
+    'o od oraz po pod przez przy sa sie ta tak takze te ten to tu w we z za ze'.split()
+)
+
+
+def fold(text: str) -> str:
+    """Małe litery bez polskich znaków: 'Łódź' -> 'lodz'."""
+    return text.lower().translate(_FOLD)
+
+
+def stem(word: str) -> str:
+    """Lekki stemmer dla polskiego: jedna końcówka fleksyjna, temat co najmniej MIN_STEM znaków."""
+    for n in _SUFFIX_LENGTHS:
+        if len(word) - n >= MIN_STEM and word[-n:] in _SUFFIXES:
+            return word[:-n]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def term(token: str) -> str:
+    return stem(fold(token))
+
+
+def analyze(text: str | None) -> str:
+    """Tekst do indeksu: tematy słów rozdzielone spacjami (bez słów funkcyjnych)."""
+    if not text:
+        return ''
+    return ' '.join(term(w) for w in _WORD_RE.findall(text) if fold(w) not in STOPWORDS)
+
+
+def parse_query(q: str) -> tuple[str, set[str]]:
+    """Zapytanie -> (wyrażenie FTS5, tematy do podświetlenia; prefiksy z końcowym '*').
+
+    Słowa są wymagane wszystkie (AND); "w cudzysłowie" – fraza; słowo
+    zakończone * – prefiks.
+    """
+    parts: list[str] = []
+    terms: set[str] = set()
+    for phrase, word in _PHRASE_RE.findall(q or ''):
+        if phrase:
+            words = [term(w) for w in _WORD_RE.findall(phrase) if fold(w) not in STOPWORDS]
+            if words:
+                parts.append('"' + ' '.join(words) + '"')
+                terms.update(words)
+            continue
+        prefix = word.endswith('*')
+        for w in _WORD_RE.findall(word):
+            if fold(w) in STOPWORDS:
+                continue
+            if prefix:
+                parts.append(f'"{fold(w)}"*')
+                terms.add(fold(w) + '*')
+            else:
+                parts.append(f'"{term(w)}"')
+                terms.add(term(w))
+    return ' '.join(parts), terms
+
+
+def _matches(token: str, terms: set[str]) -> bool:
+    if term(token) in terms:
+        return True
+    folded = fold(token)
+    return any(x.endswith('*') and folded.startswith(x[:-1]) for x in terms)
+
+
+def highlight(text: str | None, terms: set[str], max_words: int | None = None, tag: str = 'mark') -> str:
+    """HTML: trafienia w <mark>; z max_words – fragment wokół pierwszego trafienia."""
+    if not text:
+        return ''
+    spans = [(m.start(), m.end(), _matches(m.group(), terms)) for m in _WORD_RE.finditer(text)]
+    lo, hi = 0, len(text)
+    if max_words and len(spans) > max_words:
+        first = next((i for i, s in enumerate(spans) if s[2]), 0)
+        start = max(0, first - max_words // 3)
+        end = min(len(spans), start + max_words)
+        lo = spans[start][0]
+        hi = spans[end - 1][1]
+        spans = spans[start:end]
+    out = ['…' if lo > 0 else '']
+    pos = lo
+    for s, e, hit in spans:
+        if not hit:
+            continue
+        out.append(html.escape(text[pos:s]))
+        out.append(f'<{tag}>{html.escape(text[s:e])}</{tag}>')
+        pos = e
+    out.append(html.escape(text[pos:hi]))
+    if hi < len(text):
+        out.append('…')
+    return ''.join(out)
+
+
+def fragment(texts, terms: set[str], max_words: int = 40) -> str:
+    """Fragment z pierwszego tekstu zawierającego trafienie (np. streszczenie, potem treść)."""
+    texts = [t for t in texts if t]
+    for text in texts:
+        if any(_matches(m.group(), terms) for m in _WORD_RE.finditer(text)):
+            return highlight(text, terms, max_words)
+    return highlight(texts[0], terms, max_words) if texts else ''
@@ -0,0 +1,74 @@
+import gzip
+import io
+import logging
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+
+from dateutil import parser
+
+logger = logging.getLogger(__name__)
+
+# limit protokołu sitemaps: 50 MB po rozpakowaniu
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+
+def _local(tag: str) -> str:
+    # '{http://www.sitemaps.org/schemas/sitemap/0.9}loc' -> 'loc'
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return parser.parse(value)
+    except Exception:
+        return None
+
+
+def parse_sitemap(content: bytes) -> tuple[list[tuple[str, str | None]], list[tuple[str, str | None]]]:
+    """Strumieniowo parsuje sitemapę (urlset albo sitemapindex, także .xml.gz).
+
+    Zwraca (podmapy, URL-e) jako listy (loc, lastmod-tekst). Elementy są
+    zwalniane zaraz po odczycie, więc duże sitemapy nie budują całego drzewa.
+    """
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.GzipFile(fileobj=io.BytesIO(content)).read(MAX_SITEMAP_BYTES + 1)
+    if len(content) > MAX_SITEMAP_BYTES:
+        logger.warning(f"Sitemap larger than {MAX_SITEMAP_BYTES} bytes, truncated")
+        content = content[:MAX_SITEMAP_BYTES]
+    children: list[tuple[str, str | None]] = []
+    urls: list[tuple[str, str | None]] = []
+    loc = lastmod = None
+    try:
+        for _event, el in ET.iterparse(io.BytesIO(content), events=('end',)):
+            name = _local(el.tag)
+            if name == 'loc':
+                loc = (el.text or '').strip() or None
+            elif name == 'lastmod':
+                lastmod = (el.text or '').strip() or None
+            elif name in ('url', 'sitemap'):
+                if loc:
+                    (urls if name == 'url' else children).append((loc, lastmod))
+                loc = lastmod = None
+                el.clear()
+    except ET.ParseError as e:
+        # ucięty / niepoprawny plik – zwracamy to, co udało się odczytać
+        logger.debug(f"Sitemap parse error after {len(urls)} urls: {e}")
+    return children, urls
+
+
+def modified_since(lastmod: datetime | None, start: date) -> bool:
+    """False tylko wtedy, gdy lastmod jest znany i wcześniejszy niż początek okna.
+
+    Artykuł opublikowany w oknie ma lastmod >= data publikacji, więc starszy
+    lastmod wyklucza go bez pobierania; brak lastmod niczego nie przesądza.
+    """
+    if lastmod is None:
+        return True
+    return lastmod.date() >= start
@@ -0,0 +1,54 @@
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# state_dir może współdzielić kilka procesów (scheduler, UI, koordynowane instancje) – czekamy na blokadę pliku
+BUSY_TIMEOUT = 30.0
+
+
+def open_store(path: str, isolation_level: str | None = '', timeout: float = BUSY_TIMEOUT,
+               **pragmas) -> sqlite3.Connection:
+    """Połączenie do magazynu SQLite: katalog tworzony w razie potrzeby, WAL, synchronous=NORMAL.
+
+    Połączenie jest współdzielone przez wątki – magazyn sam serializuje
+    dostęp (threading.Lock). `isolation_level=None` (autocommit) dla
+    magazynów, które same otwierają transakcje (BEGIN IMMEDIATE);
+    `pragmas` nadpisują lub uzupełniają domyślne PRAGMA.
+    """
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=isolation_level, timeout=timeout)
+    settings = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+    settings.update(pragmas)
+    for name, value in settings.items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def store_settings(cfg: dict | None, key: str, env: str) -> dict | None:
+    """Sekcja `key` configu albo None, gdy magazyn wyłączony (`enabled: false` lub zmienna `env`=0)."""
+    c = (cfg or {}).get(key) or {}
+    if not c.get('enabled', True) or os.environ.get(env, '1') == '0':
+        return None
+    return c
+
+
+def store_from_config(factory, cfg: dict | None, state_dir: str, key: str, env: str, default_name: str,
+                      label: str):
+    """Magazyn `factory(path, settings)` z sekcji `key` configu (domyślnie plik `default_name` w state_dir).
+
+    None, gdy magazyn jest wyłączony albo nie dał się otworzyć – scraper
+    działa wtedy bez niego.
+    """
+    c = store_settings(cfg, key, env)
+    if c is None:
+        return None
+    path = c.get('path') or os.path.join(state_dir, default_name)
+    try:
+        return factory(path, c)
+    except Exception as e:
+        logger.warning(f"{label} disabled ({path}): {e}")
+        return None
@@ -6,9 +6,17 @@ const closeModal = document.getElementById('closeModal');
 const modalBody = document.getElementById('modalBody');
 const logsEl = document.getElementById('logs');
 const exportBtn = document.getElementById('exportBtn');
+const exportFormat = document.getElementById('exportFormat');
 const apiKeyInput = document.getElementById('apiKeyInput');
+const cancelBtn = document.getElementById('cancelBtn');
+const searchInput = document.getElementById('searchInput');
 
 let currentData = [];
+let currentJobId = null;
+// ostatnie zadanie – eksport strumieniowy z serwera (GET /api/jobs/<id>/export)
+let lastJobId = null;
+// bez zadania eksport obejmuje archiwum (GET /api/articles/export), ew. zawężone wyszukiwaniem
+let lastQuery = '';
 
 // Load API key from localStorage
 if(localStorage.getItem('gemini_api_key')){
@@ -34,12 +42,18 @@ function renderCard(item){
   const date = item.data || '';
   const el = document.createElement('div');
   el.className = 'card';
-  el.innerHTML = `<h3>${title}</h3><div class="meta">${date}</div><div>${(item.gemini_tresc||item.treść||'').slice(0,180)}...</div>`;
+  if(item.highlight){
+    // wynik /api/search: trafienia w <mark> (HTML escapowany po stronie serwera)
+    el.innerHTML = `<h3>${item.highlight.tytuł || title}</h3><div class="meta">${date}${item.source ? ' · ' + item.source : ''}</div><div>${item.highlight.fragment}</div>`;
+  } else {
+    el.innerHTML = `<h3>${title}</h3><div class="meta">${date}</div><div>${(item.gemini_tresc||item.treść||'').slice(0,180)}...</div>`;
+  }
   el.addEventListener('click', ()=>{
     const body = [
       kv('Tytuł', item.tytuł || '—'),
       kv('Data', item.data || '—'),
       kv('Link', `<a href="${item.link}" target="_blank">${item.link}</a>`),
+      ...((item.linki||[]).length > 1 ? [kv('Też w', item.linki.filter(l => l !== item.link).map(l => `<a href="${l}" target="_blank">${l}</a>`).join('<br/>'))] : []),
       kv('Treść (AI)', (item.gemini_tresc||'—').replace(/\n\n/g,'<br/><br/>')),
       kv('Treść (oryg.)', (item.treść||'—').replace(/\n\n/g,'<br/><br/>')),
     ].join('');
@@ -49,27 +63,109 @@ function renderCard(item){
   return el;
 }
 
+// ostatnie artykuły z archiwum – widoczne od razu, bez uruchamiania zbierania
+async function loadStored(){
+  try {
+    const res = await fetch('/api/articles?per_page=60');
+    if(!res.ok) return;
+    const data = await res.json();
+    if(currentData.length) return;
+    currentData = data.items;
+    data.items.forEach(item => cards.appendChild(renderCard(item)));
+  } catch (e) {
+    // archiwum niedostępne – czekamy na zbieranie
+  }
+}
+loadStored();
+
+// wyszukiwanie w archiwum (Enter); puste pole – powrót do ostatnich artykułów
+searchInput.addEventListener('keydown', async (e)=>{
+  if(e.key !== 'Enter') return;
+  const q = searchInput.value.trim();
+  cards.innerHTML = '';
+  currentData = [];
+  lastJobId = null;
+  lastQuery = q;
+  if(!q){
+    loadStored();
+    return;
+  }
+  try {
+    const res = await fetch(`/api/search?per_page=60&q=${encodeURIComponent(q)}`);
+    if(!res.ok) throw new Error('Search failed');
+    const data = await res.json();
+    currentData = data.items;
+    if(!data.items.length){
+      cards.innerHTML = `<div class="meta">Brak wyników dla „${q.replace(/</g, '&lt;')}”</div>`;
+    }
+    data.items.forEach(item => cards.appendChild(renderCard(item)));
+  } catch (err) {
+    alert('Błąd wyszukiwania: ' + err.message);
+  }
+});
+
 runBtn.addEventListener('click', async ()=>{
   runBtn.disabled = true;
   loader.classList.remove('hidden');
   cards.innerHTML = '';
+  currentData = [];
   try {
-    const res = await fetch('/api/run', {
+    // zadanie w tle (ponowne kliknięcie dołącza do trwającego)
+    const jobRes = await fetch('/api/jobs', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ api_key: apiKeyInput.value.trim() })
     });
-    const data = await res.json();
-    currentData = data; // Update global data
-    data.forEach(item => cards.appendChild(renderCard(item)));
+    if(!jobRes.ok) throw new Error('Job failed');
+    const job = await jobRes.json();
+    currentJobId = job.job_id;
+    lastJobId = job.job_id;
+    cancelBtn.classList.remove('hidden');
+    // NDJSON: karty pojawiają się, gdy tylko artykuł zostanie streszczony
+    const res = await fetch(`/api/jobs/${job.job_id}/stream`);
+    if(!res.ok || !res.body) throw new Error('Run failed');
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    const handleLine = (line)=>{
+      if(!line.trim()) return;
+      const evt = JSON.parse(line);
+      if(evt.type === 'item'){
+        currentData.push(evt.item);
+        cards.appendChild(renderCard(evt.item));
+      } else if(evt.type === 'error'){
+        console.error(evt.error);
+      }
+    };
+    while(true){
+      const { value, done } = await reader.read();
+      if(done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
   } catch (e) {
     alert('Błąd podczas generowania. Sprawdź logi serwera.');
   } finally {
     loader.classList.add('hidden');
+    cancelBtn.classList.add('hidden');
+    currentJobId = null;
     runBtn.disabled = false;
   }
 });
 
+cancelBtn.addEventListener('click', async ()=>{
+  if(!currentJobId) return;
+  cancelBtn.disabled = true;
+  try {
+    await fetch(`/api/jobs/${currentJobId}`, { method: 'DELETE' });
+  } finally {
+    cancelBtn.disabled = false;
+  }
+});
+
 document.getElementById('closeModal').addEventListener('click', ()=>{
   modal.classList.add('hidden');
 });
@@ -90,31 +186,17 @@ try{
   // ignore
 }
 
-exportBtn.addEventListener('click', async ()=>{
+exportBtn.addEventListener('click', ()=>{
   if(currentData.length === 0){
     alert('Brak danych do exportu. Uruchom zbieranie najpierw.');
     return;
   }
-  exportBtn.disabled = true;
-  try {
-    const res = await fetch('/api/export', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(currentData)
-    });
-    if(!res.ok) throw new Error('Export failed');
-    const blob = await res.blob();
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `aktualnosci_${new Date().toISOString().slice(0,10)}.txt`;
-    a.click();
-    window.URL.revokeObjectURL(url);
-  } catch (e) {
-    alert('Błąd podczas exportu: ' + e.message);
-  } finally {
-    exportBtn.disabled = false;
-  }
+  const [fmt, gz] = (exportFormat ? exportFormat.value : 'txt').split('.');
+  const opts = `format=${fmt}${gz ? '&gzip=1' : ''}`;
+  // plik generowany strumieniowo po stronie serwera – przeglądarka pobiera go bezpośrednio
+  const a = document.createElement('a');
+  a.href = lastJobId
+    ? `/api/jobs/${lastJobId}/export?${opts}`
+    : `/api/articles/export?${opts}${lastQuery ? '&q=' + encodeURIComponent(lastQuery) : ''}`;
+  a.click();
 });
-
-
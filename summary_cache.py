@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from sqlite_store import open_store, store_from_config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize('NFC', text or '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def summary_key(text: str, prompt_version: str, model_name: str) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_text(text), prompt_version, model_name):
+        h.update(part.encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class SummaryCache:
+    """Trwały cache streszczeń (SQLite) adresowany treścią.
+
+    Klucz: sha256(znormalizowany tekst, wersja promptu, nazwa modelu) – ten sam
+    artykuł z innego URL-a lub z kolejnego uruchomienia nie jest streszczany
+    ponownie, a zmiana promptu lub modelu automatycznie unieważnia wpisy.
+    Limit liczby wpisów i rozmiaru z eviction LRU (accessed_at).
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = open_store(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            ' key TEXT PRIMARY KEY,'
+            ' summary TEXT NOT NULL,'
+            ' model TEXT,'
+            ' prompt_version TEXT,'
+            ' size INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries(accessed_at)')
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, state_dir: str) -> 'SummaryCache | None':
+        return store_from_config(
+            lambda path, c: cls(path, max_entries=int(c.get('max_entries', 5000)),
+                                max_bytes=int(float(c.get('max_mb', 50)) * 1024 * 1024)),
+            cfg, state_dir, 'summary_cache', 'SUMMARY_CACHE', 'summary_cache.sqlite', 'Summary cache'
+        )
+
+    def get(self, key: str) -> str | None:
+        return self.get_any([key])
+
+    def get_any(self, keys: list[str]) -> str | None:
+        """Streszczenie spod pierwszego znalezionego klucza; jedno trafienie albo jedno chybienie na wywołanie."""
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute('UPDATE summaries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+                    self._conn.commit()
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, summary: str, model: str, prompt_version: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, summary, model, prompt_version, size, created_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, summary, model, prompt_version, len(summary.encode('utf-8')), now, now)
+            )
+            self._conn.commit()
+            self.stored += 1
+
+    def evict(self) -> int:
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries').fetchone()
+            victims = []
+            if count > self.max_entries or total > self.max_bytes:
+                for key, size in self._conn.execute('SELECT key, size FROM summaries ORDER BY accessed_at'):
+                    if count <= self.max_entries and total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    count -= 1
+                    total -= size
+                self._conn.executemany('DELETE FROM summaries WHERE key = ?', victims)
+                self._conn.commit()
+            self.evicted += len(victims)
+        return len(victims)
+
+    def log_report(self) -> None:
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+        logger.info(
+            f"Summary cache: hits={self.hits} misses={self.misses} stored={self.stored} "
+            f"evicted={self.evicted} entries={entries}"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()